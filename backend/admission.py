@@ -0,0 +1,358 @@
+"""
+准入控制与资源限制
+
+转换开始前用 PyMuPDF 做一次轻量检查（只读页树和所选页的图片列表，不解码任何内容），
+根据文件大小、页数和估算的像素面积决定：
+
+- reject     超过硬上限（文件太大、页数太多），直接返回 413
+- downgrade  跳过 OCR（页数 / 光栅化像素过多）或跳过图片（疑似解压炸弹、图片总像素过多）
+- accept     正常处理
+
+配置了 CPU 时间或内存上限时，转换在一个受限子进程中执行（resource.setrlimit），
+超限只会终止该子进程，不影响服务本身。Windows 没有 resource 模块，此时忽略上限并记录警告。
+
+环境变量（0 表示不限制）:
+    PDF2MD_MAX_UPLOAD_MB              上传文件大小上限（默认 100）
+    PDF2MD_MAX_PAGES                  处理页数上限（默认 2000）
+    PDF2MD_OCR_MAX_PAGES              超过该页数时跳过 OCR（默认 200）
+    PDF2MD_OCR_MAX_MEGAPIXELS         OCR 光栅化总像素（百万，按 300 DPI 估算）上限，超过时跳过 OCR（默认 2000）
+    PDF2MD_MAX_IMAGE_MEGAPIXELS       单张图片像素上限，超过时跳过图片提取（默认 100）
+    PDF2MD_MAX_TOTAL_IMAGE_MEGAPIXELS 全部图片像素上限，超过时跳过图片提取（默认 1000）
+    PDF2MD_CPU_LIMIT_S                单个请求的 CPU 时间上限（秒，默认 0）
+    PDF2MD_MEMORY_LIMIT_MB            单个请求的内存上限（MB，默认 0）
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend.extraction import PageSelectionError, parse_page_ranges, resolve_pages
+    from backend.extraction.tables import HAS_PYMUPDF
+    from backend.logs import current_request_id, request_id_var, setup_logging
+except ImportError:
+    # 直接运行 python backend/main.py 时 backend 不是包
+    from extraction import PageSelectionError, parse_page_ranges, resolve_pages
+    from extraction.tables import HAS_PYMUPDF
+    from logs import current_request_id, request_id_var, setup_logging
+
+if HAS_PYMUPDF:
+    import fitz
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("pdf2md.admission")
+
+OCR_DPI = 300
+MB = 1024 * 1024
+
+
+def _env_number(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    max_upload_mb: float = 100
+    max_pages: int = 2000
+    ocr_max_pages: int = 200
+    ocr_max_megapixels: float = 2000
+    max_image_megapixels: float = 100
+    max_total_image_megapixels: float = 1000
+    cpu_seconds: int = 0
+    memory_mb: int = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionLimits":
+        return cls(
+            max_upload_mb=_env_number("PDF2MD_MAX_UPLOAD_MB", cls.max_upload_mb),
+            max_pages=int(_env_number("PDF2MD_MAX_PAGES", cls.max_pages)),
+            ocr_max_pages=int(_env_number("PDF2MD_OCR_MAX_PAGES", cls.ocr_max_pages)),
+            ocr_max_megapixels=_env_number("PDF2MD_OCR_MAX_MEGAPIXELS", cls.ocr_max_megapixels),
+            max_image_megapixels=_env_number("PDF2MD_MAX_IMAGE_MEGAPIXELS", cls.max_image_megapixels),
+            max_total_image_megapixels=_env_number("PDF2MD_MAX_TOTAL_IMAGE_MEGAPIXELS",
+                                                   cls.max_total_image_megapixels),
+            cpu_seconds=int(_env_number("PDF2MD_CPU_LIMIT_S", cls.cpu_seconds)),
+            memory_mb=int(_env_number("PDF2MD_MEMORY_LIMIT_MB", cls.memory_mb)),
+        )
+
+    @property
+    def max_upload_bytes(self) -> Optional[int]:
+        return int(self.max_upload_mb * MB) if self.max_upload_mb else None
+
+    @property
+    def isolated(self) -> bool:
+        """是否需要在受限子进程中运行"""
+        return bool(self.cpu_seconds or self.memory_mb)
+
+
+LIMITS = AdmissionLimits.from_env()
+
+
+@dataclass
+class DocumentInfo:
+    """轻量检查的结果"""
+    size: int
+    page_count: int = 0
+    selected_pages: int = 0
+    ocr_megapixels: float = 0.0
+    image_megapixels: float = 0.0
+    largest_image_megapixels: float = 0.0
+
+
+@dataclass
+class Admission:
+    """准入决定：是否接受，以及 OCR / 图片是否需要降级"""
+    accepted: bool = True
+    ocr: bool = True
+    images: bool = True
+    reasons: List[str] = field(default_factory=list)
+    info: Optional[DocumentInfo] = None
+
+    @property
+    def decision(self) -> str:
+        if not self.accepted:
+            return "reject"
+        return "downgrade" if self.reasons else "accept"
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {
+            "decision": self.decision,
+            "skipped": [name for name, enabled in (("ocr", self.ocr), ("images", self.images)) if not enabled],
+            "reasons": self.reasons,
+        }
+        if self.info is not None:
+            data["document"] = {
+                "size": self.info.size,
+                "page_count": self.info.page_count,
+                "selected_pages": self.info.selected_pages,
+                "ocr_megapixels": round(self.info.ocr_megapixels, 1),
+                "image_megapixels": round(self.info.image_megapixels, 1),
+            }
+        return data
+
+
+def _image_megapixels(doc, page_numbers) -> tuple:
+    """所选页上引用的图片的 Width / Height（只读页面资源，不解码），返回 (总像素, 最大单张像素)，单位百万
+
+    同一图片在多页上引用时只计一次；未选中的页上的图片不计入。
+    """
+    total = largest = 0
+    seen = set()
+    for page_num in page_numbers:
+        try:
+            images = doc.get_page_images(page_num - 1, full=True)
+        except Exception as e:
+            logger.debug("第 %d 页图片列表读取失败: %s", page_num, e)
+            continue
+        for image in images:
+            xref, width, height = image[0], image[2], image[3]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            pixels = width * height
+            total += pixels
+            largest = max(largest, pixels)
+    return total / 1e6, largest / 1e6
+
+
+def inspect_pdf(pdf_bytes: bytes, pages: Optional[str] = None, max_pages: Optional[int] = None) -> DocumentInfo:
+    """轻量检查：页数、所选页数、按 OCR_DPI 估算的光栅化像素、图片像素"""
+    info = DocumentInfo(size=len(pdf_bytes))
+    if not HAS_PYMUPDF:
+        return info
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        info.page_count = doc.page_count
+        selected = resolve_pages(parse_page_ranges(pages), doc.page_count, max_pages)
+        page_numbers = selected or range(1, doc.page_count + 1)
+        info.selected_pages = len(page_numbers)
+
+        scale = (OCR_DPI / 72) ** 2
+        info.ocr_megapixels = sum(
+            doc.page_cropbox(n - 1).width * doc.page_cropbox(n - 1).height * scale for n in page_numbers
+        ) / 1e6
+        info.image_megapixels, info.largest_image_megapixels = _image_megapixels(doc, page_numbers)
+    return info
+
+
+def admit(pdf_bytes: bytes, pages: Optional[str] = None, max_pages: Optional[int] = None,
+          ocr: bool = True, images: bool = True, limits: AdmissionLimits = LIMITS) -> Admission:
+    """
+    根据轻量检查结果做准入决定
+
+    文件无法用 PyMuPDF 打开时照常接受，交给转换流程报告具体错误；
+    页码参数无效时抛出 PageSelectionError。
+    """
+    admission = Admission(ocr=ocr, images=images)
+
+    if limits.max_upload_bytes and len(pdf_bytes) > limits.max_upload_bytes:
+        admission.accepted = False
+        admission.reasons.append(f"文件大小 {len(pdf_bytes) / MB:.1f} MB 超过上限 {limits.max_upload_mb:g} MB")
+        return admission
+
+    try:
+        info = inspect_pdf(pdf_bytes, pages, max_pages)
+    except PageSelectionError:
+        raise
+    except Exception as e:
+        logger.warning("准入检查无法解析 PDF: %s", e)
+        return admission
+    admission.info = info
+
+    if limits.max_pages and info.selected_pages > limits.max_pages:
+        admission.accepted = False
+        admission.reasons.append(f"页数 {info.selected_pages} 超过上限 {limits.max_pages}（可用 pages / max_pages 选择部分页面）")
+        return admission
+
+    if admission.ocr:
+        if limits.ocr_max_pages and info.selected_pages > limits.ocr_max_pages:
+            admission.ocr = False
+            admission.reasons.append(f"页数 {info.selected_pages} 超过 OCR 上限 {limits.ocr_max_pages}，跳过 OCR")
+        elif limits.ocr_max_megapixels and info.ocr_megapixels > limits.ocr_max_megapixels:
+            admission.ocr = False
+            admission.reasons.append(f"OCR 光栅化约 {info.ocr_megapixels:.0f} 百万像素，超过上限 "
+                                     f"{limits.ocr_max_megapixels:g}，跳过 OCR")
+
+    if admission.images:
+        if limits.max_image_megapixels and info.largest_image_megapixels > limits.max_image_megapixels:
+            admission.images = False
+            admission.reasons.append(f"单张图片 {info.largest_image_megapixels:.0f} 百万像素，超过上限 "
+                                     f"{limits.max_image_megapixels:g}，跳过图片提取")
+        elif limits.max_total_image_megapixels and info.image_megapixels > limits.max_total_image_megapixels:
+            admission.images = False
+            admission.reasons.append(f"图片共 {info.image_megapixels:.0f} 百万像素，超过上限 "
+                                     f"{limits.max_total_image_megapixels:g}，跳过图片提取")
+
+    return admission
+
+
+class ResourceLimitExceeded(RuntimeError):
+    """受限子进程超过 CPU 时间或内存上限"""
+
+
+class _CpuLimitReached(BaseException):
+    """SIGXCPU 转成的异常；继承 BaseException，避免被流水线中逐栏 / 逐页的 except Exception 吞掉"""
+
+
+def _raise_cpu_limit(signum, frame):
+    raise _CpuLimitReached()
+
+
+def _apply_limits(cpu_seconds: int, memory_mb: int):
+    if resource is None:
+        return
+    if cpu_seconds:
+        import signal
+        # 软上限触发 SIGXCPU（转为异常并返回错误），硬上限留 5 秒余量后由内核强制终止
+        signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, used + cpu_seconds + 5))
+    if memory_mb:
+        limit = memory_mb * MB
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _caused_by_memory_error(exc: BaseException) -> bool:
+    while exc is not None:
+        if isinstance(exc, MemoryError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _limited_child(conn, cpu_seconds: int, memory_mb: int, request_id: str,
+                   func: Callable, args: tuple, kwargs: dict):
+    """子进程入口：设置资源上限后执行 func，结果或异常通过管道返回"""
+    # fork 出的子进程没有日志后台线程，重新配置
+    setup_logging()
+    request_id_var.set(request_id)
+    try:
+        _apply_limits(cpu_seconds, memory_mb)
+        result = (True, func(*args, **kwargs))
+    except _CpuLimitReached:
+        result = (False, ResourceLimitExceeded(f"超过 CPU 时间上限（{cpu_seconds} 秒）"))
+    except MemoryError:
+        result = (False, ResourceLimitExceeded(f"超过内存上限（{memory_mb} MB）"))
+    except Exception as e:
+        # 第三方库常把 MemoryError 包装成自己的异常
+        if memory_mb and _caused_by_memory_error(e):
+            e = ResourceLimitExceeded(f"超过内存上限（{memory_mb} MB）")
+        result = (False, e)
+
+    try:
+        conn.send(result)
+    except Exception as e:
+        # 异常对象无法序列化时退回到字符串
+        conn.send((False, RuntimeError(f"{type(e).__name__}: {e}" if result[0] else str(result[1]))))
+    finally:
+        conn.close()
+
+
+_mp_context = None
+
+
+def _get_context(preload_module: str):
+    """Linux/macOS 用 forkserver（预先导入转换模块，每个请求只需 fork），Windows 用 spawn"""
+    global _mp_context
+    if _mp_context is None:
+        if sys.platform == "win32" or "forkserver" not in multiprocessing.get_all_start_methods():
+            _mp_context = multiprocessing.get_context("spawn")
+        else:
+            _mp_context = multiprocessing.get_context("forkserver")
+            _mp_context.set_forkserver_preload([preload_module])
+    return _mp_context
+
+
+def run_limited(func: Callable, *args, limits: AdmissionLimits = LIMITS, cancel=None, **kwargs):
+    """
+    在受限子进程中执行 func(*args, **kwargs) 并返回结果；未配置上限时直接在当前线程执行
+
+    func 及其参数、返回值必须可以 pickle。子进程超限时抛出 ResourceLimitExceeded，
+    func 自身的异常原样抛出。cancel（CancelToken）只在父进程中使用：子进程模式下取消时
+    直接终止子进程并抛出 ConversionCancelled；在当前线程执行时作为 cancel= 传给 func。
+    """
+    if cancel is not None and not (limits.isolated and resource is not None):
+        kwargs["cancel"] = cancel
+    if not limits.isolated:
+        return func(*args, **kwargs)
+    if resource is None:
+        logger.warning("当前平台不支持 resource 模块，忽略 CPU / 内存上限")
+        return func(*args, **kwargs)
+
+    ctx = _get_context(func.__module__)
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    # 不设为 daemon：ocrmypdf 会在子进程中再启动进程池
+    proc = ctx.Process(
+        target=_limited_child,
+        args=(child_conn, limits.cpu_seconds, limits.memory_mb, current_request_id(), func, args, kwargs),
+        name="pdf2md-limited",
+    )
+    proc.start()
+    child_conn.close()
+    try:
+        # 等待结果期间轮询取消令牌，取消时直接终止子进程
+        while cancel is not None and not parent_conn.poll(0.2):
+            if cancel.cancelled:
+                proc.kill()
+                proc.join()
+                cancel.check()
+        ok, payload = parent_conn.recv()
+    except EOFError:
+        # 子进程未返回结果就退出：通常是被硬上限（SIGKILL / SIGXCPU）终止
+        proc.join()
+        raise ResourceLimitExceeded(f"转换子进程异常退出（exit code {proc.exitcode}），可能超过 CPU 或内存上限")
+    finally:
+        parent_conn.close()
+    proc.join()
+
+    if ok:
+        return payload
+    raise payload
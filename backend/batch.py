@@ -0,0 +1,122 @@
+"""
+批量转换：POST /convert/batch 的上传解析（多个文件 / zip 压缩包）
+
+一次请求上传多个 PDF（多个 file 字段，或 zip 压缩包，可混合）。每个文档按页切成
+若干分块（见 scheduler.plan_chunks），所有分块共用 /convert 的转换槽位，因此多个小文档
+可以同时占满所有工作线程，大文档也会被拆开并行处理；每个文档的分块全部完成后立即以
+一行 JSON（NDJSON）返回。
+
+环境变量:
+    PDF2MD_BATCH_MAX_FILES    单次批量请求的文档数上限（默认 1000）
+    PDF2MD_BATCH_MAX_MB       单次批量请求解压后的总大小上限（MB，默认 1000）
+"""
+
+import io
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from backend.admission import LIMITS, MB
+except ImportError:
+    from admission import LIMITS, MB
+
+
+BATCH_MAX_FILES = int(os.getenv("PDF2MD_BATCH_MAX_FILES", "1000"))
+BATCH_MAX_BYTES = int(float(os.getenv("PDF2MD_BATCH_MAX_MB", "1000")) * MB)
+
+ZIP_MAGIC = b"PK\x03\x04"
+PDF_MAGIC = b"%PDF"
+# 与 PDF 阅读器和 PyMuPDF 一样，文件头前允许有 BOM 或少量无关字节
+PDF_MAGIC_WINDOW = 1024
+
+
+class BatchError(ValueError):
+    """整个批量请求无效（文档过多、总大小超限、压缩包损坏等），返回 400 / 413"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class BatchDocument:
+    """批量请求中的一个文档；content 为 None 时 error 说明原因（只影响该文档）"""
+
+    index: int
+    filename: str
+    content: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+def _is_zip(filename: str, content: bytes) -> bool:
+    return content.startswith(ZIP_MAGIC) or filename.lower().endswith(".zip")
+
+
+def _unpack_zip(filename: str, content: bytes, budget: int) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """读取压缩包中的 PDF（忽略目录和 macOS 元数据），返回 (名称, 内容, 错误) 列表
+
+    单个成员按实际读出的字节数检查大小上限（不信任压缩包目录中记录的大小），
+    防止解压炸弹占满内存。
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile as e:
+        raise BatchError(f"{filename}: 无效的 zip 文件 ({e})")
+
+    entries = []
+    max_member = LIMITS.max_upload_bytes
+    with archive:
+        for member in archive.infolist():
+            name = member.filename
+            if member.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                continue
+            display_name = f"{filename}/{name}"
+            if not name.lower().endswith(".pdf"):
+                entries.append((display_name, None, "不是 PDF 文件"))
+                continue
+            limit = min(budget, max_member) if max_member else budget
+            with archive.open(member) as f:
+                data = f.read(limit + 1)
+            if len(data) > limit:
+                if max_member and limit == max_member:
+                    entries.append((display_name, None, f"文件超过大小上限 {LIMITS.max_upload_mb:g} MB"))
+                    continue
+                raise BatchError(f"解压后的总大小超过上限 {BATCH_MAX_BYTES / MB:g} MB", status_code=413)
+            budget -= len(data)
+            entries.append((display_name, data, None))
+    return entries
+
+
+def unpack_uploads(uploads: Sequence[Tuple[str, bytes]]) -> List[BatchDocument]:
+    """把上传的 (文件名, 内容) 展开为文档列表：zip 解压出其中的 PDF，其余按 PDF 处理"""
+    documents: List[BatchDocument] = []
+    budget = BATCH_MAX_BYTES
+
+    def add(name: str, data: Optional[bytes], error: Optional[str] = None):
+        if len(documents) >= BATCH_MAX_FILES:
+            raise BatchError(f"文档数量超过上限 {BATCH_MAX_FILES}", status_code=413)
+        if data is not None and PDF_MAGIC not in data[:PDF_MAGIC_WINDOW]:
+            data, error = None, "不是 PDF 文件"
+        documents.append(BatchDocument(index=len(documents), filename=name, content=data, error=error))
+
+    for filename, content in uploads:
+        filename = filename or f"document-{len(documents) + 1}.pdf"
+        if _is_zip(filename, content):
+            for name, data, error in _unpack_zip(filename, content, budget):
+                add(name, data, error)
+                budget -= len(data or b"")
+            continue
+        if len(content) > budget:
+            raise BatchError(f"上传的总大小超过上限 {BATCH_MAX_BYTES / MB:g} MB", status_code=413)
+        budget -= len(content)
+        if LIMITS.max_upload_bytes and len(content) > LIMITS.max_upload_bytes:
+            add(filename, None, f"文件超过大小上限 {LIMITS.max_upload_mb:g} MB")
+        else:
+            add(filename, content)
+
+    if not documents:
+        raise BatchError("没有可转换的文档")
+    return documents
+
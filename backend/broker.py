@@ -0,0 +1,499 @@
+"""
+任务队列：API 进程与独立的转换 worker（backend/worker.py）之间的代理
+
+设置 PDF2MD_BROKER 后，/convert 和 /convert/batch 只做参数检查和准入控制，把任务
+（PDF 内容 + 参数）放入队列，由任意数量的 worker 进程领取、转换并写回结果；
+API 与 worker 都不保存本地状态，可以分别扩容。
+
+    PDF2MD_BROKER=sqlite:///var/lib/pdf2md/queue.db   同一台机器（或同一块本地磁盘）上的 worker，无需额外依赖
+    PDF2MD_BROKER=redis://redis:6379/0                其他节点上的 worker（需要 pip install redis）
+
+- 优先级：interactive 任务先于 batch 任务被领取；SQLite 后端在同一优先级内按租户轮转
+- 租约：worker 运行任务期间每秒续约一次，超过 PDF2MD_JOB_LEASE_S（默认 60）秒未续约的任务
+  （worker 崩溃或失联）重新入队，最多尝试 PDF2MD_JOB_MAX_ATTEMPTS 次（默认 3）
+- 取消：API 标记取消，排队中的任务直接结束，运行中的任务由 worker 在续约时发现并中止
+- 结果只被读取一次；未被读取的结果 PDF2MD_JOB_RESULT_TTL_S 秒（默认 3600）后清理
+
+RedisBroker 只用到 redis-py 的一小部分命令，测试时可以传入 fakeredis 等本地替身作为 client。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    from backend.scheduler import INTERACTIVE, PRIORITIES
+except ImportError:
+    from scheduler import INTERACTIVE, PRIORITIES
+
+
+LEASE_SECONDS = float(os.getenv("PDF2MD_JOB_LEASE_S", "60"))
+MAX_ATTEMPTS = int(os.getenv("PDF2MD_JOB_MAX_ATTEMPTS", "3"))
+RESULT_TTL_SECONDS = float(os.getenv("PDF2MD_JOB_RESULT_TTL_S", "3600"))
+
+logger = logging.getLogger("pdf2md.broker")
+
+
+@dataclass
+class Job:
+    """一次转换任务；options 为 run_conversion() 的关键字参数（可 JSON 序列化）"""
+
+    payload: bytes
+    options: Dict[str, Any] = field(default_factory=dict)
+    priority: str = INTERACTIVE
+    tenant: str = "-"
+    request_id: str = "-"
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+
+
+def error_result(error: str, kind: str) -> Dict[str, Any]:
+    """失败结果；kind 决定 API 返回的状态（见 main.REMOTE_ERRORS）"""
+    return {"error": error, "type": kind}
+
+
+class Broker(ABC):
+    """队列后端接口（SqliteBroker / RedisBroker）；缺少某个方法的后端在创建时即报错"""
+
+    @abstractmethod
+    def submit(self, job: Job):
+        """放入队列"""
+
+    @abstractmethod
+    def claim(self, worker: str, timeout: float) -> Optional[Job]:
+        """领取下一个任务，最多等待 timeout 秒；没有任务时返回 None"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str):
+        """续约运行中的任务"""
+
+    @abstractmethod
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        """写回结果（成功或 error_result()）"""
+
+    @abstractmethod
+    def collect(self, job_ids: List[str], timeout: float) -> Dict[str, Dict[str, Any]]:
+        """取走这些任务中已完成的结果，最多等待 timeout 秒"""
+
+    @abstractmethod
+    def cancel(self, job_id: str):
+        """标记取消"""
+
+    @abstractmethod
+    def cancelled(self, job_id: str) -> bool:
+        """是否已被标记取消"""
+
+    @abstractmethod
+    def requeue_stale(self) -> int:
+        """把租约过期的任务重新入队（超过最大尝试次数的直接失败），返回处理的任务数"""
+
+    def close(self):
+        pass
+
+
+class SqliteBroker(Broker):
+    """基于 SQLite（WAL）的队列，多个进程共享同一个数据库文件
+
+    SQLite 的文件锁在网络文件系统上不可靠，其他节点上的 worker 请使用 RedisBroker。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,           -- queued / running / done
+        priority INTEGER NOT NULL,
+        round INTEGER NOT NULL,         -- 入队时该租户已有的任务数，用于租户轮转
+        created REAL NOT NULL,
+        updated REAL NOT NULL,          -- 续约 / 完成时间
+        tenant TEXT NOT NULL,
+        request_id TEXT NOT NULL,
+        options TEXT NOT NULL,
+        payload BLOB,
+        result TEXT,
+        worker TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        cancelled INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, round, created);
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.1):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, job: Job):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (pending,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE tenant = ? AND status != 'done'", (job.tenant,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO jobs (id, status, priority, round, created, updated, tenant, request_id, options, payload)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, PRIORITIES.index(job.priority), pending, now, now, job.tenant, job.request_id,
+                 json.dumps(job.options), job.payload),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _claim_once(self, worker: str) -> Optional[Job]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, priority, tenant, request_id, options, payload, attempts FROM jobs"
+                " WHERE status = 'queued' AND cancelled = 0 ORDER BY priority, round, created LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, updated = ?, attempts = attempts + 1"
+                    " WHERE id = ?", (worker, time.time(), row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job_id, priority, tenant, request_id, options, payload, attempts = row
+        return Job(id=job_id, payload=payload, options=json.loads(options), priority=PRIORITIES[priority],
+                   tenant=tenant, request_id=request_id, attempts=attempts + 1)
+
+    def claim(self, worker: str, timeout: float) -> Optional[Job]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self._claim_once(worker)
+            if job is not None or time.monotonic() >= deadline:
+                return job
+            time.sleep(self.poll_interval)
+
+    def heartbeat(self, job_id: str):
+        self._connect().execute(
+            "UPDATE jobs SET updated = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+        )
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, payload = NULL, updated = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id),
+        )
+
+    def collect(self, job_ids: List[str], timeout: float) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        deadline = time.monotonic() + timeout
+        while True:
+            results = {}
+            # SQLite 单条语句的参数个数有上限，分批查询
+            for start in range(0, len(job_ids), 500):
+                batch = job_ids[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT id, result FROM jobs WHERE status = 'done' AND id IN ({marks})", batch
+                ).fetchall()
+                results.update((job_id, json.loads(result)) for job_id, result in rows)
+            if results:
+                ids = list(results)
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    conn.execute(f"DELETE FROM jobs WHERE id IN ({','.join('?' * len(batch))})", batch)
+                return results
+            if time.monotonic() >= deadline:
+                return {}
+            time.sleep(self.poll_interval)
+
+    def cancel(self, job_id: str):
+        conn = self._connect()
+        conn.execute("UPDATE jobs SET cancelled = 1 WHERE id = ?", (job_id,))
+        conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, payload = NULL, updated = ? WHERE id = ? AND status = 'queued'",
+            (json.dumps(error_result("已取消", "cancelled")), time.time(), job_id),
+        )
+
+    def cancelled(self, job_id: str) -> bool:
+        row = self._connect().execute("SELECT cancelled FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def requeue_stale(self) -> int:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale = conn.execute(
+                "SELECT id, attempts FROM jobs WHERE status = 'running' AND updated < ?", (now - LEASE_SECONDS,)
+            ).fetchall()
+            for job_id, attempts in stale:
+                if attempts >= MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'done', result = ?, payload = NULL, updated = ? WHERE id = ?",
+                        (json.dumps(error_result(f"worker 连续 {attempts} 次未完成该任务", "error")), now, job_id),
+                    )
+                else:
+                    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?", (job_id,))
+            # 没有人来取的结果（API 进程已退出）
+            conn.execute("DELETE FROM jobs WHERE status = 'done' AND updated < ?", (now - RESULT_TTL_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if stale:
+            logger.warning("%d 个任务的租约已过期，重新入队", len(stale))
+        return len(stale)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisBroker(Broker):
+    """基于 Redis 的队列，worker 可以运行在任意能访问 Redis 的节点上
+
+    键（prefix 默认为 "pdf2md"）:
+        {prefix}:queue:{priority}  待领取的任务 ID 列表（LPUSH / LMOVE，按优先级顺序领取）
+        {prefix}:processing        已领取、尚未完成的任务 ID（list；领取时由 LMOVE 原子地从队列移入）
+        {prefix}:job:{id}          任务内容（hash）
+        {prefix}:leases            运行中任务的最近续约时间（zset）
+        {prefix}:result:{id}       结果（list，API 用 BLPOP 等待）
+        {prefix}:cancel:{id}       取消标记
+
+    需要 Redis 6.2 以上（LMOVE）。队列为空时按 poll_interval 轮询（LMOVE 不能同时等待多个队列）。
+    """
+
+    def __init__(self, client, prefix: str = "pdf2md", poll_interval: float = 0.1):
+        self.client = client
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    @staticmethod
+    def _text(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def submit(self, job: Job):
+        pipe = self.client.pipeline()
+        pipe.hset(self._key("job", job.id), mapping={
+            "payload": job.payload, "options": json.dumps(job.options), "priority": job.priority,
+            "tenant": job.tenant, "request_id": job.request_id, "attempts": 0,
+        })
+        pipe.lpush(self._key("queue", job.priority), job.id)
+        pipe.execute()
+
+    def _pop(self) -> Optional[str]:
+        """按优先级顺序把一个任务 ID 从队列原子地移到 processing 列表（LMOVE，不会有从 Redis 中消失的时刻）"""
+        for priority in PRIORITIES:
+            job_id = self.client.lmove(self._key("queue", priority), self._key("processing"), "RIGHT", "LEFT")
+            if job_id is not None:
+                return self._text(job_id)
+        return None
+
+    def _drop(self, job_id: str):
+        """删除任务的所有痕迹（任务内容已不存在时）"""
+        pipe = self.client.pipeline()
+        pipe.delete(self._key("job", job_id))
+        pipe.zrem(self._key("leases"), job_id)
+        pipe.lrem(self._key("processing"), 0, job_id)
+        pipe.execute()
+
+    def claim(self, worker: str, timeout: float) -> Optional[Job]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job_id = self._pop()
+            if job_id is None:
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(self.poll_interval)
+                continue
+            # 租约和尝试次数在同一个事务中写入；在此之前崩溃时任务仍在 processing 列表中，
+            # 由 requeue_stale() 补上租约
+            job_key = self._key("job", job_id)
+            pipe = self.client.pipeline()
+            pipe.zadd(self._key("leases"), {job_id: time.time()})
+            pipe.hgetall(job_key)
+            pipe.hincrby(job_key, "attempts", 1)
+            _, data, attempts = pipe.execute()
+            data = {self._text(key): value for key, value in data.items()}
+            if "payload" not in data:
+                self._drop(job_id)
+                continue
+            if self.cancelled(job_id):
+                self.finish(job_id, error_result("已取消", "cancelled"))
+                continue
+            return Job(id=job_id, payload=data["payload"], options=json.loads(self._text(data["options"])),
+                       priority=self._text(data["priority"]), tenant=self._text(data["tenant"]),
+                       request_id=self._text(data["request_id"]), attempts=attempts)
+
+    def heartbeat(self, job_id: str):
+        self.client.zadd(self._key("leases"), {job_id: time.time()}, xx=True)
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        key = self._key("result", job_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(key, json.dumps(result, ensure_ascii=False))
+        pipe.expire(key, int(RESULT_TTL_SECONDS))
+        pipe.delete(self._key("job", job_id))
+        pipe.zrem(self._key("leases"), job_id)
+        pipe.lrem(self._key("processing"), 0, job_id)
+        pipe.execute()
+
+    def collect(self, job_ids: List[str], timeout: float) -> Dict[str, Dict[str, Any]]:
+        if not job_ids:
+            return {}
+        keys = [self._key("result", job_id) for job_id in job_ids]
+        item = self.client.blpop(keys, timeout=max(timeout, 0.01))
+        if item is None:
+            return {}
+        prefix_len = len(self._key("result", ""))
+        results = {self._text(item[0])[prefix_len:]: json.loads(item[1])}
+        # 其余已完成的结果一次取走
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.lpop(key)
+        for job_id, value in zip(job_ids, pipe.execute()):
+            if value is not None:
+                results[job_id] = json.loads(value)
+        return results
+
+    def cancel(self, job_id: str):
+        self.client.set(self._key("cancel", job_id), 1, ex=int(RESULT_TTL_SECONDS))
+
+    def cancelled(self, job_id: str) -> bool:
+        return bool(self.client.exists(self._key("cancel", job_id)))
+
+    def requeue_stale(self) -> int:
+        leases = self._key("leases")
+        processing = self._key("processing")
+        now = time.time()
+        # 已移入 processing 但还没有租约的任务（worker 在领取的两步之间崩溃）：补一个从现在开始的租约，
+        # 到期后与其他过期任务一样重新入队；正在领取的 worker 随后写入的租约会覆盖它（NX 不覆盖已有租约）
+        claimed = self.client.lrange(processing, 0, -1)
+        if claimed:
+            self.client.zadd(leases, {self._text(job_id): now for job_id in claimed}, nx=True)
+        stale = self.client.zrangebyscore(leases, 0, now - LEASE_SECONDS)
+        requeued = 0
+        for job_id in map(self._text, stale):
+            # ZREM 成功的一方负责处理，多个 worker 同时检查时不会重复入队
+            if not self.client.zrem(leases, job_id):
+                continue
+            job_key = self._key("job", job_id)
+            attempts, priority = self.client.hmget(job_key, ["attempts", "priority"])
+            if priority is None:
+                # 补租约之后任务已经完成
+                self._drop(job_id)
+                continue
+            requeued += 1
+            attempts = int(attempts or 0)
+            if attempts >= MAX_ATTEMPTS:
+                self.finish(job_id, error_result(f"worker 连续 {attempts} 次未完成该任务", "error"))
+            else:
+                pipe = self.client.pipeline()
+                pipe.lrem(processing, 0, job_id)
+                pipe.lpush(self._key("queue", self._text(priority)), job_id)
+                pipe.execute()
+        if requeued:
+            logger.warning("%d 个任务的租约已过期，重新入队", requeued)
+        return requeued
+
+    def close(self):
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+def open_broker(url: Optional[str], client=None) -> Optional[Broker]:
+    """
+    按 URL 创建队列后端；url 为空时返回 None（在 API 进程内转换）
+
+    sqlite:///绝对路径 或 sqlite://相对路径；redis://...（client 不为空时直接使用该客户端）
+    """
+    if not url:
+        return None
+    if url.startswith("sqlite://"):
+        return SqliteBroker(url[len("sqlite://"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("PDF2MD_BROKER 使用 Redis 需要安装 redis 包: pip install redis")
+            client = redis.Redis.from_url(url)
+        return RedisBroker(client)
+    raise ValueError(f"不支持的 PDF2MD_BROKER: {url}（可选: sqlite:///path, redis://host:port/db）")
+
+
+class ResultCollector:
+    """API 进程中等待任务结果：一个后台线程批量查询所有等待中的任务，而不是每个请求占一个线程"""
+
+    def __init__(self, broker: Broker, interval: float = 0.5):
+        self.broker = broker
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Any] = {}   # 任务 ID → (事件循环, Future)
+        self._thread: Optional[threading.Thread] = None
+
+    def wait(self, job_id: str):
+        """返回一个 asyncio.Future，任务完成时得到结果（在事件循环中调用）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters[job_id] = (loop, future)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pdf2md-results", daemon=True)
+                self._thread.start()
+        return future
+
+    def discard(self, job_id: str):
+        with self._lock:
+            self._waiters.pop(job_id, None)
+
+    def _resolve(self, results: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            waiters = [(self._waiters.pop(job_id, None), result) for job_id, result in results.items()]
+        for waiter, result in waiters:
+            if waiter is None:
+                continue
+            loop, future = waiter
+            loop.call_soon_threadsafe(lambda f=future, r=result: f.done() or f.set_result(r))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                job_ids = list(self._waiters)
+                if not job_ids:
+                    self._thread = None
+                    return
+            try:
+                self._resolve(self.broker.collect(job_ids, self.interval))
+            except Exception as e:
+                logger.warning("读取任务结果失败: %s", e)
+                time.sleep(self.interval)
+
@@ -0,0 +1,232 @@
+"""
+转换入口：OCR + 逐页提取 + 组装 Markdown
+
+API（backend/main.py）、worker（backend/worker.py）、批量转换脚本和基准测试共用。
+本模块不创建 FastAPI 应用、不打开队列或调度器，worker 进程只导入这里即可执行转换。
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+try:
+    from backend.extraction import (
+        CancelToken, ConversionCancelled, DocumentPlan, StageTimings, count_pages, get_engine, page_summary,
+        render_page_markdown, run_cancellable, select_pages,
+    )
+    from backend import profiling
+    from backend.admission import LIMITS, run_limited
+except ImportError:
+    # 直接运行 backend/ 下的脚本时 backend 不是包
+    from extraction import (
+        CancelToken, ConversionCancelled, DocumentPlan, StageTimings, count_pages, get_engine, page_summary,
+        render_page_markdown, run_cancellable, select_pages,
+    )
+    import profiling
+    from admission import LIMITS, run_limited
+
+logger = logging.getLogger("pdf2md.conversion")
+
+# OCR 超时（秒，0 表示不限制）；设置后 OCR 以子进程运行，超时即终止并使用原始 PDF 继续
+OCR_TIMEOUT_S = float(os.getenv("PDF2MD_OCR_TIMEOUT_S", "0"))
+
+
+def _ocr_cli_args(options: dict) -> list:
+    """把 ocrmypdf.ocr() 的关键字参数转换为命令行参数（两种运行方式使用同一组参数）"""
+    args = []
+    for key, value in options.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            args.append(flag)
+        elif value is not False and value is not None:
+            args += [flag, str(value)]
+    return args
+
+
+def ocr_pdf_bytes(pdf_bytes: bytes, pages: list | None = None, cancel: CancelToken | None = None,
+                  timeout: float | None = None) -> bytes | None:
+    """尝试对 PDF 进行 OCR 处理，失败（或超时）时返回 None；pages 为页码列表时只识别这些页（其余页原样保留）。
+
+    传入 cancel（API、worker）或设置了 timeout（默认 PDF2MD_OCR_TIMEOUT_S）时以子进程运行 ocrmypdf，
+    取消或超时时立即终止（取消时抛出 ConversionCancelled）；都没有时（命令行脚本、SmartPDFExtractor）
+    在当前进程中调用 ocrmypdf.ocr()，省去子进程启动开销。"""
+    engine = get_engine()
+    if not engine.ocr_available:
+        return None
+    timeout = OCR_TIMEOUT_S if timeout is None else timeout
+    killable = cancel is not None or bool(timeout)
+    if cancel is not None:
+        cancel.check()
+    
+    with tempfile.TemporaryDirectory() as td:
+        in_path = os.path.join(td, "input.pdf")
+        with open(in_path, "wb") as f:
+            f.write(pdf_bytes)
+        out_path = os.path.join(td, "output.pdf")
+        
+        language, lang_desc = engine.ocr_language()
+        options = {
+            "language": language,
+            "force_ocr": True,
+            "quiet": True,  # 减少输出噪音
+        }
+        if pages:
+            options["pages"] = ",".join(str(p) for p in pages)
+        
+        try:
+            logger.info("正在进行 OCR 处理（%s）", lang_desc)
+            if not killable:
+                engine.ocrmypdf.ocr(in_path, out_path, **options)
+            else:
+                # Python API 无法中途停止：运行命令行版本，超时或取消时杀掉整个进程组
+                # （多一次解释器启动和 ocrmypdf 导入的开销，没有 cancel / timeout 时不用）
+                cmd = [sys.executable, "-m", "ocrmypdf", *_ocr_cli_args(options), in_path, out_path]
+                result = run_cancellable(cmd, cancel, timeout=timeout or None)
+                if result.returncode != 0:
+                    raise RuntimeError(result.stderr.strip() or f"ocrmypdf exit code {result.returncode}")
+            if cancel is not None:
+                cancel.check()
+            with open(out_path, "rb") as f:
+                ocr_result = f.read()
+                logger.info("OCR 处理完成")
+                return ocr_result
+        except ConversionCancelled:
+            raise
+        except FileNotFoundError as e:
+            logger.warning("OCR 失败: 缺少必要的工具 - %s", e)
+            return None
+        except Exception as e:
+            error_msg = str(e)
+            if "language data" in error_msg.lower():
+                logger.warning("OCR 失败: 缺少语言包（请运行 .\\verify_chinese_language.bat 检查，"
+                               "或运行 .\\download_chinese_traineddata.ps1 自动下载），将使用原始 PDF 继续处理")
+            else:
+                logger.warning("OCR 处理失败: %s，将使用原始 PDF 继续处理", e)
+            return None
+
+def pdf_bytes_to_markdown(pdf_bytes: bytes, table_engine: str = "pdfplumber", mode: str = "fast",
+                          ocr: bool = True, timings: StageTimings | None = None,
+                          pages: str | None = None, max_pages: int | None = None,
+                          images: bool = True, cancel: CancelToken | None = None,
+                          image_options: dict | None = None, fast_path: bool = True) -> tuple[str, list]:
+    """Convert PDF bytes to Markdown and per-page summaries, including images
+    (ProcessedImage: encoded bytes and format; data URLs are only built for JSON output).
+    table_engine selects the table extractor ("pdfplumber" or "pymupdf");
+    mode selects the extraction profile ("fast" or "layout");
+    ocr=False skips the OCR step even when OCR is available;
+    images=False skips image extraction;
+    image_options (ImageOptions or its dict form) sets image downscaling / re-encoding / thumbnails
+    (None: PDF2MD_IMAGE_* defaults);
+    fast_path=False disables the fast path for simple single-column text documents
+    (see extraction/classify.py);
+    cancel (a CancelToken) is checked between stages and pages and stops the OCR subprocess
+    (raises ConversionCancelled);
+    timings (a StageTimings) collects per-stage and per-page durations;
+    pages ("1-5,10") and max_pages restrict OCR and extraction to the selected pages
+    (page numbers in the summaries stay those of the original document;
+    raises PageSelectionError when the selection is invalid).
+    Returns (markdown_text, pages_summary).
+    pages_summary: list of PageSummary (page, text_len, table_count, table_details,
+    table_regions, tables_skipped, images and thumbnails when enabled; as_dict() gives the
+    JSON record)
+    """
+    # 0) 页码选择：只有所选页会被 OCR、加载和提取
+    selected = select_pages(pdf_bytes, pages, max_pages)
+
+    md_lines, summaries = convert_pages(pdf_bytes, selected, table_engine=table_engine, mode=mode, ocr=ocr,
+                                        images=images, timings=timings, cancel=cancel,
+                                        image_options=image_options, fast_path=fast_path)
+
+    log_extracted(summaries)
+    return join_markdown(md_lines, summaries), summaries
+
+
+def convert_pages(pdf_bytes: bytes, selected: list | None, table_engine: str = "pdfplumber", mode: str = "fast",
+                  ocr: bool = True, images: bool = True, timings: StageTimings | None = None,
+                  cancel: CancelToken | None = None, last_page: int | None = None,
+                  image_options: dict | None = None, fast_path: bool = True,
+                  plan: DocumentPlan | None = None) -> tuple[list, list]:
+    """OCR + 逐页提取 selected 中的页（None 表示全部页），返回 (Markdown 行, 每页摘要)。
+    分块转换时 last_page 为整个文档的最后一页页码（用它决定页间分隔），plan 为整个文档的
+    plan_document() 结果（快速路径和跨页页眉页脚的判断，见 extraction/classify.py、headers.py），
+    使各块的 Markdown 行按页序拼接后与整体转换的结果一致。"""
+    md_lines = []
+    summaries = []
+
+    # 1) 尝试 OCR 提升文本质量
+    target_bytes = pdf_bytes
+    if ocr and get_engine().ocr_available:
+        start = time.perf_counter()
+        ocr_bytes = ocr_pdf_bytes(pdf_bytes, pages=selected, cancel=cancel)
+        if timings is not None:
+            timings.add("ocr", time.perf_counter() - start)
+        if ocr_bytes:
+            target_bytes = ocr_bytes
+
+    # 2) 单遍处理每一页（布局 + 文本 + 表格 + 图片）
+    for result in get_engine().iter_pages(target_bytes, profile=mode, table_engine=table_engine, images=images,
+                                          timings=timings, pages=selected, cancel=cancel,
+                                          image_options=image_options, fast_path=fast_path, plan=plan):
+        if last_page is not None:
+            result["last"] = result["page"] == last_page
+        page_lines = render_page_markdown(result)
+        md_lines.extend(page_lines)
+        summaries.append(page_summary(result, page_lines))
+    return md_lines, summaries
+
+
+def log_extracted(summaries: list):
+    if summaries:
+        tables_skipped = sum(1 for p in summaries if p.tables_skipped)
+        logger.info("提取完成: %d 页，表格预筛选跳过 %d 页", len(summaries), tables_skipped,
+                    extra={"pages": len(summaries), "tables_skipped": tables_skipped})
+
+
+def join_markdown(md_lines: list, summaries: list) -> str:
+    """拼接 Markdown 行；没有文本但有图片时给出提示"""
+    markdown = "\n".join(md_lines)
+    if not markdown.strip() and any(p.images for p in summaries):
+        markdown = "[该 PDF 可能包含图片，未检测到文本。若需要文本，请考虑对 PDF 进行 OCR。]"
+    return markdown
+
+
+def _convert_isolated(pdf_bytes: bytes, **kwargs) -> tuple[str, list, StageTimings]:
+    """在受限子进程中执行的转换，连同分阶段计时一起返回"""
+    timings = StageTimings()
+    markdown, pages = pdf_bytes_to_markdown(pdf_bytes, timings=timings, **kwargs)
+    return markdown, pages, timings
+
+
+def convert_chunk(pdf_bytes: bytes, pages: list, last_page: int, **kwargs) -> tuple[list, list, StageTimings]:
+    """分块转换中的一块（同一文档中连续的若干页，已完成 OCR），连同分阶段计时一起返回"""
+    timings = StageTimings()
+    md_lines, summaries = convert_pages(pdf_bytes, pages, timings=timings, last_page=last_page, **kwargs)
+    return md_lines, summaries, timings
+
+
+def run_conversion(pdf_bytes: bytes, timings: StageTimings, profiler: str | None = None,
+                   request_id: str | None = None, cancel: CancelToken | None = None, **kwargs) -> tuple[str, list]:
+    """在工作线程中执行一次转换
+
+    profiler 不为空时在分析器下于当前线程运行（分析只能跟踪本进程）；
+    否则配置了 CPU / 内存上限时在受限子进程中运行，子进程的计时并入 timings。
+    cancel 被触发时抛出 ConversionCancelled（子进程模式下直接终止子进程）。
+    """
+    if profiler:
+        return profiling.run_profiled(request_id, profiler, pdf_bytes_to_markdown, pdf_bytes,
+                                      timings=timings, cancel=cancel, **kwargs)
+    if LIMITS.isolated:
+        markdown, pages, child_timings = run_limited(_convert_isolated, pdf_bytes, cancel=cancel, **kwargs)
+        timings.merge(child_timings)
+        return markdown, pages
+    return pdf_bytes_to_markdown(pdf_bytes, timings=timings, cancel=cancel, **kwargs)
+
+
+def list_selected_pages(pdf_bytes: bytes, pages: str | None = None, max_pages: int | None = None) -> list:
+    """所选页码列表（未选择时为全部页）"""
+    selected = select_pages(pdf_bytes, pages, max_pages)
+    if selected is not None:
+        return selected
+    return list(range(1, count_pages(pdf_bytes) + 1))
@@ -0,0 +1,38 @@
+"""
+统一的 PDF 提取核心
+
+/convert（backend/main.py）与 SmartPDFExtractor 共用同一套布局分析、文本清理、
+结构识别和表格引擎，通过 profile（"fast" / "layout"）选择不同的策略参数。
+"""
+
+from .profiles import ExtractionProfile, PROFILES, DEFAULT_PROFILE, get_profile
+from .layout import detect_content_area, detect_columns, text_block_bboxes, text_blocks
+from .cleaning import clean_text, is_noise_line, strip_running_lines
+from .headers import RunningLines, fingerprint, edge_lines, new_running_lines
+from .structure import detect_structure, is_section_heading
+from .tables import (
+    TableEngine, TABLE_ENGINES, DEFAULT_TABLE_ENGINE, get_table_engine,
+    find_table_regions, table_to_markdown, table_stats, table_shape,
+)
+from .timing import StageTimings, NULL_TIMINGS, STAGES
+from .images import (
+    ImageOptions, DEFAULT_IMAGE_OPTIONS, IMAGE_CACHE, ProcessedImage, process_image, resolve_image_options,
+)
+from .figures import find_figure_regions, submit_page_figures
+from .summary import (
+    PageSummary, PAGES_LAYOUTS, resolve_pages_layout, pages_payload, load_summaries, summaries_as_columns,
+    page_spans, byte_offsets,
+)
+from .offsets import find_headings, build_offset_index, summary_offset_index
+from .chunking import (
+    CHUNK_MAX_CHARS, CHUNK_OVERLAP, Chunk, MarkdownChunker, chunk_markdown, split_pages, validate_chunk_options,
+)
+from .cancel import CancelToken, ConversionCancelled, NEVER_CANCELLED, run_cancellable
+from .pages import PageSelectionError, parse_page_ranges, resolve_pages, count_pages, select_pages
+from .pipeline import (
+    iter_pages, process_page, extract_page_text, extract_page_images,
+    render_page_markdown, page_summary, process_simple_page, DocumentPlan, plan_document,
+)
+from .classify import FAST_PATH_SAMPLES, is_simple_document, use_fast_path
+from .ocr import setup_ocr_dependencies, list_ocr_languages, choose_ocr_language
+from .engine import ConverterEngine, get_engine
@@ -0,0 +1,139 @@
+"""
+协作式取消
+
+CancelToken 由请求处理方持有（客户端断开或调用取消接口时触发），转换流程在页与页之间、
+阶段与阶段之间调用 check()；外部子进程（ocrmypdf、nougat）通过 run_cancellable() 启动，
+取消时整个进程组被终止。未传入令牌时使用 NEVER_CANCELLED，开销几乎为零。
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+
+class ConversionCancelled(Exception):
+    """转换被取消（客户端断开或调用了取消接口）"""
+
+
+class CancelToken:
+    """线程安全的取消令牌，一个请求一个实例"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: List[subprocess.Popen] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "已取消"):
+        """触发取消，并终止所有已登记的子进程（可重复调用）"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            processes = list(self._processes)
+        for proc in processes:
+            _kill(proc)
+
+    def check(self):
+        """已取消时抛出 ConversionCancelled"""
+        if self._event.is_set():
+            raise ConversionCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """最多等待 timeout 秒，期间被取消则返回 True"""
+        return self._event.wait(timeout)
+
+    def register(self, proc: subprocess.Popen):
+        with self._lock:
+            if not self._event.is_set():
+                self._processes.append(proc)
+                return
+        _kill(proc)
+
+    def unregister(self, proc: subprocess.Popen):
+        with self._lock:
+            if proc in self._processes:
+                self._processes.remove(proc)
+
+
+class _NeverCancelled:
+    """不会被取消的占位实现"""
+
+    cancelled = False
+    reason = None
+
+    def check(self):
+        pass
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        return False
+
+    def register(self, proc):
+        pass
+
+    def unregister(self, proc):
+        pass
+
+
+NEVER_CANCELLED = _NeverCancelled()
+
+
+def _kill(proc: subprocess.Popen):
+    """终止子进程及其派生的进程（ocrmypdf 会启动 tesseract / gs 子进程）"""
+    if proc.poll() is not None:
+        return
+    try:
+        if sys.platform == "win32":
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_cancellable(cmd: List[str], cancel=None, timeout: Optional[float] = None,
+                    poll_interval: float = 0.2) -> subprocess.CompletedProcess:
+    """
+    与 subprocess.run(cmd, capture_output=True, text=True) 相同，但可以被取消
+
+    子进程在独立的进程组中运行；取消时杀掉整个进程组并抛出 ConversionCancelled，
+    超时时同样杀掉并抛出 subprocess.TimeoutExpired。
+    """
+    cancel = cancel or NEVER_CANCELLED
+    cancel.check()
+
+    popen_kwargs = {"start_new_session": True} if sys.platform != "win32" else {}
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                            encoding="utf-8", errors="replace", **popen_kwargs)
+    cancel.register(proc)
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel.cancelled:
+                    _kill(proc)
+                    proc.communicate()
+                    cancel.check()
+                if deadline is not None and time.monotonic() > deadline:
+                    _kill(proc)
+                    proc.communicate()
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        cancel.unregister(proc)
+
+    # 进程在运行中被 cancel() 直接杀掉时，communicate 会正常返回
+    cancel.check()
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
@@ -0,0 +1,169 @@
+"""
+按章节切分 Markdown（/convert?output=chunks，供 RAG / 向量化使用）
+
+转换时已经识别出标题（detect_structure），这里逐页接收 Markdown，按标题划分章节，
+章节内按段落累积到 max_chars 为止；超长段落再按行、句子、空白切开。相邻分块（同一章节内）
+重叠 overlap 个字符，重叠部分从段落或词的边界开始。每个分块带有页码范围和所在的标题路径。
+
+MarkdownChunker 是增量的：每加入一页就返回已经确定的分块，下游可以边转换边向量化。
+长度按字符计算（不依赖具体模型的分词器）；按 token 估算时中文约 1 字 1 token、英文约 4 字符 1 token。
+
+环境变量:
+    PDF2MD_CHUNK_MAX_CHARS   每个分块的最大字符数（默认 2000）
+    PDF2MD_CHUNK_OVERLAP     相邻分块的重叠字符数（默认 200）
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .offsets import HEADING_RE
+from .summary import PageSummary, page_spans
+
+
+CHUNK_MAX_CHARS = int(os.getenv("PDF2MD_CHUNK_MAX_CHARS", "2000"))
+CHUNK_OVERLAP = int(os.getenv("PDF2MD_CHUNK_OVERLAP", "200"))
+
+# 分块不能小于该值（标题路径、重叠都要占位置）
+MIN_CHUNK_CHARS = 100
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# 超长段落的切分点，依次尝试：换行、句末标点、空白
+_SPLIT_POINTS = (re.compile(r"\n"), re.compile(r"(?<=[。！？；])|(?<=[.!?;])\s+"), re.compile(r"\s+"))
+
+
+@dataclass(slots=True)
+class Chunk:
+    index: int
+    text: str
+    page_start: int
+    page_end: int
+    headings: Tuple[str, ...]  # 所在章节的标题路径（从一级标题到当前标题）
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "text": self.text,
+            "pages": [self.page_start, self.page_end],
+            "headings": list(self.headings),
+            "chars": len(self.text),
+        }
+
+
+def validate_chunk_options(max_chars: int, overlap: int) -> Tuple[int, int]:
+    """检查分块参数，无效时抛 ValueError"""
+    if max_chars < MIN_CHUNK_CHARS:
+        raise ValueError(f"chunk_max_chars 不能小于 {MIN_CHUNK_CHARS}")
+    if not 0 <= overlap <= max_chars // 2:
+        raise ValueError("chunk_overlap 必须在 0 到 chunk_max_chars 的一半之间")
+    return max_chars, overlap
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """把超过 max_chars 的段落切成若干段（优先在换行、句末、空白处切）"""
+    pieces = []
+    while len(text) > max_chars:
+        cut = 0
+        for pattern in _SPLIT_POINTS:
+            for match in pattern.finditer(text, 0, max_chars + 1):
+                if match.start() > 0:
+                    cut = match.end() if match.end() <= max_chars else match.start()
+            if cut:
+                break
+        cut = cut or max_chars
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _overlap_tail(text: str, overlap: int) -> str:
+    """分块末尾 overlap 个字符以内、从段落或词边界开始的部分"""
+    if overlap <= 0 or not text:
+        return ""
+    tail = text[-overlap:]
+    if len(tail) == len(text):
+        return tail
+    paragraph = tail.find("\n\n")
+    if paragraph >= 0:
+        return tail[paragraph + 2:]
+    space = re.search(r"\s", tail)
+    # CJK 文本没有空格：直接从字符处截断
+    return tail[space.end():] if space else tail
+
+
+def split_pages(text: str, summaries: Sequence[PageSummary]) -> List[Tuple[int, str]]:
+    """把若干连续页的 Markdown（各页的行以换行连接）按页切开，返回 [(页码, 该页 Markdown), ...]"""
+    return [(summary.page, text[start:end])
+            for summary, (start, end) in zip(summaries, page_spans(summaries)) if end > start]
+
+
+class MarkdownChunker:
+    """增量分块：add_page() 按页序加入 Markdown，返回已经确定的分块；finish() 返回剩余分块"""
+
+    def __init__(self, max_chars: int = CHUNK_MAX_CHARS, overlap: int = CHUNK_OVERLAP):
+        self.max_chars, self.overlap = validate_chunk_options(max_chars, overlap)
+        self.headings: List[str] = []
+        self.count = 0
+        self._parts: List[Tuple[str, int]] = []  # 当前分块的 (段落, 页码)
+        self._size = 0
+        self._section: Tuple[str, ...] = ()
+        self._has_content = False  # 当前分块是否有重叠以外的内容
+
+    def _emit(self, out: List[Chunk], keep_overlap: bool):
+        if not self._has_content:
+            self._parts, self._size = [], 0
+            return
+        text = "\n\n".join(part for part, _ in self._parts)
+        out.append(Chunk(self.count, text, self._parts[0][1], self._parts[-1][1], self._section))
+        self.count += 1
+        tail = _overlap_tail(text, self.overlap) if keep_overlap else ""
+        self._parts = [(tail, self._parts[-1][1])] if tail else []
+        self._size = len(tail)
+        self._has_content = False
+
+    def _add(self, block: str, page: int, out: List[Chunk]):
+        if self._parts and self._size + 2 + len(block) > self.max_chars:
+            self._emit(out, keep_overlap=True)
+            # 重叠部分加上本段仍然超长时，放弃重叠
+            if self._parts and self._size + 2 + len(block) > self.max_chars:
+                self._parts, self._size = [], 0
+        if not self._parts:
+            self._section = tuple(self.headings)
+        self._parts.append((block, page))
+        self._size += len(block) + (2 if len(self._parts) > 1 else 0)
+        self._has_content = True
+
+    def add_page(self, page: int, markdown: str) -> List[Chunk]:
+        out: List[Chunk] = []
+        for block in _PARAGRAPH_RE.split(markdown):
+            block = block.strip()
+            if not block:
+                continue
+            heading = HEADING_RE.match(block)
+            if heading:
+                # 新章节：之前的内容单独成块（不跨章节重叠），更新标题路径
+                self._emit(out, keep_overlap=False)
+                level = len(heading.group(1))
+                self.headings = self.headings[:level - 1] + [heading.group(2)]
+            for piece in _split_long(block, self.max_chars):
+                self._add(piece, page, out)
+        return out
+
+    def finish(self) -> List[Chunk]:
+        out: List[Chunk] = []
+        self._emit(out, keep_overlap=False)
+        return out
+
+
+def chunk_markdown(markdown: str, summaries: Sequence[PageSummary], max_chars: int = CHUNK_MAX_CHARS,
+                   overlap: int = CHUNK_OVERLAP) -> List[Chunk]:
+    """对完整的转换结果（pdf_bytes_to_markdown 的返回值）分块"""
+    chunker = MarkdownChunker(max_chars, overlap)
+    chunks = []
+    for page, text in split_pages(markdown, summaries):
+        chunks.extend(chunker.add_page(page, text))
+    chunks.extend(chunker.finish())
+    return chunks
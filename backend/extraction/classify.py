@@ -0,0 +1,126 @@
+"""
+文档分类：单栏纯文本文档走快速路径
+
+很多文档只是单栏正文，没有表格、图片和矢量图形。对它们来说，内容区域检测、200 条带的栏分析、
+逐栏裁剪（pdfplumber 逐字符解析）、表格预筛选和图片枚举都是白做。这里先用 PyMuPDF 抽查几页：
+
+- 没有内容图片（装饰性小图和蒙版不算，与 submit_page_images 的过滤一致）
+- 没有任何矢量路径（没有表格边线、图表，也没有下划线等）
+- 文本块没有左右并排（单栏，也没有边栏）
+
+只在要处理的页（pages= 选择的页）中抽查；分块转换时整个文档判断一次，各块共用结果（见 pipeline.plan_document）。
+抽查的页全部满足且有足够的文本时，整个文档改用 PyMuPDF get_text("blocks", sort=True)
+按阅读顺序逐页提取（仍做噪声清理和结构识别），不打开 pdfplumber。快速路径中每页仍按同样的条件
+核对一遍（都在 PyMuPDF 的 C 代码中完成，开销很小），未抽查到的页不满足时该页回到完整流程。
+
+只用于 "fast" 配置（layout 配置要的就是 pdfplumber layout=True 的排版）。
+按请求关闭：/convert?fast_path=false；全局关闭：PDF2MD_FAST_PATH_SAMPLES=0。
+
+环境变量:
+    PDF2MD_FAST_PATH_SAMPLES    抽查页数（默认 3：首页、中间页、末页；0 表示关闭快速路径）
+"""
+
+import logging
+import os
+from typing import List, Optional, Sequence
+
+from .images import is_decorative
+from .profiles import ExtractionProfile
+from .tables import has_vector_paths
+
+logger = logging.getLogger("pdf2md.extraction.classify")
+
+
+FAST_PATH_SAMPLES = int(os.getenv("PDF2MD_FAST_PATH_SAMPLES", "3"))
+
+# 抽查页的文本合计少于该字符数时不判定（几乎空白的文档走完整流程也很快）
+MIN_SAMPLE_CHARS = 200
+
+# 两个文本块在垂直方向重叠超过该值（pt）且水平方向不相交时视为并排（多栏 / 边栏）
+_SIDE_BY_SIDE_OVERLAP = 2.0
+
+
+def sample_pages(page_count: int, samples: int = FAST_PATH_SAMPLES) -> List[int]:
+    """均匀抽取的页序号（0 起始，含首页和末页）"""
+    if page_count <= 0 or samples <= 0:
+        return []
+    if samples >= page_count:
+        return list(range(page_count))
+    if samples == 1:
+        return [0]
+    return sorted({round(i * (page_count - 1) / (samples - 1)) for i in range(samples)})
+
+
+def has_content_images(page_pymupdf) -> bool:
+    """页面是否有需要提取的图片"""
+    page_images = page_pymupdf.get_images(full=True)
+    masks = {img[1] for img in page_images if img[1]}
+    return any(img[0] not in masks and not is_decorative(img[2], img[3]) for img in page_images)
+
+
+def is_single_column(bboxes: Sequence[tuple]) -> bool:
+    """文本块之间没有左右并排"""
+    ordered = sorted(bboxes, key=lambda b: b[1])
+    for i, (x0, y0, x1, y1) in enumerate(ordered):
+        for ox0, oy0, ox1, oy1 in ordered[i + 1:]:
+            if oy0 >= y1 - _SIDE_BY_SIDE_OVERLAP:
+                break
+            if ox0 >= x1 or ox1 <= x0:
+                return False
+    return True
+
+
+def page_is_plain(page_pymupdf) -> bool:
+    """没有图片和矢量路径"""
+    return not has_content_images(page_pymupdf) and not has_vector_paths(page_pymupdf)
+
+
+def simple_page_blocks(page_pymupdf, blocks: Optional[Sequence[tuple]] = None) -> Optional[list]:
+    """单栏纯文本页的文本块（按阅读顺序排序）；页面不满足条件时返回 None
+
+    blocks 为已经取出的该页文本块（未排序）时直接使用。
+    """
+    if not page_is_plain(page_pymupdf):
+        return None
+    if blocks is None:
+        blocks = [b for b in page_pymupdf.get_text("blocks", sort=True) if b[6] == 0]
+    else:
+        # 与 get_text("blocks", sort=True) 相同的顺序：按底边、再按左边
+        blocks = sorted(blocks, key=lambda b: (b[3], b[0]))
+    if not is_single_column([b[:4] for b in blocks]):
+        return None
+    return blocks
+
+
+def is_simple_document(doc_pymupdf, pages: Optional[Sequence[int]] = None, samples: int = FAST_PATH_SAMPLES) -> bool:
+    """抽查的页都是单栏纯文本时返回 True；pages 为要处理的页码列表（1 起始，None 表示全部页），只在其中抽查"""
+    page_numbers = list(pages) if pages else range(1, doc_pymupdf.page_count + 1)
+    chars = 0
+    for index in sample_pages(len(page_numbers), samples):
+        blocks = simple_page_blocks(doc_pymupdf.load_page(page_numbers[index] - 1))
+        if blocks is None:
+            return False
+        chars += sum(len(b[4]) for b in blocks)
+    return chars >= MIN_SAMPLE_CHARS
+
+
+def use_fast_path(doc_pymupdf, profile: ExtractionProfile, enabled: bool = True,
+                  pages: Optional[Sequence[int]] = None) -> bool:
+    """该文档（pages 为要处理的页码列表时只看这些页）是否走快速路径"""
+    if not enabled or not profile.simple_fast_path or doc_pymupdf is None or FAST_PATH_SAMPLES <= 0:
+        return False
+    try:
+        return is_simple_document(doc_pymupdf, pages)
+    except Exception as e:
+        logger.debug("文档分类失败，使用完整流程: %s", e)
+        return False
+
+
+def simple_page_text(page_pymupdf, blocks: Sequence[tuple], profile: ExtractionProfile) -> str:
+    """快速路径中单页的原始文本（blocks 为 simple_page_blocks() 的结果，按配置排除上下页眉页脚带）"""
+    cutoff = profile.header_footer_cutoff
+    if cutoff:
+        rect = page_pymupdf.rect
+        top, bottom = rect.y0 + rect.height * cutoff, rect.y1 - rect.height * cutoff
+        blocks = [b for b in blocks if top <= (b[1] + b[3]) / 2 <= bottom]
+    return "\n".join(b[4] for b in blocks)
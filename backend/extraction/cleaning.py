@@ -0,0 +1,84 @@
+"""
+文本清理：去除噪声行和页眉页脚、过滤碎片、修复连字符断行
+"""
+
+from typing import AbstractSet, Tuple
+
+from .headers import EDGE_LINES, fingerprint
+from .profiles import ExtractionProfile, FRAGMENT_KEEP_KEYWORDS
+
+
+def is_noise_line(stripped: str, profile: ExtractionProfile) -> bool:
+    """判断（已去除首尾空白的）行是否为噪声"""
+    if not stripped or len(stripped) <= 2:
+        return True
+
+    if profile.noise_re is not None and profile.noise_re.match(stripped):
+        return True
+
+    # 跳过碎片化的短行（可能是边栏或被切断的文本）
+    if profile.drop_fragments and len(stripped) < 20:
+        if not any(keyword in stripped for keyword in FRAGMENT_KEEP_KEYWORDS):
+            # 没有句末标点结尾的短行视为被切断的文本
+            if not stripped.endswith(('.', '!', '?', ':', ';', ',', ')')):
+                return True
+
+    return False
+
+
+def strip_running_lines(text: str, running: AbstractSet[str], profile: ExtractionProfile) -> Tuple[str, int]:
+    """删除文本最上面 / 最下面 EDGE_LINES 行中的页眉页脚（running 为本页命中的指纹，见 RunningLines.page_running）
+
+    中间的行即使指纹相同也保留。返回 (文本, 开头删掉的行数)，后者交给 detect_structure()，
+    使"页面开头几行"的判断与不删除时相同（本来就会被当作噪声去掉的行不计入）。
+    """
+    if not running or not text:
+        return text, 0
+    lines = text.split('\n')
+    nonempty = [i for i, line in enumerate(lines) if line.strip()]
+    edges = nonempty[:EDGE_LINES] + nonempty[-EDGE_LINES:]
+    drop = {i for i in edges if fingerprint(lines[i].strip()) in running}
+    if not drop:
+        return text, 0
+    first_kept = next((i for i in nonempty if i not in drop and not is_noise_line(lines[i].strip(), profile)),
+                      len(lines))
+    removed_top = sum(1 for i in drop if i < first_kept and not is_noise_line(lines[i].strip(), profile))
+    return '\n'.join(line for i, line in enumerate(lines) if i not in drop), removed_top
+
+
+def clean_text(text: str, profile: ExtractionProfile) -> str:
+    """清理文本：去除噪声、压缩空格、修复连字符断行（页眉页脚先由 strip_running_lines() 删除）"""
+    if not text:
+        return ""
+
+    lines = text.split('\n')
+    cleaned = []
+    i = 0
+
+    while i < len(lines):
+        line = lines[i].rstrip()
+
+        if is_noise_line(line.strip(), profile):
+            i += 1
+            continue
+
+        # 压缩空格
+        line = ' '.join(line.split())
+
+        # 修复连字符断行
+        if line.endswith('-') and i + 1 < len(lines):
+            next_line = lines[i + 1].strip()
+            if next_line and next_line[0].islower():
+                line = line[:-1] + next_line.split()[0]
+                remaining = ' '.join(next_line.split()[1:])
+                if remaining:
+                    lines[i + 1] = remaining
+                else:
+                    i += 1
+
+        if line:
+            cleaned.append(line)
+
+        i += 1
+
+    return '\n'.join(cleaned)
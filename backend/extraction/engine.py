@@ -0,0 +1,134 @@
+"""
+长期存活的转换引擎
+
+每次转换都要用到的配置（提取配置、表格引擎实例、默认图片参数）只在引擎创建时准备一次，
+OCR 能力（ocrmypdf 是否可用、已安装的语言包、选用的语言）在第一次用到时检测一次，
+之后的转换直接复用，请求本身不再有初始化开销。
+
+生命周期：
+- 每个进程一个引擎（get_engine()），首次使用时创建；API 进程和 worker 进程在启动时
+  调用 get_engine() 预热，受限子进程（PDF2MD_CPU_LIMIT_S 等）在第一次转换时各自创建
+- 引擎创建后只读（配置冻结、表格引擎无状态），线程池中的各线程共享同一个实例，无需加锁；
+  唯一的例外是 OCR 检测，在锁内只做一次（调用方也可以在启动时读取 ocr_available 提前完成）；
+  fork 出的子进程继承父进程的引擎，同样可以直接使用
+- PDF 文档对象（PyMuPDF / pdfplumber）不是线程安全的，不放进引擎：每次转换各自打开，
+  转换结束即关闭（见 pipeline.iter_pages）
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .images import ImageOptions, resolve_image_options
+from .ocr import choose_ocr_language, list_ocr_languages, load_ocrmypdf, log_ocr_languages
+from .pipeline import DocumentPlan, iter_pages, plan_document
+from .profiles import PROFILES, ExtractionProfile, get_profile
+from .tables import TABLE_ENGINES, TableEngine, get_table_engine
+
+
+class ConverterEngine:
+    """复用配置和表格引擎的转换入口；多个线程可以同时调用 iter_pages()"""
+
+    def __init__(self, image_options: Union[ImageOptions, Dict[str, Any], None] = None):
+        self.profiles: Dict[str, ExtractionProfile] = dict(PROFILES)
+        self.table_engines: Dict[str, TableEngine] = {name: get_table_engine(name) for name in TABLE_ENGINES}
+        self.image_options = resolve_image_options(image_options)
+        # 经任务队列传来的 dict 形式图片参数 → ImageOptions（取值组合很少，直接缓存）
+        self._image_options_cache: Dict[tuple, ImageOptions] = {}
+        # OCR 能力：第一次用到时检测（导入 ocrmypdf、启动 tesseract 列出语言包），之后复用
+        self._ocr_lock = threading.Lock()
+        self._ocr_detected = False
+        self._ocrmypdf = None
+        self._ocr_languages: List[str] = []
+        self._ocr_language: Optional[Tuple[str, str]] = None
+        # 缓存命中回调 (缓存名, 是否命中)，由 API 接到指标上（引擎本身不依赖 backend.metrics）
+        self.on_cache_lookup: Optional[Callable[[str, bool], None]] = None
+
+    def profile(self, profile: Union[str, ExtractionProfile, None] = None) -> ExtractionProfile:
+        if isinstance(profile, str) and profile in self.profiles:
+            return self.profiles[profile]
+        return get_profile(profile)
+
+    def table_engine(self, name: Union[str, TableEngine, None]) -> Optional[TableEngine]:
+        """共享的表格引擎实例；None 表示不提取表格，未知名称抛出 ValueError"""
+        if name is None or isinstance(name, TableEngine):
+            return name
+        engine = self.table_engines.get(name)
+        return engine if engine is not None else get_table_engine(name)
+
+    def resolve_image_options(self, value: Union[ImageOptions, Dict[str, Any], None]) -> ImageOptions:
+        if value is None:
+            return self.image_options
+        if isinstance(value, ImageOptions):
+            return value
+        key = tuple(sorted(value.items()))
+        options = self._image_options_cache.get(key)
+        if options is None:
+            options = self._image_options_cache[key] = resolve_image_options(value)
+        return options
+
+    def detect_ocr(self):
+        """检测 OCR 能力（只做一次；启动时调用可以避免第一个 OCR 请求承担检测开销）"""
+        if self._ocr_detected:
+            return
+        with self._ocr_lock:
+            if self._ocr_detected:
+                return
+            self._ocrmypdf = load_ocrmypdf()
+            if self._ocrmypdf is not None:
+                self._ocr_languages = list_ocr_languages()
+                log_ocr_languages(self._ocr_languages)
+            self._ocr_detected = True
+
+    @property
+    def ocr_available(self) -> bool:
+        """OCRmyPDF 及其依赖是否可用"""
+        self.detect_ocr()
+        return self._ocrmypdf is not None
+
+    @property
+    def ocrmypdf(self):
+        """ocrmypdf 模块（不可用时为 None）"""
+        self.detect_ocr()
+        return self._ocrmypdf
+
+    def ocr_languages(self) -> List[str]:
+        """Tesseract 已安装的语言包（OCR 不可用时为空）"""
+        self.detect_ocr()
+        return self._ocr_languages
+
+    def ocr_language(self) -> Tuple[str, str]:
+        """OCR 语言参数及其说明（按可用的语言包选择一次，之后复用）"""
+        language = self._ocr_language
+        if self.on_cache_lookup is not None:
+            self.on_cache_lookup("ocr_languages", language is not None)
+        if language is None:
+            language = self._ocr_language = choose_ocr_language(self.ocr_languages())
+        return language
+
+    def plan_document(self, pdf_bytes: bytes, profile="fast", pages: Optional[Sequence[int]] = None,
+                      fast_path: bool = True) -> DocumentPlan:
+        """与 pipeline.plan_document() 相同（分块转换前对整个文档调用一次）"""
+        return plan_document(pdf_bytes, profile=self.profile(profile), pages=pages, fast_path=fast_path)
+
+    def iter_pages(self, pdf_bytes: bytes, profile="fast", table_engine: Optional[str] = "pdfplumber",
+                   images: bool = True, timings=None, pages: Optional[Sequence[int]] = None,
+                   cancel=None, image_options=None, fast_path: bool = True,
+                   plan: Optional[DocumentPlan] = None) -> Iterator[Dict[str, Any]]:
+        """与 pipeline.iter_pages() 相同，但使用引擎中预先准备好的配置和表格引擎"""
+        return iter_pages(pdf_bytes, profile=self.profile(profile), table_engine=self.table_engine(table_engine),
+                          images=images, timings=timings, pages=pages, cancel=cancel,
+                          image_options=self.resolve_image_options(image_options), fast_path=fast_path, plan=plan)
+
+
+_engine: Optional[ConverterEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> ConverterEngine:
+    """本进程的转换引擎（首次调用时创建）"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ConverterEngine()
+    return _engine
@@ -0,0 +1,216 @@
+"""
+矢量图形（图表、流程图、示意图）检测与渲染
+
+用矢量路径画出的图形不是内嵌图片，get_images 取不到。这里把页面绘图列表中相邻的路径聚类成
+图形区域，排除表格边线区域、整页背景 / 边框和零散的下划线、高亮框，再只渲染这些区域
+（page.get_pixmap(clip=...)），不需要光栅化整页：
+
+- 分辨率不超过 PDF2MD_FIGURE_DPI，且按图片的 max_dim 限制，不会渲染出缩放时又被丢掉的像素
+- 渲染在页面线程完成（PyMuPDF 对象不能跨线程），PNG / WebP 编码交给图片线程池；
+  各页分块本身由调度器并行执行
+- 结果按（区域内的路径、文字和光栅图片内容, 分辨率, 图片参数）缓存，每页重复的矢量 logo 只渲染一次
+
+需要开启（PDF2MD_FIGURE_DPI）：开启后每页都要做表格预筛选和一次绘图列表聚类，即使不提取表格。
+
+环境变量:
+    PDF2MD_FIGURE_DPI         渲染分辨率上限（默认 0，不检测矢量图形；建议 150）
+    PDF2MD_FIGURE_MIN_SIZE    图形区域宽、高的最小值（pt，默认 72，即 1 英寸）
+    PDF2MD_FIGURE_MIN_PATHS   图形区域至少包含的路径数（默认 4）
+"""
+
+import hashlib
+import logging
+import os
+from concurrent.futures import Future
+from typing import List, Sequence, Tuple
+
+from .images import DEFAULT_IMAGE_OPTIONS, ImageOptions, cached_future, submit_pixels
+from .tables import Region
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+
+FIGURE_DPI = float(os.getenv("PDF2MD_FIGURE_DPI", "0"))
+FIGURE_MIN_SIZE = float(os.getenv("PDF2MD_FIGURE_MIN_SIZE", "72"))
+FIGURE_MIN_PATHS = int(os.getenv("PDF2MD_FIGURE_MIN_PATHS", "4"))
+
+# 覆盖页面面积超过该比例的路径视为背景或边框
+_BACKGROUND_RATIO = 0.8
+# 与表格候选区域的交并比超过该值的图形视为表格（用交并比而不是包含关系：
+# 页面边框也会被预筛选当作整页的表格候选，不能因此排除其中所有图形）
+_TABLE_OVERLAP = 0.5
+# 紧贴图形的坐标轴标签、图例文字（一行以内）一起渲染
+_LABEL_GAP = 12
+# 渲染分辨率下限（图形很大且 max_dim 很小时）
+_MIN_DPI = 36
+
+logger = logging.getLogger("pdf2md.extraction.figures")
+
+
+def _iou(a: Region, b: Region) -> float:
+    """两个区域的交并比"""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def _is_grid(paths: list) -> bool:
+    """只由水平 / 垂直直线和无填充矩形组成：表格边线（没有填充、曲线或斜线的图表几乎不存在）"""
+    for path in paths:
+        if path.get("fill") is not None:
+            return False
+        for item in path["items"]:
+            if item[0] == "re":
+                continue
+            if item[0] != "l":
+                return False
+            (ax, ay), (bx, by) = item[1], item[2]
+            if abs(ax - bx) > 1 and abs(ay - by) > 1:
+                return False
+    return True
+
+
+def find_figure_regions(page_pymupdf, exclude: Sequence[Region] = (), tolerance: float = 5,
+                        min_size: float = FIGURE_MIN_SIZE,
+                        min_paths: int = FIGURE_MIN_PATHS) -> List[Tuple[Region, list]]:
+    """把相邻的矢量路径聚类成图形区域，返回 [((x0, y0, x1, y1), 区域内的路径), ...]（按位置排序）
+
+    exclude 为表格候选区域（见 tables.find_table_regions），与其基本重合的区域不算图形；
+    只由横竖直线组成的区域（表格边线）也不算。
+    """
+    get_drawings = getattr(page_pymupdf, "get_cdrawings", None) or page_pymupdf.get_drawings
+    page_rect = page_pymupdf.rect
+    max_area = page_rect.width * page_rect.height * _BACKGROUND_RATIO
+
+    clusters = []  # [x0, y0, x1, y1, 路径列表]
+    for path in get_drawings():
+        if not path.get("items"):
+            continue
+        x0, y0, x1, y1 = tuple(path["rect"])
+        if (x1 - x0) * (y1 - y0) >= max_area:
+            continue
+        for cluster in clusters:
+            if (x0 <= cluster[2] + tolerance and x1 >= cluster[0] - tolerance and
+                    y0 <= cluster[3] + tolerance and y1 >= cluster[1] - tolerance):
+                cluster[0] = min(cluster[0], x0)
+                cluster[1] = min(cluster[1], y0)
+                cluster[2] = max(cluster[2], x1)
+                cluster[3] = max(cluster[3], y1)
+                cluster[4].append(path)
+                break
+        else:
+            clusters.append([x0, y0, x1, y1, [path]])
+
+    # 合并扩张后重叠的区域，直到稳定
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(clusters)):
+            for j in range(i + 1, len(clusters)):
+                a, b = clusters[i], clusters[j]
+                if (a[0] <= b[2] + tolerance and a[2] >= b[0] - tolerance and
+                        a[1] <= b[3] + tolerance and a[3] >= b[1] - tolerance):
+                    clusters[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]), a[4] + b[4]]
+                    del clusters[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    figures = []
+    for x0, y0, x1, y1, paths in clusters:
+        region = (x0, y0, x1, y1)
+        if x1 - x0 < min_size or y1 - y0 < min_size or len(paths) < min_paths:
+            continue
+        if _is_grid(paths) or any(_iou(region, table) > _TABLE_OVERLAP for table in exclude):
+            continue
+        figures.append((region, paths))
+    figures.sort(key=lambda f: (f[0][1], f[0][0]))
+    return figures
+
+
+def _with_labels(region: Region, words: list, page_rect) -> Region:
+    """把紧贴区域外侧的文字（坐标轴刻度、图例）并入区域（只扩展一次，不会连带吞进正文段落）"""
+    x0, y0, x1, y1 = region
+    for wx0, wy0, wx1, wy1, *_ in words:
+        cx, cy = (wx0 + wx1) / 2, (wy0 + wy1) / 2
+        below_or_above = region[0] <= cx <= region[2] and (
+            0 <= wy0 - region[3] <= _LABEL_GAP or 0 <= region[1] - wy1 <= _LABEL_GAP)
+        beside = region[1] <= cy <= region[3] and (
+            0 <= wx0 - region[2] <= _LABEL_GAP or 0 <= region[0] - wx1 <= _LABEL_GAP)
+        if below_or_above or beside:
+            x0, y0, x1, y1 = min(x0, wx0), min(y0, wy0), max(x1, wx1), max(y1, wy1)
+    return (max(page_rect.x0, x0 - 2), max(page_rect.y0, y0 - 2),
+            min(page_rect.x1, x1 + 2), min(page_rect.y1, y1 + 2))
+
+
+def _page_rasters(page_pymupdf) -> List[Tuple[Region, bytes]]:
+    """页面上的光栅图片 [(位置, 内容摘要), ...]
+
+    有 xref 的图片对原始（未解码的）数据流求哈希；内联图片没有 xref，改用 PyMuPDF 计算的像素摘要。
+    """
+    infos = page_pymupdf.get_image_info(xrefs=True)
+    if any(not info["xref"] for info in infos):
+        infos = page_pymupdf.get_image_info(hashes=True, xrefs=True)
+    doc = page_pymupdf.parent
+    rasters = []
+    for info in infos:
+        if info["xref"]:
+            digest = hashlib.blake2b(doc.xref_stream_raw(info["xref"]), digest_size=16).digest()
+        else:
+            digest = info["digest"]
+        rasters.append((tuple(info["bbox"]), digest))
+    return rasters
+
+
+def _digest(page_pymupdf, region: Region, paths: list, rasters: Sequence[Tuple[Region, bytes]]) -> str:
+    """区域内容指纹：路径（坐标、颜色、填充）、区域内的文字和与区域相交的光栅图片"""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        h.update(repr((path.get("items"), path.get("fill"), path.get("color"), path.get("width"))).encode())
+    h.update(page_pymupdf.get_text("text", clip=region).encode())
+    for bbox, digest in rasters:
+        if _iou(bbox, region) > 0:
+            h.update(repr(tuple(round(v, 1) for v in bbox)).encode())
+            h.update(digest)
+    return h.hexdigest()
+
+
+def submit_page_figures(page_pymupdf, exclude: Sequence[Region] = (),
+                        image_options: ImageOptions = DEFAULT_IMAGE_OPTIONS, dpi: float = FIGURE_DPI) -> List[Future]:
+    """检测并渲染单页的矢量图形，编码交给图片线程池；返回 Future 列表（结果为 ProcessedImage）"""
+    if not dpi or fitz is None:
+        return []
+    figures = find_figure_regions(page_pymupdf, exclude)
+    if not figures:
+        return []
+
+    words = page_pymupdf.get_text("words")
+    rasters = _page_rasters(page_pymupdf)
+    jobs = []
+    for region, paths in figures:
+        region = _with_labels(region, words, page_pymupdf.rect)
+        longest = max(region[2] - region[0], region[3] - region[1])
+        render_dpi = dpi
+        if image_options.max_dim:
+            render_dpi = max(_MIN_DPI, min(dpi, image_options.max_dim * 72 / longest))
+        key = ("figure", _digest(page_pymupdf, region, paths, rasters), round(render_dpi, 1), image_options)
+        cached = cached_future(key)
+        if cached is not None:
+            jobs.append(cached)
+            continue
+
+        zoom = render_dpi / 72
+        pix = page_pymupdf.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=fitz.Rect(region), alpha=False)
+        if pix.n != 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        jobs.append(submit_pixels(pix.samples, pix.width, pix.height, key, image_options,
+                                  png=lambda pix=pix: pix.tobytes("png")))
+    logger.debug("第 %d 页渲染 %d 个矢量图形", page_pymupdf.number + 1, len(jobs))
+    return jobs
@@ -0,0 +1,167 @@
+"""
+跨页页眉页脚检测：页面顶部 / 底部重复出现的行
+
+固定的噪声正则和 5% / 95% 截断只能去掉页码、arXiv 编号这类格式固定的内容，
+论文和书籍的页眉标题（期刊名、作者、章节名）在截断带以外时会混进正文。这里在文档级别统计
+每页最上面和最下面几行的指纹（空白归一、小写，行首行尾的数字视为页码忽略），
+出现在足够多页上的指纹视为页眉页脚。
+
+所选的每一页都计入统计，而且是增量的，不需要先扫描整个文档：按页序逐页计入，第 p 页按它前后
+各 PDF2MD_HEADER_FOOTER_WINDOW / 2 页的统计判定（最多往后多读这么多页）。比例按窗口计算，
+长文档中按章节变化的页眉在该章内也能判定；窗口只取决于页序，分块转换和整体转换对同一页的清理结果相同。
+
+清理时只删除页面最上面 / 最下面几行中命中的行（cleaning.strip_running_lines），
+正文中间恰好与页眉相同的行保留；整页重复的页面（正文也相同）不参与统计。
+
+环境变量:
+    PDF2MD_HEADER_FOOTER_RATIO      至少出现在窗口内多大比例的页上才视为页眉页脚（默认 0.4，0 表示关闭）
+    PDF2MD_HEADER_FOOTER_MIN_PAGES  至少出现的页数（默认 3）
+    PDF2MD_HEADER_FOOTER_WINDOW     每页按前后共多少页统计（默认 20；0 表示整个文档，
+                                    此时处理第一页前要先读完所有页）
+"""
+
+import logging
+import math
+import os
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set
+
+from .layout import text_blocks
+
+logger = logging.getLogger("pdf2md.extraction.headers")
+
+
+HEADER_FOOTER_RATIO = float(os.getenv("PDF2MD_HEADER_FOOTER_RATIO", "0.4"))
+HEADER_FOOTER_MIN_PAGES = int(os.getenv("PDF2MD_HEADER_FOOTER_MIN_PAGES", "3"))
+HEADER_FOOTER_WINDOW = int(os.getenv("PDF2MD_HEADER_FOOTER_WINDOW", "20"))
+
+# 每页顶部、底部各取几行
+EDGE_LINES = 2
+# 超过该长度的行不会是页眉页脚（也不为它计算指纹）
+MAX_LINE_LEN = 120
+
+# 指纹两端去掉的字符（页码）
+_EDGE_NUMBER_CHARS = "0123456789 "
+
+
+def fingerprint(line: str) -> Optional[str]:
+    """行的指纹（空白归一、小写、去掉两端的页码）；太短或太长的行返回 None
+
+    每一行清理时都要计算，只用 str 的内置方法，不用正则。
+    """
+    fp = " ".join(line.lower().split()).strip(_EDGE_NUMBER_CHARS)
+    if not 3 <= len(fp) <= MAX_LINE_LEN:
+        return None
+    return fp
+
+
+def _page_lines(blocks: Sequence[tuple]) -> List[str]:
+    """页面上的非空行，从上到下（按文本块的位置排序）"""
+    lines: List[str] = []
+    for b in sorted(blocks, key=lambda b: (b[1], b[0])):
+        lines += [line for line in b[4].splitlines() if line.strip()]
+    return lines
+
+
+def _edge_slice(lines: Sequence[str], count: int) -> int:
+    """两头各取的行数：中间至少留一行，只有一两行的页不取"""
+    return max(0, min(count, (len(lines) - 1) // 2))
+
+
+def edge_lines(blocks: Sequence[tuple], count: int = EDGE_LINES) -> List[str]:
+    """页面最上面和最下面各 count 行（blocks 为 get_text("blocks") 的文本块）
+
+    行数很少的页两头少取，中间至少留一行，整页内容不会都成为页眉页脚候选。
+    """
+    lines = _page_lines(blocks)
+    k = _edge_slice(lines, count)
+    return lines[:k] + lines[len(lines) - k:] if k else []
+
+
+class RunningLines:
+    """一个文档的页眉页脚统计：按页序逐页计入所选的每一页，每页按它前后 window 页的统计判定
+
+    第 p 页的集合只取决于页序（p 前后各 window // 2 页），与是否分块、先处理哪一页无关：
+    分块转换时各块（不同线程）共用同一个实例，在锁内按页序推进统计；某块先处理到后面的页时，
+    由它补上前面还没计入的页（用它自己的文档对象取文本块），结果与整体转换一致。
+    往后多读的页（最多 window // 2 页）的文本块留在 blocks 中，处理到该页时取走，不会多提取一次。
+    正文（顶部 / 底部行以外的部分）与前面某页完全相同的页不计入：整页重复的是内容而不是页眉页脚。
+    """
+
+    def __init__(self, page_numbers: Sequence[int], ratio: float = HEADER_FOOTER_RATIO,
+                 min_pages: int = HEADER_FOOTER_MIN_PAGES, window: int = HEADER_FOOTER_WINDOW):
+        self.page_numbers = list(page_numbers)
+        self._index = {page: i for i, page in enumerate(self.page_numbers)}
+        self.ratio = ratio
+        self.min_pages = max(min_pages, 2)
+        self.half = window // 2 if window > 0 else len(self.page_numbers)
+        self.blocks: Dict[int, list] = {}  # 提前读取的页的文本块（take_blocks）
+        self._lock = threading.Lock()
+        self._edges: List[FrozenSet[str]] = []  # 按页序：每页顶部 / 底部行的指纹
+        self._bodies: Set[int] = set()
+        self._page_sets: Dict[int, FrozenSet[str]] = {}  # 页码 → 清理该页时的指纹集合
+
+    def _fingerprints(self, blocks: Sequence[tuple]) -> FrozenSet[str]:
+        """一页顶部 / 底部行的指纹；正文与前面某页相同的页返回空集"""
+        lines = _page_lines(blocks)
+        k = _edge_slice(lines, EDGE_LINES)
+        body = hash(tuple(" ".join(line.split()) for line in lines[k:len(lines) - k]))
+        if body in self._bodies:
+            return frozenset()
+        self._bodies.add(body)
+        edges = lines[:k] + lines[len(lines) - k:] if k else []
+        return frozenset(fingerprint(line) for line in edges) - {None}
+
+    def _count_to(self, last: int, index: int, blocks: Sequence[tuple], doc_pymupdf):
+        """按页序计入到第 last 个所选页；第 index 个（当前页）用 blocks，其余页从 doc_pymupdf 取"""
+        while len(self._edges) <= last:
+            i = len(self._edges)
+            page_num = self.page_numbers[i]
+            if i == index:
+                page_blocks = blocks
+            else:
+                try:
+                    page_blocks = text_blocks(doc_pymupdf.load_page(page_num - 1))
+                except Exception as e:
+                    logger.debug("第 %d 页页眉页脚统计失败: %s", page_num, e)
+                    page_blocks = []
+                if i > index:
+                    self.blocks[page_num] = page_blocks
+            self._edges.append(self._fingerprints(page_blocks))
+
+    def take_blocks(self, page: int) -> Optional[list]:
+        """统计时提前取出的该页文本块（只能取一次）；没有时返回 None"""
+        return self.blocks.pop(page, None)
+
+    def page_running(self, page: int, blocks: Sequence[tuple], doc_pymupdf) -> FrozenSet[str]:
+        """计入本页，返回清理本页时使用的指纹：只取本页顶部 / 底部行命中的，正文中恰好相同的行不受影响
+
+        doc_pymupdf 为调用方自己的文档对象，用于读取还没计入的页。
+        """
+        index = self._index.get(page)
+        if index is None:
+            return frozenset()
+        with self._lock:
+            running = self._page_sets.get(page)
+            if running is None:
+                first = max(0, index - self.half)
+                last = min(len(self.page_numbers) - 1, index + self.half)
+                self._count_to(last, index, blocks, doc_pymupdf)
+                counts = Counter(fp for edges in self._edges[first:last + 1] for fp in edges)
+                threshold = max(self.min_pages, math.ceil(self.ratio * (last - first + 1)))
+                running = frozenset(fp for fp, count in counts.items() if count >= threshold)
+                self._page_sets[page] = running
+        if not running or not blocks:
+            return frozenset()
+        return running.intersection(fingerprint(line) for line in edge_lines(blocks))
+
+
+def new_running_lines(doc_pymupdf, pages: Optional[Sequence[int]] = None) -> Optional[RunningLines]:
+    """为整个转换（pages 为所选页码列表，None 表示全部页）创建检测器；未启用或没有 PyMuPDF 时返回 None
+
+    分块转换时对整个文档调用一次（见 pipeline.plan_document），各块共用。
+    """
+    if HEADER_FOOTER_RATIO <= 0 or doc_pymupdf is None:
+        return None
+    return RunningLines(list(pages) if pages else range(1, doc_pymupdf.page_count + 1))
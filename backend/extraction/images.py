@@ -0,0 +1,343 @@
+"""
+图片后处理：缩放、转码、缩略图
+
+doc.extract_image 返回的是 PDF 中原样存放的图片（600 DPI 整页扫描、JBIG2 / CCITT 转出的 PNG、
+CMYK JPEG……），直接放进响应既大又慢。按配置（默认关闭，响应中仍是原图）把它们缩放到最长边
+不超过 max_dim，重新编码为 WebP / JPEG / PNG，并可生成缩略图：
+
+- 在线程池中处理（Pillow 解码、缩放和编码时释放 GIL），页面线程继续做文本和表格
+- 结果按 (图片内容哈希, 参数) 缓存，重复出现的 logo、页眉图片只处理一次
+- 处理后反而更大且无需缩放时保留原图；未安装 Pillow 时原样返回
+
+环境变量（也可按请求通过 /convert 的查询参数覆盖）:
+    PDF2MD_IMAGE_FORMAT     original（默认：保持原格式，MAX_DIM 为 0 且不要缩略图时完全不处理）/
+                            auto（WebP，黑白图用 PNG）/ webp / jpeg / png
+    PDF2MD_IMAGE_MAX_DIM    最长边像素上限（默认 0，不缩放；建议 1600）
+    PDF2MD_IMAGE_QUALITY    WebP / JPEG 质量（默认 80）
+    PDF2MD_IMAGE_THUMBNAIL  缩略图最长边（默认 0，不生成）
+    PDF2MD_IMAGE_MIN_DIM    宽或高小于该像素数的图片视为装饰（间隔图、项目符号等），不提取（默认 8，0 表示不过滤）
+    PDF2MD_IMAGE_MIN_AREA   像素面积小于该值的图片不提取（默认 1024，即 32×32；0 表示不过滤）
+    PDF2MD_IMAGE_WORKERS    处理线程数（默认 min(4, CPU 核数)）
+    PDF2MD_IMAGE_CACHE_MB   处理结果缓存大小（默认 64）
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+IMAGE_FORMATS = ("auto", "webp", "jpeg", "png", "original")
+
+# 浏览器可以直接显示的原始格式（其余如 jpx、jbig2、tiff 必须转码）
+_BROWSER_FORMATS = {"png", "jpeg", "jpg", "gif", "webp"}
+
+_MIME = {"jpg": "jpeg"}
+
+
+@dataclass(frozen=True)
+class ImageOptions:
+    format: str = "original"
+    max_dim: int = 0
+    quality: int = 80
+    thumbnail: int = 0
+
+    @classmethod
+    def from_env(cls) -> "ImageOptions":
+        return cls(
+            format=os.getenv("PDF2MD_IMAGE_FORMAT", "original").lower(),
+            max_dim=int(os.getenv("PDF2MD_IMAGE_MAX_DIM", "0")),
+            quality=int(os.getenv("PDF2MD_IMAGE_QUALITY", "80")),
+            thumbnail=int(os.getenv("PDF2MD_IMAGE_THUMBNAIL", "0")),
+        ).validate()
+
+    def validate(self) -> "ImageOptions":
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"未知的图片格式: {self.format}（可选: {', '.join(IMAGE_FORMATS)}）")
+        if self.max_dim < 0 or self.thumbnail < 0:
+            raise ValueError("图片尺寸不能为负数")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("图片质量必须在 1-100 之间")
+        return self
+
+    def with_overrides(self, format: Optional[str] = None, max_dim: Optional[int] = None,
+                       quality: Optional[int] = None, thumbnail: Optional[int] = None) -> "ImageOptions":
+        """按请求参数覆盖（None 表示沿用），参数无效时抛 ValueError"""
+        overrides = {"format": format.lower() if format else None, "max_dim": max_dim, "quality": quality,
+                     "thumbnail": thumbnail}
+        return replace(self, **{k: v for k, v in overrides.items() if v is not None}).validate()
+
+    @property
+    def passthrough(self) -> bool:
+        """不需要解码（原样返回）"""
+        return self.format == "original" and not self.max_dim and not self.thumbnail
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+DEFAULT_IMAGE_OPTIONS = ImageOptions.from_env()
+IMAGE_MIN_DIM = int(os.getenv("PDF2MD_IMAGE_MIN_DIM", "8"))
+IMAGE_MIN_AREA = int(os.getenv("PDF2MD_IMAGE_MIN_AREA", "1024"))
+IMAGE_WORKERS = int(os.getenv("PDF2MD_IMAGE_WORKERS", min(4, os.cpu_count() or 1)))
+IMAGE_CACHE_BYTES = int(float(os.getenv("PDF2MD_IMAGE_CACHE_MB", "64")) * 1024 * 1024)
+
+
+def resolve_image_options(value: Union[ImageOptions, Dict[str, Any], None]) -> ImageOptions:
+    """None → 环境变量中的默认值；dict（如经任务队列传递的参数）→ ImageOptions"""
+    if value is None:
+        return DEFAULT_IMAGE_OPTIONS
+    if isinstance(value, ImageOptions):
+        return value
+    return ImageOptions(**value).validate()
+
+
+def is_decorative(width: int, height: int, min_dim: int = IMAGE_MIN_DIM, min_area: int = IMAGE_MIN_AREA) -> bool:
+    """按 get_images 中记录的像素尺寸判断是否为装饰性小图（无需解码）"""
+    return (bool(min_dim) and min(width, height) < min_dim) or (bool(min_area) and width * height < min_area)
+
+
+@dataclass(frozen=True)
+class ProcessedImage:
+    """处理后的图片：编码后的原始字节和格式（MIME 子类型，如 "webp"、"jpeg"）
+
+    JSON 响应需要的 data URL 在输出时才生成（data_url），
+    二进制结果（resultpack.py）直接使用原始字节，不经过 base64。
+    """
+    data: bytes
+    format: str
+    thumbnail: Optional[bytes] = None
+    thumbnail_format: Optional[str] = None
+
+    @classmethod
+    def of(cls, data: bytes, ext: str, thumbnail: Optional[Tuple[bytes, str]] = None) -> "ProcessedImage":
+        thumb_data, thumb_format = thumbnail or (None, None)
+        return cls(data, _MIME.get(ext, ext), thumb_data, thumb_format)
+
+    @classmethod
+    def from_data_url(cls, url: str) -> "ProcessedImage":
+        """data_url 的逆操作（worker 以 JSON 回传的结果）"""
+        return cls(*_decode_data_url(url))
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.format}"
+
+    @property
+    def data_url(self) -> str:
+        return _data_url(self.data, self.format)
+
+    @property
+    def thumbnail_image(self) -> Optional["ProcessedImage"]:
+        return ProcessedImage(self.thumbnail, self.thumbnail_format) if self.thumbnail is not None else None
+
+    @property
+    def size(self) -> int:
+        return len(self.data) + len(self.thumbnail or b"")
+
+
+def _data_url(data: bytes, fmt: str) -> str:
+    return f"data:image/{fmt};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def _decode_data_url(url: str) -> Tuple[bytes, str]:
+    """data:image/<格式>;base64,... → (原始字节, 格式)"""
+    header, _, data = url.partition(",")
+    fmt = header[len("data:image/"):].split(";", 1)[0] if header.startswith("data:image/") else ""
+    return base64.b64decode(data), fmt
+
+
+class ImageCache:
+    """按内容哈希缓存处理结果的 LRU（按数据大小限制总量，线程安全）"""
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[Tuple[str, ImageOptions], ProcessedImage]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 命中 / 未命中回调（main.py 接到 /metrics 的 pdf2md_cache_requests_total{cache="images"}）
+        self.on_lookup: Optional[Callable[[bool], None]] = None
+
+    def get(self, key) -> Optional[ProcessedImage]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+        if self.on_lookup is not None:
+            self.on_lookup(item is not None)
+        return item
+
+    def put(self, key, item: ProcessedImage):
+        if item.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self._items[key] = item
+            self.size += item.size
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= evicted.size
+
+
+IMAGE_CACHE = ImageCache()
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="pdf2md-image")
+        return _pool
+
+
+def _has_alpha(img) -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def _encode(img, fmt: str, quality: int) -> bytes:
+    """按目标格式转换颜色模式并编码"""
+    alpha = _has_alpha(img)
+    if fmt == "jpeg":
+        if alpha:
+            background = Image.new("RGB", img.size, "white")
+            background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+            img = background
+        elif img.mode != "RGB" and img.mode != "L":
+            img = img.convert("RGB")   # CMYK、P、1 等
+    elif fmt == "webp":
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if alpha else "RGB")
+    elif img.mode == "CMYK":
+        img = img.convert("RGB")
+
+    buf = BytesIO()
+    if fmt == "png":
+        img.save(buf, "PNG", optimize=False)
+    elif fmt == "webp":
+        # method 2：比默认的 4 快得多，体积相差不大
+        img.save(buf, "WEBP", quality=quality, method=2)
+    else:
+        img.save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def _shrink(img, max_dim: int):
+    """缩放到最长边不超过 max_dim（原地修改）"""
+    if max_dim and max(img.size) > max_dim:
+        if img.mode in ("1", "P"):
+            # 这两种模式只能最近邻缩放，先转为连续色调
+            img = img.convert("L" if img.mode == "1" else ("RGBA" if _has_alpha(img) else "RGB"))
+        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
+
+def _transcode(raw: bytes, ext: str, options: ImageOptions) -> ProcessedImage:
+    img = Image.open(BytesIO(raw))
+    resized = bool(options.max_dim) and max(img.size) > options.max_dim
+    if resized and img.format == "JPEG":
+        # JPEG 可以直接按 1/2、1/4、1/8 解码，大扫描件省去大部分解码时间
+        img.draft(img.mode, (options.max_dim, options.max_dim))
+    img.load()
+
+    fmt = options.format
+    if fmt == "original":
+        # 必须转码时保持有损 / 无损不变
+        fmt = "jpeg" if ext in ("jpeg", "jpg") else "png"
+    elif fmt == "auto":
+        # 黑白（1 位）图片用 PNG：文字扫描件无损且更小
+        fmt = "png" if img.mode == "1" else "webp"
+
+    main = _shrink(img, options.max_dim)
+    if resized or ext not in _BROWSER_FORMATS:
+        data, data_ext = _encode(main, fmt, options.quality), fmt
+    elif options.format == "original":
+        data, data_ext = raw, ext
+    else:
+        encoded = _encode(main, fmt, options.quality)
+        # 不需要缩放、且转码后没有变小：保留原图
+        data, data_ext = (raw, ext) if len(encoded) >= len(raw) else (encoded, fmt)
+
+    return ProcessedImage.of(data, data_ext, _thumbnail(main, fmt, options))
+
+
+def _thumbnail(img, fmt: str, options: ImageOptions) -> Optional[Tuple[bytes, str]]:
+    if not options.thumbnail:
+        return None
+    thumb = _shrink(img.copy(), options.thumbnail)
+    return _encode(thumb, fmt, options.quality), fmt
+
+
+def _done(result: ProcessedImage) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def process_image(raw: bytes, ext: str, options: ImageOptions = DEFAULT_IMAGE_OPTIONS) -> ProcessedImage:
+    """处理一张图片（可在任意线程调用）；无法解码时原样返回"""
+    if options.passthrough or not HAS_PIL:
+        return ProcessedImage.of(raw, ext)
+
+    key = (hashlib.blake2b(raw, digest_size=16).hexdigest(), options)
+    cached = IMAGE_CACHE.get(key)
+    if cached is not None:
+        return cached
+    try:
+        result = _transcode(raw, ext, options)
+    except Exception:
+        # Pillow 不支持的格式（如 jbig2、jpx 的部分变体）
+        result = ProcessedImage.of(raw, ext)
+    IMAGE_CACHE.put(key, result)
+    return result
+
+
+def submit_image(raw: bytes, ext: str, options: ImageOptions = DEFAULT_IMAGE_OPTIONS) -> Future:
+    """在图片线程池中处理；不需要解码时直接返回已完成的 Future"""
+    if options.passthrough or not HAS_PIL:
+        return _done(ProcessedImage.of(raw, ext))
+    return _get_pool().submit(process_image, raw, ext, options)
+
+
+def _encode_pixels(samples: bytes, width: int, height: int, key, options: ImageOptions) -> ProcessedImage:
+    img = Image.frombytes("RGB", (width, height), samples)
+    # 渲染出的矢量图形是线条和色块：auto / original 用无损 PNG，避免有损压缩在线条边缘产生噪点
+    fmt = "png" if options.format in ("auto", "original") else options.format
+    main = _shrink(img, options.max_dim)
+    result = ProcessedImage.of(_encode(main, fmt, options.quality), fmt, _thumbnail(main, fmt, options))
+    IMAGE_CACHE.put(key, result)
+    return result
+
+
+def submit_pixels(samples: bytes, width: int, height: int, key, options: ImageOptions = DEFAULT_IMAGE_OPTIONS,
+                  png: Optional[Callable[[], bytes]] = None) -> Future:
+    """在图片线程池中编码渲染得到的 RGB 像素（见 figures.py），结果以 key 写入缓存
+
+    未安装 Pillow 时改用 png()（在当前线程由 PyMuPDF 编码）。
+    """
+    if not HAS_PIL:
+        result = ProcessedImage.of(png(), "png")
+        IMAGE_CACHE.put(key, result)
+        return _done(result)
+    return _get_pool().submit(_encode_pixels, samples, width, height, key, options)
+
+
+def cached_future(key) -> Optional[Future]:
+    """缓存中已有 key 的处理结果时返回已完成的 Future"""
+    cached = IMAGE_CACHE.get(key)
+    return _done(cached) if cached is not None else None
@@ -0,0 +1,178 @@
+"""
+布局分析：主内容区域检测 + 栏检测（基于 PyMuPDF 文本块）
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+from .profiles import ExtractionProfile
+
+logger = logging.getLogger("pdf2md.extraction.layout")
+
+
+BBox = Tuple[float, float, float, float]
+
+
+def text_blocks(page_pymupdf) -> List[tuple]:
+    """页面所有文本块 (x0, y0, x1, y1, 文本, 块序号, 类型)
+
+    使用 get_text("blocks")，比 get_text("dict") 少构造逐行逐字的结构，
+    并且每页只调用一次，结果同时供区域检测、栏检测和页眉页脚检测使用。
+    """
+    return [b for b in page_pymupdf.get_text("blocks") if b[6] == 0]
+
+
+def text_block_bboxes(page_pymupdf) -> List[BBox]:
+    """获取页面所有文本块的边界框"""
+    return [tuple(b[:4]) for b in text_blocks(page_pymupdf)]
+
+
+def fallback_content_area(page_width: float, page_height: float, profile: ExtractionProfile) -> BBox:
+    """无法检测内容区域时的回退区域"""
+    if profile.force_left_margin:
+        # 手动排除左侧边栏和页眉页脚，假设左侧边栏约占页面宽度的 10-12%
+        return (page_width * 0.12, page_height * 0.05, page_width, page_height * 0.95)
+    return (0, 0, page_width, page_height)
+
+
+def fallback_columns(content_bbox: BBox, profile: ExtractionProfile) -> List[BBox]:
+    """无法检测栏布局时的回退：二分或单栏"""
+    if profile.column_fallback == "split":
+        x0, y0, x1, y1 = content_bbox
+        mid_x = (x0 + x1) / 2
+        return [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
+    return [content_bbox]
+
+
+def detect_content_area(page_pymupdf, profile: ExtractionProfile,
+                        bboxes: Optional[List[BBox]] = None) -> Optional[BBox]:
+    """检测主内容区域（排除边栏、页眉页脚），返回 (x0, y0, x1, y1) 或 None"""
+    try:
+        if bboxes is None:
+            bboxes = text_block_bboxes(page_pymupdf)
+        if not bboxes:
+            return None
+
+        page_width = page_pymupdf.rect.width
+        page_height = page_pymupdf.rect.height
+
+        # 将页面分为垂直条带，计算文本密度
+        num_strips = profile.density_strips
+        strip_width = page_width / num_strips
+        density = [0.0] * num_strips
+
+        for x0, y0, x1, y1 in bboxes:
+            area = (x1 - x0) * (y1 - y0)
+            start_strip = int(x0 / strip_width)
+            end_strip = int(x1 / strip_width)
+
+            for i in range(max(0, start_strip), min(end_strip + 1, num_strips)):
+                density[i] += area
+
+        # 找出密度显著的区域
+        max_density = max(density) if density else 0
+        if max_density == 0:
+            return None
+
+        threshold = max_density * profile.density_threshold
+        significant_strips = [i for i, d in enumerate(density) if d > threshold]
+
+        if not significant_strips:
+            return None
+
+        # 计算主内容区域边界
+        content_x_min = min(significant_strips) * strip_width
+        content_x_max = (max(significant_strips) + 1) * strip_width
+
+        # 如果左边界太靠左（可能包含边栏），强制向右移动
+        if profile.force_left_margin and content_x_min < page_width * 0.1:
+            content_x_min = page_width * 0.12
+
+        if profile.header_footer_cutoff is not None:
+            # Y 轴：排除最上方和最下方（页眉页脚）
+            cutoff = profile.header_footer_cutoff
+            content_y_min = max(min(b[1] for b in bboxes), page_height * cutoff)
+            content_y_max = min(max(b[3] for b in bboxes), page_height * (1 - cutoff))
+        else:
+            # Y 轴：使用所有文本块的边界
+            content_y_min = min(b[1] for b in bboxes)
+            content_y_max = max(b[3] for b in bboxes)
+
+        # 添加小边距避免裁剪过度
+        margin = strip_width * profile.area_margin
+        if profile.pad_left:
+            content_x_min = max(0, content_x_min - margin)
+        content_x_max = min(page_width, content_x_max + margin)
+
+        return (content_x_min, content_y_min, content_x_max, content_y_max)
+
+    except Exception as e:
+        logger.warning("内容区域检测失败: %s", e)
+        return None
+
+
+def detect_columns(page_pymupdf, content_bbox: BBox, profile: ExtractionProfile,
+                   bboxes: Optional[List[BBox]] = None) -> List[BBox]:
+    """检测栏布局（单栏/双栏/多栏），返回每一栏的边界框列表"""
+    try:
+        x0, y0, x1, y1 = content_bbox
+        content_width = x1 - x0
+
+        if bboxes is None:
+            bboxes = text_block_bboxes(page_pymupdf)
+        tol = profile.block_tolerance
+        content_blocks = [b for b in bboxes if b[0] >= x0 - tol and b[2] <= x1 + tol]
+
+        if not content_blocks or len(content_blocks) < profile.min_column_blocks:
+            return fallback_columns(content_bbox, profile)
+
+        # 分析水平占用情况，找出"空白列"
+        num_strips = profile.column_strips
+        strip_width = content_width / num_strips
+        occupancy = [0] * num_strips
+
+        for bbox in content_blocks:
+            start_strip = int((bbox[0] - x0) / strip_width)
+            end_strip = int((bbox[2] - x0) / strip_width)
+
+            for i in range(max(0, start_strip), min(end_strip + 1, num_strips)):
+                occupancy[i] += 1
+
+        # 识别栏间隙（连续的空白区域）
+        gaps = []
+        in_gap = False
+        gap_start = 0
+        edge = profile.gap_edge_margin
+
+        for i, occ in enumerate(occupancy):
+            if occ == 0:
+                if not in_gap:
+                    gap_start = i
+                    in_gap = True
+            else:
+                if in_gap:
+                    gap_width = i - gap_start
+                    if gap_width >= profile.min_gap_strips:
+                        gap_center = gap_start + gap_width / 2
+                        gap_pos = gap_center * strip_width + x0
+                        # 确保间隙在中间区域（排除边缘）
+                        if edge is None or x0 + content_width * edge < gap_pos < x1 - content_width * edge:
+                            gaps.append(gap_pos)
+                    in_gap = False
+
+        # 没有检测到间隙
+        if not gaps:
+            return fallback_columns(content_bbox, profile)
+
+        # 按间隙分割成多栏
+        columns = []
+        prev_x = x0
+        for gap_x in sorted(gaps):
+            columns.append((prev_x, y0, gap_x, y1))
+            prev_x = gap_x
+        columns.append((prev_x, y0, x1, y1))
+        return columns
+
+    except Exception as e:
+        logger.warning("栏检测失败: %s, 使用回退布局", e)
+        return fallback_columns(content_bbox, profile)
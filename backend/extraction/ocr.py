@@ -0,0 +1,133 @@
+"""
+OCR 能力检测（OCRmyPDF + Tesseract + Ghostscript）
+
+检测一次的结果（ocrmypdf 模块、已安装的语言包、选用的语言）保存在转换引擎中
+（ConverterEngine.ocr_available / ocr_languages() / ocr_language()，见 engine.py），
+本模块只提供检测和选择的函数，不保存状态。
+"""
+
+import logging
+import os
+import shutil
+import sys
+from typing import List, Tuple
+
+logger = logging.getLogger("pdf2md.extraction.ocr")
+
+
+# 配置 OCR 依赖路径（Windows 系统）
+def setup_ocr_dependencies():
+    """在 Windows 上自动检测并配置 OCR 依赖（Tesseract 和 Ghostscript）"""
+    tesseract_ok = False
+    ghostscript_ok = False
+
+    if sys.platform == "win32":
+        # 1. 检查 Tesseract
+        tesseract_paths = [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+            r"C:\Users\{}\AppData\Local\Programs\Tesseract-OCR\tesseract.exe".format(os.getenv("USERNAME", "")),
+        ]
+
+        if shutil.which("tesseract"):
+            tesseract_ok = True
+            logger.info("找到 Tesseract（已在 PATH 中）")
+        else:
+            for path in tesseract_paths:
+                if os.path.exists(path):
+                    tesseract_dir = os.path.dirname(path)
+                    os.environ["PATH"] = tesseract_dir + os.pathsep + os.environ["PATH"]
+                    tesseract_ok = True
+                    logger.info("找到 Tesseract: %s", path)
+                    break
+
+        if not tesseract_ok:
+            logger.warning("未找到 Tesseract OCR（下载地址: https://github.com/UB-Mannheim/tesseract/wiki，"
+                           "安装时请勾选 'Chinese - Simplified' 语言包）")
+
+        # 2. 检查 Ghostscript
+        ghostscript_paths = [
+            r"C:\Program Files\gs\gs10.02.1\bin\gswin64c.exe",  # 最新版本
+            r"C:\Program Files\gs\gs10.02.0\bin\gswin64c.exe",
+            r"C:\Program Files\gs\gs10.01.2\bin\gswin64c.exe",
+            r"C:\Program Files\gs\gs10.00.0\bin\gswin64c.exe",
+            r"C:\Program Files (x86)\gs\gs10.02.1\bin\gswin32c.exe",
+            r"C:\Program Files (x86)\gs\gs10.02.0\bin\gswin32c.exe",
+        ]
+
+        if shutil.which("gs") or shutil.which("gswin64c") or shutil.which("gswin32c"):
+            ghostscript_ok = True
+            logger.info("找到 Ghostscript（已在 PATH 中）")
+        else:
+            for path in ghostscript_paths:
+                if os.path.exists(path):
+                    gs_dir = os.path.dirname(path)
+                    os.environ["PATH"] = gs_dir + os.pathsep + os.environ["PATH"]
+                    ghostscript_ok = True
+                    logger.info("找到 Ghostscript: %s", path)
+                    break
+
+        if not ghostscript_ok:
+            logger.warning("未找到 Ghostscript（下载地址: https://ghostscript.com/releases/gsdnld.html，"
+                           "建议安装最新版本的 64 位版本）")
+
+        return tesseract_ok and ghostscript_ok
+
+    # 非 Windows 系统，假设依赖已在 PATH 中
+    return True
+
+
+def load_ocrmypdf():
+    """导入 OCRmyPDF 并配置依赖，返回 ocrmypdf 模块；不可用时返回 None"""
+    try:
+        import ocrmypdf
+    except Exception as e:
+        logger.warning("OCR 功能已禁用: %s", e)
+        return None
+    if not setup_ocr_dependencies():
+        logger.warning("OCR 功能已禁用（缺少必要的依赖），将跳过 OCR 步骤，仅提取 PDF 中的文本内容")
+        return None
+    logger.info("OCR 功能已启用")
+    return ocrmypdf
+
+
+def list_ocr_languages() -> List[str]:
+    """Tesseract 已安装的语言包（启动一次 tesseract 进程）"""
+    try:
+        result = os.popen("tesseract --list-langs 2>&1").read()
+        # 解析输出，获取语言列表
+        lines = result.strip().split('\n')
+        languages = []
+        found_list = False
+        for line in lines:
+            if "List of available languages" in line:
+                found_list = True
+                continue
+            if found_list and line.strip():
+                languages.append(line.strip())
+        return languages
+    except Exception:
+        return ["eng"]  # 默认只有英文
+
+
+def log_ocr_languages(languages: List[str]):
+    """启动时报告中文 OCR 是否可用"""
+    if not languages:
+        return
+    if "chi_sim" in languages or "chi_tra" in languages:
+        logger.info("支持中文 OCR（已安装中文语言包）")
+    else:
+        logger.warning("中文语言包未安装，只能识别英文（安装中文包: 运行 .\\verify_chinese_language.bat 查看说明）")
+    logger.info("可用 OCR 语言: %s", ", ".join(languages[:10]))  # 只显示前10个
+
+
+def choose_ocr_language(languages: List[str]) -> Tuple[str, str]:
+    """OCR 语言参数及其说明：优先使用中英文，如果中文不可用则只用英文"""
+    if "chi_sim" in languages:
+        return "eng+chi_sim", "英文+简体中文"
+    if "eng" in languages:
+        logger.warning("未找到中文语言包，将只使用英文 OCR（如需中文识别，请运行: .\\verify_chinese_language.bat）")
+        return "eng", "英文"
+    # 使用第一个可用的语言
+    language = languages[0] if languages else "eng"
+    return language, language
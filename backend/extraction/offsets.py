@@ -0,0 +1,73 @@
+"""
+Markdown 偏移索引：每页、每个标题（章节）在最终 Markdown 中的字符和 UTF-8 字节区间
+
+页的长度和页内标题位置在组装每页 Markdown 时记录（见 PageSummary.md_chars / headings），
+这里只把它们换算成整篇中的绝对位置，不需要重新扫描整篇 Markdown。下游可以直接按区间切出
+某一页或某一节：markdown[char_start:char_end]，或 markdown_bytes[byte_start:byte_end]。
+
+章节区间从标题开始，到下一个同级或更高级标题（或文末）为止。
+"""
+
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .summary import PageSummary, byte_offsets, page_spans
+
+
+# detect_structure() 输出的 "# 标题" / "## 标题" 行
+HEADING_RE = re.compile(r"^(#{1,6}) +(\S.*?)\s*$", re.MULTILINE)
+
+Heading = Tuple[int, int, str]  # (相对页首的字符偏移, 级别, 标题文字)
+
+
+def find_headings(text: str) -> Tuple[Heading, ...]:
+    """页面文本中的 Markdown 标题"""
+    return tuple((m.start(), len(m.group(1)), m.group(2)) for m in HEADING_RE.finditer(text))
+
+
+def build_offset_index(markdown: str,
+                       pages: Sequence[Tuple[int, int, int, Sequence[Heading]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """pages 为每页的 (页码, 字符起点, 字符终点, 页内标题)，按页序排列
+
+    返回 {"pages": [{page, char_start, char_end, byte_start, byte_end}, ...],
+          "headings": [{level, title, page, char_start, char_end, byte_start, byte_end}, ...]}
+    """
+    headings = [(start + offset, level, title, page)
+                for page, start, _, page_headings in pages for offset, level, title in page_headings]
+
+    # 章节终点：下一个同级或更高级标题的起点（倒序扫描，栈中保留尚未闭合的后续标题）
+    ends = [len(markdown)] * len(headings)
+    following: List[Tuple[int, int]] = []  # (级别, 起点)
+    for i in range(len(headings) - 1, -1, -1):
+        start, level = headings[i][0], headings[i][1]
+        while following and following[-1][0] > level:
+            following.pop()
+        if following:
+            ends[i] = following[-1][1]
+        following.append((level, start))
+
+    positions = sorted({pos for _, start, end, _ in pages for pos in (start, end)} |
+                       {h[0] for h in headings} | set(ends))
+    to_byte = dict(zip(positions, byte_offsets(markdown, positions)))
+
+    return {
+        "pages": [
+            {"page": page, "char_start": start, "char_end": end,
+             "byte_start": to_byte[start], "byte_end": to_byte[end]}
+            for page, start, end, _ in pages
+        ],
+        "headings": [
+            {"level": level, "title": title, "page": page, "char_start": start, "char_end": end,
+             "byte_start": to_byte[start], "byte_end": to_byte[end]}
+            for (start, level, title, page), end in zip(headings, ends)
+        ],
+    }
+
+
+def summary_offset_index(markdown: str, summaries: Sequence[PageSummary]) -> Dict[str, List[Dict[str, Any]]]:
+    """/convert 结果（pdf_bytes_to_markdown 返回的 Markdown 和每页摘要）的偏移索引"""
+    # 没有任何文本时 Markdown 是一句提示（见 join_markdown），各页均为空区间
+    spans = page_spans(summaries)
+    return build_offset_index(markdown, [
+        (summary.page, start, end, summary.headings) for summary, (start, end) in zip(summaries, spans)
+    ])
@@ -0,0 +1,97 @@
+"""
+页码选择：解析 pages="1-5,10" / max_pages 参数
+
+解析分两步：parse_page_ranges() 只检查语法（请求入队前即可返回 400），
+resolve_pages() 在知道文档页数后得到最终的页码列表（1 起始、升序、去重）。
+"""
+
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+import pdfplumber
+
+from .tables import HAS_PYMUPDF
+
+if HAS_PYMUPDF:
+    import fitz
+
+
+PageRange = Tuple[int, Optional[int]]   # (起始页, 结束页)，结束页为 None 表示到最后一页
+
+
+class PageSelectionError(ValueError):
+    """页码参数无效，或所选页码不在文档范围内"""
+
+
+def parse_page_ranges(spec: Optional[str]) -> Optional[List[PageRange]]:
+    """
+    解析页码范围字符串
+
+    支持 "3"、"1-5"、"10-"（第 10 页到最后），逗号分隔；spec 为空时返回 None（全部页）。
+    """
+    if spec is None or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            first = int(start)
+            last = (int(end) if end.strip() else None) if sep else first
+        except ValueError:
+            raise PageSelectionError(f"无效的页码范围: {part!r}（示例: 1-5,10）")
+        if first < 1 or (last is not None and last < first):
+            raise PageSelectionError(f"无效的页码范围: {part!r}（页码从 1 开始，结束页不能小于起始页）")
+        ranges.append((first, last))
+
+    if not ranges:
+        raise PageSelectionError(f"无效的页码范围: {spec!r}")
+    return ranges
+
+
+def resolve_pages(ranges: Optional[List[PageRange]], page_count: int,
+                  max_pages: Optional[int] = None) -> Optional[List[int]]:
+    """
+    得到要处理的页码列表；不需要筛选（全部页）时返回 None
+
+    超出文档页数的部分直接忽略，max_pages 截取所选页中的前 N 页。
+    """
+    if ranges is None and (max_pages is None or max_pages >= page_count):
+        return None
+
+    if ranges is None:
+        selected = list(range(1, page_count + 1))
+    else:
+        wanted = set()
+        for first, last in ranges:
+            wanted.update(range(first, min(last or page_count, page_count) + 1))
+        selected = sorted(wanted)
+
+    if max_pages is not None:
+        selected = selected[:max_pages]
+    if not selected:
+        raise PageSelectionError(f"所选页码超出文档范围（共 {page_count} 页）")
+    return selected
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    """只读取页数（PyMuPDF 只解析页树，不加载页面内容）"""
+    if HAS_PYMUPDF:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return doc.page_count
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        return len(pdf.pages)
+
+
+def select_pages(pdf_bytes: bytes, spec: Optional[str] = None,
+                 max_pages: Optional[int] = None) -> Optional[List[int]]:
+    """解析 pages / max_pages 参数并结合文档页数得到页码列表（None 表示全部页）"""
+    if max_pages is not None and max_pages < 1:
+        raise PageSelectionError("max_pages 必须大于 0")
+    ranges = parse_page_ranges(spec)
+    if ranges is None and max_pages is None:
+        return None
+    return resolve_pages(ranges, count_pages(pdf_bytes), max_pages)
@@ -0,0 +1,383 @@
+"""
+单遍页面流水线
+
+PyMuPDF 文档只打开一次；每一页的布局分析、文本、表格和图片在同一次页面加载中完成，
+按页产出结果，供 /convert 与 SmartPDFExtractor 共用。
+"""
+
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import pdfplumber
+
+from .cleaning import clean_text, strip_running_lines
+from .layout import (
+    detect_columns, detect_content_area, fallback_columns, fallback_content_area, text_blocks,
+)
+from .profiles import ExtractionProfile, get_profile
+from .structure import detect_structure
+from .tables import HAS_PYMUPDF, TableEngine, find_table_regions, get_table_engine, table_shape, table_to_markdown
+from .cancel import NEVER_CANCELLED
+from .classify import simple_page_blocks, simple_page_text, use_fast_path
+from .headers import RunningLines, new_running_lines
+from .figures import FIGURE_DPI, submit_page_figures
+from .images import ImageOptions, is_decorative, resolve_image_options, submit_image
+from .offsets import find_headings
+from .summary import PageSummary
+from .timing import NULL_TIMINGS
+
+if HAS_PYMUPDF:
+    import fitz
+
+logger = logging.getLogger("pdf2md.extraction.pipeline")
+
+
+@dataclass(frozen=True)
+class DocumentPlan:
+    """整个文档只判断一次的结果（plan_document），分块转换时各块共用，与整体转换的结果一致
+
+    simple: 是否走快速路径（见 classify.py）
+    running_lines: 页眉页脚检测器（见 headers.py），None 表示不检测
+    """
+    simple: bool = False
+    running_lines: Optional[RunningLines] = None
+
+
+def _plan(doc_pymupdf, profile: ExtractionProfile, pages: Optional[Sequence[int]], fast_path: bool) -> DocumentPlan:
+    return DocumentPlan(simple=use_fast_path(doc_pymupdf, profile, fast_path, pages),
+                        running_lines=new_running_lines(doc_pymupdf, pages))
+
+
+def plan_document(pdf_bytes: bytes, profile="fast", pages: Optional[Sequence[int]] = None,
+                  fast_path: bool = True) -> DocumentPlan:
+    """在要处理的页（pages 为整个转换的页码列表，None 表示全部页）中抽查，得到各块共用的 DocumentPlan"""
+    profile = get_profile(profile)
+    if not HAS_PYMUPDF:
+        return DocumentPlan()
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc_pymupdf:
+            return _plan(doc_pymupdf, profile, pages, fast_path)
+    except Exception as e:
+        logger.warning("PyMuPDF 打开失败: %s", e)
+        return DocumentPlan()
+
+
+def submit_page_images(doc_pymupdf, page_pymupdf, image_options: ImageOptions) -> List[Future]:
+    """在当前线程取出单页内嵌图片的原始数据（PyMuPDF 对象不能跨线程使用），交给图片线程池处理
+
+    先按 get_images 的元数据过滤，不调用 extract_image：
+    - 其他图片的软蒙版（SMask，透明度通道，单独列出时不是可显示的内容）
+    - 宽 / 高或面积低于阈值的装饰性小图（1×1 间隔图、项目符号、平铺背景碎片等）
+    """
+    page_images = page_pymupdf.get_images(full=True)
+    masks = {img[1] for img in page_images if img[1]}
+    jobs = []
+    skipped = 0
+    for img in page_images:
+        xref, width, height = img[0], img[2], img[3]
+        if xref in masks or is_decorative(width, height):
+            skipped += 1
+            continue
+        base = doc_pymupdf.extract_image(xref)
+        image_bytes = base.get("image")
+        ext = base.get("ext", "png")
+        if image_bytes:
+            jobs.append(submit_image(image_bytes, ext, image_options))
+    if skipped:
+        logger.debug("第 %d 页跳过 %d 张装饰图片 / 蒙版", page_pymupdf.number + 1, skipped)
+    return jobs
+
+
+def extract_page_images(doc_pymupdf, page_pymupdf, image_options: Optional[ImageOptions] = None) -> List[str]:
+    """提取单页内嵌图片，返回 data URL 列表（按 image_options 缩放 / 转码）"""
+    jobs = submit_page_images(doc_pymupdf, page_pymupdf, resolve_image_options(image_options))
+    return [job.result().data_url for job in jobs]
+
+
+def _page_blocks(page_pymupdf, page_num: int, running_lines: Optional[RunningLines]) -> list:
+    """本页文本块（页眉页脚抽查时已经取出的直接复用）"""
+    blocks = running_lines.take_blocks(page_num) if running_lines is not None else None
+    return blocks if blocks is not None else text_blocks(page_pymupdf)
+
+
+def _page_running(running_lines: Optional[RunningLines], page_num: int, page_pymupdf, blocks) -> frozenset:
+    """把本页计入页眉页脚统计，返回清理本页时使用的指纹（本页顶部 / 底部行中命中的）"""
+    if running_lines is None or page_pymupdf is None:
+        return frozenset()
+    return running_lines.page_running(page_num, blocks or [], page_pymupdf.parent)
+
+
+def extract_page_text(page_plumber, page_pymupdf, profile: ExtractionProfile, page_num: int,
+                      timings=NULL_TIMINGS, running_lines: Optional[RunningLines] = None) -> str:
+    """按布局检测结果逐栏提取文本，并完成清理（含跨页页眉页脚，见 headers.py）和结构识别"""
+    page_text_parts = []
+
+    with timings.stage("layout", page_num):
+        blocks = None
+        bboxes = None
+        content_bbox = None
+        if page_pymupdf is not None:
+            try:
+                blocks = _page_blocks(page_pymupdf, page_num, running_lines)
+                bboxes = [tuple(b[:4]) for b in blocks]
+            except Exception:
+                blocks = bboxes = None
+            content_bbox = detect_content_area(page_pymupdf, profile, bboxes)
+
+        if content_bbox is None:
+            content_bbox = fallback_content_area(page_plumber.width, page_plumber.height, profile)
+
+        # 检测栏布局
+        if page_pymupdf is not None:
+            columns = detect_columns(page_pymupdf, content_bbox, profile, bboxes)
+        else:
+            columns = fallback_columns(content_bbox, profile)
+
+        running = _page_running(running_lines, page_num, page_pymupdf, blocks)
+
+    # 调试信息（未开启 DEBUG 时不格式化）
+    logger.debug("页面 %d: 检测到 %d 栏, 内容区域 x=[%.1f, %.1f], y=[%.1f, %.1f]",
+                 page_num, len(columns), content_bbox[0], content_bbox[2], content_bbox[1], content_bbox[3])
+
+    # 按栏提取文本：每一栏单独提取，避免跨栏横着读
+    skipped = 0  # 页面开头删掉的页眉行数（结构识别用）
+    for col_idx, col_bbox in enumerate(columns):
+        try:
+            with timings.stage("columns", page_num):
+                col_page = page_plumber.within_bbox(col_bbox)
+                if profile.layout_text:
+                    col_text = col_page.extract_text(layout=True, x_tolerance=3, y_tolerance=3)
+                else:
+                    col_text = col_page.extract_text()
+
+            if col_text:
+                with timings.stage("cleaning", page_num):
+                    col_text, removed = strip_running_lines(col_text, running, profile)
+                    col_text = clean_text(col_text, profile)
+                if not page_text_parts:
+                    skipped += removed
+                if col_text.strip():
+                    page_text_parts.append(col_text)
+
+        except Exception as e:
+            logger.warning("第 %d 页第 %d 栏提取失败: %s", page_num, col_idx, e)
+
+    # 合并所有栏的文本并做结构识别
+    page_text = '\n\n'.join(page_text_parts)
+    if page_text:
+        with timings.stage("structure", page_num):
+            page_text = detect_structure(page_text, skipped)
+    return page_text
+
+
+def process_simple_page(page_num: int, page_pymupdf, profile: ExtractionProfile, timings=NULL_TIMINGS,
+                        running_lines: Optional[RunningLines] = None) -> Optional[Dict[str, Any]]:
+    """快速路径（见 classify.py）的单页处理：PyMuPDF 按阅读顺序取文本，不做布局分析、表格和图片
+
+    该页不是单栏纯文本时返回 None，由调用方改走 process_page()。
+    """
+    with timings.stage("layout", page_num):
+        cached = running_lines.take_blocks(page_num) if running_lines is not None else None
+        blocks = simple_page_blocks(page_pymupdf, cached)
+        if blocks is None:
+            return None
+        running = _page_running(running_lines, page_num, page_pymupdf, blocks)
+        raw_text = simple_page_text(page_pymupdf, blocks, profile)
+    with timings.stage("cleaning", page_num):
+        raw_text, skipped = strip_running_lines(raw_text, running, profile)
+        page_text = clean_text(raw_text, profile)
+    if page_text:
+        with timings.stage("structure", page_num):
+            page_text = detect_structure(page_text, skipped)
+    return {
+        "page": page_num,
+        "text": page_text,
+        "tables": [],
+        "table_regions": 0,
+        "images": [],
+        "has_pymupdf": True,
+    }
+
+
+def process_page(page_num: int, page_plumber, page_pymupdf, doc_pymupdf, profile: ExtractionProfile,
+                 table_engine: Optional[TableEngine] = None, images: bool = True,
+                 timings=NULL_TIMINGS, cancel=NEVER_CANCELLED,
+                 image_options: Optional[ImageOptions] = None,
+                 running_lines: Optional[RunningLines] = None) -> Dict[str, Any]:
+    """单页处理：布局、文本、表格、图片一起产出
+
+    table_engine 为 None 时不提取表格；images 为 False 时不提取图片；
+    cancel 为 CancelToken 时在各阶段之间检查是否已取消；
+    image_options 控制图片缩放 / 转码 / 缩略图（None 表示环境变量中的默认值）；
+    running_lines 为整个文档的页眉页脚检测器（DocumentPlan.running_lines，见 headers.py），None 表示不检测。
+    """
+    # 表格候选区域预筛选（没有边线的页面直接跳过表格提取；矢量图形检测也要排除这些区域）
+    table_regions = []
+    want_images = images and page_pymupdf is not None
+    if table_engine is not None or (want_images and FIGURE_DPI):
+        with timings.stage("tables" if table_engine is not None else "images", page_num):
+            table_regions = find_table_regions(page_plumber, page_pymupdf)
+
+    # 图片先取出原始数据（矢量图形先按区域渲染）交给线程池缩放 / 转码，与下面的文本、表格提取并行
+    image_jobs = []
+    if want_images:
+        with timings.stage("images", page_num):
+            options = resolve_image_options(image_options)
+            image_jobs = submit_page_images(doc_pymupdf, page_pymupdf, options)
+            image_jobs += submit_page_figures(page_pymupdf, table_regions, options)
+
+    page_text = extract_page_text(page_plumber, page_pymupdf, profile, page_num, timings, running_lines)
+    cancel.check()
+
+    # 提取表格
+    tables = []
+    if table_engine is not None:
+        with timings.stage("tables", page_num):
+            if table_regions:
+                tables = [t for t in table_engine.extract_tables(page_plumber, page_pymupdf, table_regions) if t]
+        cancel.check()
+
+    page_images = []
+    thumbnails = []
+    if image_jobs:
+        with timings.stage("images", page_num):
+            processed = [job.result() for job in image_jobs]
+        page_images = processed
+        thumbnails = [image.thumbnail_image for image in processed if image.thumbnail is not None]
+
+    result = {
+        "page": page_num,
+        "text": page_text,
+        "tables": tables,
+        "table_regions": len(table_regions) if table_engine is not None else 0,
+        "images": page_images,
+        "has_pymupdf": page_pymupdf is not None,
+    }
+    if thumbnails:
+        result["thumbnails"] = thumbnails
+    return result
+
+
+def iter_pages(pdf_bytes: bytes, profile="fast", table_engine: Optional[str] = "pdfplumber",
+               images: bool = True, timings=None, pages: Optional[Sequence[int]] = None,
+               cancel=None, image_options=None, fast_path: bool = True,
+               plan: Optional[DocumentPlan] = None) -> Iterator[Dict[str, Any]]:
+    """逐页流式处理，按页序产出 process_page() 的结果（附带 page_count 和 last）
+
+    table_engine 传 None 表示不提取表格；timings 为 StageTimings 时记录分阶段耗时；
+    pages 为页码列表（1 起始，见 pages.select_pages）时只加载和处理这些页，结果保留原始页码；
+    cancel 为 CancelToken 时在每页开始前和各阶段之间检查，已取消则抛出 ConversionCancelled；
+    image_options 为 ImageOptions 或其 dict 形式（见 images.py），None 表示环境变量中的默认值；
+    fast_path 为 False 时不对单栏纯文本文档使用快速路径（见 classify.py）；
+    plan 为整个文档的 plan_document() 结果（分块转换时各块传入同一个，不再各自抽查，fast_path 不起作用），
+    None 表示在 pages 中现场抽查。
+    """
+    timings = timings or NULL_TIMINGS
+    cancel = cancel or NEVER_CANCELLED
+    profile = get_profile(profile)
+    engine = get_table_engine(table_engine) if table_engine else None
+    image_options = resolve_image_options(image_options)
+
+    doc_pymupdf = None
+    if HAS_PYMUPDF:
+        try:
+            doc_pymupdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception as e:
+            logger.warning("PyMuPDF 打开失败: %s", e)
+
+    try:
+        with timings.stage("layout"):
+            if plan is None:
+                plan = _plan(doc_pymupdf, profile, pages, fast_path)
+            running_lines = plan.running_lines
+        if plan.simple and doc_pymupdf is not None:
+            yield from _iter_simple_pages(pdf_bytes, doc_pymupdf, profile, engine, images, timings, pages, cancel,
+                                          image_options, running_lines)
+            return
+
+        # pdfplumber 只为所选页创建 Page 对象，page_number 仍是原始页码
+        with pdfplumber.open(BytesIO(pdf_bytes), pages=list(pages) if pages else None) as pdf:
+            page_count = len(pdf.pages)
+            for idx, page in enumerate(pdf.pages):
+                cancel.check()
+                page_num = page.page_number
+                page_pymupdf = None
+                if doc_pymupdf and page_num <= doc_pymupdf.page_count:
+                    page_pymupdf = doc_pymupdf.load_page(page_num - 1)
+
+                result = process_page(page_num, page, page_pymupdf, doc_pymupdf, profile, engine, images, timings,
+                                      cancel, image_options, running_lines)
+                result["page_count"] = page_count
+                result["last"] = idx == page_count - 1
+                yield result
+
+                # 释放 pdfplumber 的页面缓存，长文档内存保持平稳
+                page.close()
+    finally:
+        if doc_pymupdf:
+            doc_pymupdf.close()
+
+
+def _iter_simple_pages(pdf_bytes: bytes, doc_pymupdf, profile: ExtractionProfile, engine: Optional[TableEngine],
+                       images: bool, timings, pages: Optional[Sequence[int]], cancel,
+                       image_options: ImageOptions,
+                       running_lines: Optional[RunningLines] = None) -> Iterator[Dict[str, Any]]:
+    """快速路径：逐页用 process_simple_page()，个别不满足条件的页才打开 pdfplumber 走完整流程"""
+    page_numbers = list(pages) if pages else list(range(1, doc_pymupdf.page_count + 1))
+    page_count = len(page_numbers)
+    pdf = None
+    fallback = 0
+    try:
+        for idx, page_num in enumerate(page_numbers):
+            cancel.check()
+            page_pymupdf = doc_pymupdf.load_page(page_num - 1)
+            result = process_simple_page(page_num, page_pymupdf, profile, timings, running_lines)
+            if result is None:
+                fallback += 1
+                if pdf is None:
+                    pdf = pdfplumber.open(BytesIO(pdf_bytes), pages=page_numbers)
+                page = pdf.pages[idx]
+                result = process_page(page_num, page, page_pymupdf, doc_pymupdf, profile, engine, images, timings,
+                                      cancel, image_options, running_lines)
+                page.close()
+            result["page_count"] = page_count
+            result["last"] = idx == page_count - 1
+            yield result
+    finally:
+        if pdf is not None:
+            pdf.close()
+        logger.debug("快速路径: %d 页，其中 %d 页回到完整流程", page_count, fallback)
+
+
+def render_page_markdown(result: Dict[str, Any]) -> List[str]:
+    """把单页结果渲染为 Markdown 行（不添加分页标记，自然连接段落）"""
+    md_lines = []
+    if result["text"]:
+        md_lines.append(result["text"])
+        # 页面之间添加分隔（但不显示页码）
+        if not result["last"]:
+            md_lines.append("")
+    for tbl in result["tables"]:
+        md_lines.extend(table_to_markdown(tbl))
+    return md_lines
+
+
+def page_summary(result: Dict[str, Any], md_lines: Sequence[str] = ()) -> PageSummary:
+    """单页统计信息（/convert 响应中的 pages 条目，输出格式见 summary.py）
+
+    md_lines 为该页 render_page_markdown() 的结果，用于记录该页 Markdown 的长度。
+    """
+    return PageSummary(
+        page=result["page"],
+        text_len=len(result["text"]),
+        table_details=tuple(table_shape(tbl) for tbl in result["tables"]),
+        table_regions=result["table_regions"],
+        images=result["images"],
+        thumbnails=result.get("thumbnails"),
+        md_chars=sum(map(len, md_lines)) + max(len(md_lines) - 1, 0),
+        # 标题只出现在正文中，正文是该页 Markdown 的第一行
+        headings=find_headings(result["text"]),
+    )
@@ -0,0 +1,116 @@
+"""
+提取配置（profile）
+
+把原先 main.py 与 smart_extractor.py 中各自硬编码的阈值、条带数和回退策略
+集中成两套配置：
+- fast：原 /convert 的行为（激进的边栏/页眉页脚排除，普通 extract_text）
+- layout：原 SmartPDFExtractor 的行为（保守的区域检测，layout=True 提取）
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Pattern
+
+
+BASIC_NOISE_PATTERNS = (
+    r'^\d+\s*$',                              # 纯页码
+    r'^Page\s+\d+\s*$',                       # "Page 1"
+    r'^\[[\w\.\s]+\]$',                       # [cs.AI]
+    r'^\d{1,2}\s+[A-Z][a-z]{2}\s+\d{4}$',    # 日期: 10 Nov 2025
+    r'^arXiv:\d+\.\d+v?\d*$',                 # arXiv:2511.07587v1
+    r'^v\d+$',                                # v1, v2
+    r'^viXra$',                               # viXra
+)
+
+EXTENDED_NOISE_PATTERNS = BASIC_NOISE_PATTERNS + (
+    r'^voN$',                                 # Nov 倒序
+    r'^][\w\.]+\[$',                          # ]cs.AI[
+    r'^\d+v\d+\.\d+$',                        # 1v78570.1152
+    r'^[A-Z]{2,4}$',                          # 大写缩写
+    r'^Copyright\s*©',                        # 版权信息
+    r'^www\.',                                # 网址
+    r'^\{[\w\s,@\.]+\}$',                    # 邮箱列表
+)
+
+LAYOUT_NOISE_PATTERNS = BASIC_NOISE_PATTERNS + (
+    r'^[A-Z]{2,4}$',                          # 缩写（如 AI, ML）
+)
+
+# 短行碎片过滤时保留的关键词
+FRAGMENT_KEEP_KEYWORDS = ('Abstract', 'Introduction', 'Method', 'Result', 'Conclusion')
+
+
+@dataclass(frozen=True)
+class ExtractionProfile:
+    """一套完整的布局检测 + 文本提取 + 清理参数"""
+
+    name: str
+
+    # 内容区域检测（文本密度条带）
+    density_strips: int = 20
+    density_threshold: float = 0.3
+    force_left_margin: bool = True            # 左边界落在页面 10% 以内时强制移到 12%（排除边栏）
+    header_footer_cutoff: Optional[float] = 0.05  # 排除上下各 5%；None 表示直接使用文本块边界
+    area_margin: float = 0.3                  # 边距（条带宽度的倍数）
+    pad_left: bool = False                    # 左边界是否也向外扩边距
+
+    # 栏检测（水平占用条带）
+    column_strips: int = 200
+    min_gap_strips: int = 8
+    block_tolerance: float = 10
+    gap_edge_margin: Optional[float] = 0.2    # 栏间隙必须位于内容区域中间（两侧各排除 20%）
+    min_column_blocks: int = 3                # 文本块少于该数量时直接回退
+    column_fallback: str = "split"            # 无法判断栏数时："split" 二分 / "single" 单栏
+
+    # 文本提取与清理
+    layout_text: bool = False                 # pdfplumber extract_text(layout=True)
+    noise_patterns: Tuple[str, ...] = EXTENDED_NOISE_PATTERNS
+    drop_fragments: bool = True               # 过滤不以标点结尾的短行碎片
+    simple_fast_path: bool = True             # 单栏纯文本文档改用 PyMuPDF 直接提取（见 classify.py）
+
+    # 所有噪声模式合并成的一个正则：每行只需一次 match
+    noise_re: Optional[Pattern] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "noise_re",
+                           re.compile("|".join(f"(?:{p})" for p in self.noise_patterns))
+                           if self.noise_patterns else None)
+
+
+FAST_PROFILE = ExtractionProfile(name="fast")
+
+LAYOUT_PROFILE = ExtractionProfile(
+    name="layout",
+    density_threshold=0.2,
+    force_left_margin=False,
+    header_footer_cutoff=None,
+    area_margin=0.5,
+    pad_left=True,
+    column_strips=100,
+    min_gap_strips=5,
+    block_tolerance=5,
+    gap_edge_margin=None,
+    min_column_blocks=0,
+    column_fallback="single",
+    layout_text=True,
+    noise_patterns=LAYOUT_NOISE_PATTERNS,
+    drop_fragments=False,
+    simple_fast_path=False,
+)
+
+PROFILES = {
+    FAST_PROFILE.name: FAST_PROFILE,
+    LAYOUT_PROFILE.name: LAYOUT_PROFILE,
+}
+
+DEFAULT_PROFILE = FAST_PROFILE.name
+
+
+def get_profile(profile=None) -> ExtractionProfile:
+    """按名称获取配置（也接受 ExtractionProfile 实例），未知名称抛出 ValueError"""
+    if isinstance(profile, ExtractionProfile):
+        return profile
+    profile = profile or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"未知的提取模式: {profile}（可选: {', '.join(PROFILES)}）")
+    return PROFILES[profile]
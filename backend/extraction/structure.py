@@ -0,0 +1,52 @@
+"""
+结构识别：章节标题与文档标题的 Markdown 标记
+"""
+
+import re
+
+SECTION_KEYWORDS = (
+    'Abstract', 'Introduction', 'Background', 'Related Work',
+    'Methodology', 'Method', 'Approach', 'Implementation',
+    'Results', 'Experiments', 'Evaluation', 'Discussion',
+    'Conclusion', 'Future Work', 'References', 'Acknowledgments',
+    'Acknowledgements', 'Appendix',
+)
+
+# 章节标题：以某个关键词开头、且比关键词最多长 9 个字符的行。
+# 关键词按长度降序合成一个正则，匹配到的是最长的关键词（长度限制最宽松），与逐个检查的结果相同
+_SECTION_RE = re.compile("|".join(re.escape(k) for k in sorted(SECTION_KEYWORDS, key=len, reverse=True)))
+_SECTION_MAX_LEN = max(map(len, SECTION_KEYWORDS)) + 9
+
+
+def is_section_heading(stripped: str) -> bool:
+    """（已去除首尾空白的）行是否为章节标题"""
+    if len(stripped) > _SECTION_MAX_LEN:
+        return False
+    match = _SECTION_RE.match(stripped)
+    return match is not None and len(stripped) < match.end() + 10
+
+
+def detect_structure(text: str, skipped: int = 0) -> str:
+    """检测文档结构，添加 Markdown 格式
+
+    skipped 为清理时从页面开头删掉的页眉行数：这些行仍占据"开头附近"的位置，
+    删掉页眉后下面的正文行不会因此被当作文档标题。
+    """
+    lines = text.split('\n')
+    formatted = []
+
+    for line in lines:
+        stripped = line.strip()
+
+        # 检测章节标题
+        if is_section_heading(stripped):
+            formatted.append(f"\n## {stripped}\n")
+        # 检测文档标题（开头附近较长且不以句号结尾的行）
+        elif (len(formatted) + skipped < 3 and
+                30 < len(stripped) < 200 and
+                not stripped.endswith(('.', '!', '?'))):
+            formatted.append(f"\n# {stripped}\n")
+        else:
+            formatted.append(line)
+
+    return '\n'.join(formatted)
@@ -0,0 +1,156 @@
+"""
+每页统计信息（/convert 响应中的 pages）
+
+内部用 __slots__ 数据类保存，不为每页构造一个带重复键名的 dict；图片保存为原始字节（ProcessedImage），
+只在输出时转换为以下两种布局（图片和缩略图为 data URL）：
+
+- records（默认）：每页一个对象 {"page", "text_len", "table_count", "table_details", ...}，与旧版响应一致
+- columns：各字段各一个数组，下标对应同一页 {"page": [...], "text_len": [...], ...}，
+  上千页的文档体积小得多，构造和编码也更快；worker 回传结果时也用这种布局
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .images import ProcessedImage
+
+
+PAGES_LAYOUTS = ("records", "columns")
+
+# columns 布局中每页一个数值的字段
+_SCALAR_COLUMNS = ("page", "text_len", "table_count", "table_regions", "tables_skipped", "md_chars")
+
+
+@dataclass(slots=True)
+class PageSummary:
+    page: int
+    text_len: int
+    table_details: Tuple[Tuple[int, int], ...]  # 每个表格的 (行数, 列数)
+    table_regions: int
+    images: List[ProcessedImage]
+    thumbnails: Optional[List[ProcessedImage]] = None
+    md_chars: int = 0  # 该页 Markdown（各行以换行连接）的字符数，用于计算页在整篇 Markdown 中的位置
+    headings: Tuple[Tuple[int, int, str], ...] = ()  # 页内标题 (相对页首的字符偏移, 级别, 标题)，见 offsets.py
+
+    @property
+    def table_count(self) -> int:
+        return len(self.table_details)
+
+    @property
+    def tables_skipped(self) -> bool:
+        return not self.table_regions
+
+    def as_dict(self) -> Dict[str, Any]:
+        """records 布局中的一项（生成了缩略图时附带 thumbnails）"""
+        record = {
+            "page": self.page,
+            "text_len": self.text_len,
+            "table_count": self.table_count,
+            "table_details": [{"rows": rows, "cols": cols} for rows, cols in self.table_details],
+            "table_regions": self.table_regions,
+            "tables_skipped": self.tables_skipped,
+            "images": _data_urls(self.images),
+        }
+        if self.thumbnails is not None:
+            record["thumbnails"] = _data_urls(self.thumbnails)
+        return record
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "PageSummary":
+        return cls(
+            page=record["page"],
+            text_len=record["text_len"],
+            table_details=tuple((t["rows"], t["cols"]) for t in record["table_details"]),
+            table_regions=record["table_regions"],
+            images=_load_images(record["images"]),
+            thumbnails=_load_images(record.get("thumbnails")),
+            md_chars=record.get("md_chars", 0),
+            headings=tuple(tuple(h) for h in record.get("headings", ())),
+        )
+
+
+def _data_urls(images: Sequence[ProcessedImage]) -> List[str]:
+    return [image.data_url for image in images]
+
+
+def _load_images(urls: Optional[Sequence[str]]) -> Optional[List[ProcessedImage]]:
+    return [ProcessedImage.from_data_url(url) for url in urls] if urls is not None else None
+
+
+def page_spans(summaries: Sequence[PageSummary]) -> List[Tuple[int, int]]:
+    """每页 Markdown 在整篇（各页的行以换行连接）中的字符区间 [start, end)；没有内容的页为空区间"""
+    spans = []
+    pos = 0
+    for summary in summaries:
+        if summary.md_chars and pos:
+            pos += 1  # 与上一页之间的换行
+        spans.append((pos, pos + summary.md_chars))
+        pos += summary.md_chars
+    return spans
+
+
+def byte_offsets(text: str, char_offsets: Sequence[int]) -> List[int]:
+    """把递增的字符偏移换算为 UTF-8 字节偏移（只编码一遍）"""
+    if text.isascii():
+        return list(char_offsets)
+    result = []
+    pos_char = pos_byte = 0
+    for offset in char_offsets:
+        pos_byte += len(text[pos_char:offset].encode("utf-8"))
+        pos_char = offset
+        result.append(pos_byte)
+    return result
+
+
+def resolve_pages_layout(value: Optional[str]) -> str:
+    """解析 pages_layout 参数；未知取值抛 ValueError"""
+    if value is None or not value.strip():
+        return "records"
+    value = value.strip().lower()
+    if value not in PAGES_LAYOUTS:
+        raise ValueError(f"未知的 pages_layout: {value}（可选: {', '.join(PAGES_LAYOUTS)}）")
+    return value
+
+
+def summaries_as_columns(summaries: Sequence[PageSummary], images: bool = True) -> Dict[str, list]:
+    """columns 布局；table_details 为每页一个 [[行数, 列数], ...]，有缩略图时附带 thumbnails
+
+    images 为 False 时不输出图片和缩略图（二进制结果中图片以原始字节另外存放）。
+    """
+    columns: Dict[str, list] = {name: [getattr(s, name) for s in summaries] for name in _SCALAR_COLUMNS}
+    columns["table_details"] = [[list(t) for t in s.table_details] for s in summaries]
+    columns["headings"] = [[list(h) for h in s.headings] for s in summaries]
+    if not images:
+        return columns
+    columns["images"] = [_data_urls(s.images) for s in summaries]
+    if any(s.thumbnails is not None for s in summaries):
+        columns["thumbnails"] = [_data_urls(s.thumbnails or ()) for s in summaries]
+    return columns
+
+
+def summaries_from_columns(columns: Dict[str, list]) -> List[PageSummary]:
+    thumbnails = columns.get("thumbnails") or [None] * len(columns["page"])
+    md_chars = columns.get("md_chars") or [0] * len(columns["page"])
+    headings = columns.get("headings") or [()] * len(columns["page"])
+    return [
+        PageSummary(page, text_len, tuple(tuple(t) for t in details), regions, _load_images(images),
+                    _load_images(thumbs or None), chars, tuple(tuple(h) for h in page_headings))
+        for page, text_len, details, regions, images, thumbs, chars, page_headings in zip(
+            columns["page"], columns["text_len"], columns["table_details"], columns["table_regions"],
+            columns["images"], thumbnails, md_chars, headings,
+        )
+    ]
+
+
+def pages_payload(summaries: Sequence[PageSummary], layout: str = "records") -> Union[list, dict]:
+    """响应中的 pages 字段"""
+    if layout == "columns":
+        return summaries_as_columns(summaries)
+    return [s.as_dict() for s in summaries]
+
+
+def load_summaries(pages: Union[list, dict]) -> List[PageSummary]:
+    """pages_payload() 的逆操作（两种布局均可）"""
+    if isinstance(pages, dict):
+        return summaries_from_columns(pages)
+    return [PageSummary.from_dict(record) for record in pages]
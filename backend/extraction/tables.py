@@ -0,0 +1,198 @@
+"""
+表格提取引擎
+
+提供统一的表格引擎接口，两种实现：
+1. pdfplumber：page.extract_tables()（默认，兼容旧版输出）
+2. PyMuPDF：page.find_tables()，复用已经打开的 fitz 文档，速度更快
+
+两种引擎都只在预筛选得到的候选区域内运行，并共享同一套 Markdown 渲染和统计逻辑。
+"""
+
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, Dict
+
+
+# 条件导入 PyMuPDF
+try:
+    import fitz
+    HAS_PYMUPDF = True
+except ImportError:
+    fitz = None
+    HAS_PYMUPDF = False
+
+
+Region = Tuple[float, float, float, float]
+Table = List[List[Optional[str]]]
+
+
+def has_vector_paths(page_pymupdf) -> bool:
+    """用 PyMuPDF 的绘图列表快速判断页面是否存在任何矢量路径（直线、矩形、曲线）"""
+    try:
+        get_drawings = getattr(page_pymupdf, "get_cdrawings", None) or page_pymupdf.get_drawings
+        for path in get_drawings():
+            if path.get("items"):
+                return True
+        return False
+    except Exception:
+        # 无法判断时视为存在，交给 pdfplumber 继续检查
+        return True
+
+
+def find_table_regions(page, page_pymupdf=None, tolerance: float = 5) -> List[Region]:
+    """表格候选预筛选：根据直线/矩形分布找出可能包含表格的区域
+
+    pdfplumber 默认的 "lines" 策略只依赖页面上的边线（直线、矩形边、曲线），
+    没有边线的页面不可能检测出表格，可以直接跳过 extract_tables()。
+    返回候选区域列表 [(x0, top, x1, bottom), ...]，空列表表示跳过。
+    """
+    # 第一关：PyMuPDF 绘图列表为空时直接跳过（无需让 pdfplumber 计算边线）
+    if page_pymupdf is not None and not has_vector_paths(page_pymupdf):
+        return []
+
+    # 第二关：pdfplumber 的直线/矩形/曲线计数
+    if not (page.lines or page.rects or page.curves):
+        return []
+
+    # 第三关：把相互接触的边线聚类成区域，每个区域至少需要 2 条横线和 2 条竖线
+    clusters = []  # [x0, top, x1, bottom, 横线数, 竖线数]
+    for edge in page.edges:
+        is_h = edge["orientation"] == "h"
+        box = [edge["x0"], edge["top"], edge["x1"], edge["bottom"], int(is_h), int(not is_h)]
+        for cluster in clusters:
+            if (box[0] <= cluster[2] + tolerance and box[2] >= cluster[0] - tolerance and
+                    box[1] <= cluster[3] + tolerance and box[3] >= cluster[1] - tolerance):
+                cluster[0] = min(cluster[0], box[0])
+                cluster[1] = min(cluster[1], box[1])
+                cluster[2] = max(cluster[2], box[2])
+                cluster[3] = max(cluster[3], box[3])
+                cluster[4] += box[4]
+                cluster[5] += box[5]
+                break
+        else:
+            clusters.append(box)
+
+    # 合并扩张后重叠的区域，直到稳定
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(clusters)):
+            for j in range(i + 1, len(clusters)):
+                a, b = clusters[i], clusters[j]
+                if (a[0] <= b[2] + tolerance and a[2] >= b[0] - tolerance and
+                        a[1] <= b[3] + tolerance and a[3] >= b[1] - tolerance):
+                    clusters[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]),
+                                   max(a[3], b[3]), a[4] + b[4], a[5] + b[5]]
+                    del clusters[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    px0, ptop, px1, pbottom = page.bbox
+    regions = []
+    for x0, top, x1, bottom, h_count, v_count in clusters:
+        if h_count < 2 or v_count < 2:
+            continue
+        regions.append((
+            max(px0, x0 - tolerance), max(ptop, top - tolerance),
+            min(px1, x1 + tolerance), min(pbottom, bottom + tolerance),
+        ))
+    regions.sort(key=lambda r: (r[1], r[0]))
+    return regions
+
+
+def table_to_markdown(tbl: Table) -> List[str]:
+    """把表格渲染为 Markdown 行（首行作为表头），末尾带一个空行"""
+    header = tbl[0]
+    lines = ["| " + " | ".join((str(h) if h is not None else "") for h in header) + " |"]
+    lines.append("|" + "|".join(["---"] * len(header)) + "|")
+    for row in tbl[1:]:
+        lines.append("| " + " | ".join((str(cell) if cell is not None else "") for cell in row) + " |")
+    lines.append("")
+    return lines
+
+
+def table_shape(tbl: Table) -> Tuple[int, int]:
+    """单个表格的 (数据行数, 列数)"""
+    header = tbl[0]
+    return len(tbl) - 1, len(header) if header else 0
+
+
+def table_stats(tbl: Table) -> Dict[str, int]:
+    """单个表格的统计信息（与 table_details 的格式一致）"""
+    rows, cols = table_shape(tbl)
+    return {"rows": rows, "cols": cols}
+
+
+class TableEngine(ABC):
+    """表格引擎接口：在候选区域内提取表格，返回行列二维列表
+
+    抽象基类：子类没有实现 extract_tables() 时在创建实例时就会报错，而不是转换到一半才失败。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def extract_tables(self, page_plumber, page_pymupdf, regions: List[Region]) -> List[Table]:
+        """在 regions（find_table_regions 的结果）内提取表格"""
+
+
+class PdfplumberTableEngine(TableEngine):
+    """pdfplumber 实现：对每个候选区域裁剪后调用 extract_tables()"""
+
+    name = "pdfplumber"
+
+    def extract_tables(self, page_plumber, page_pymupdf, regions: List[Region]) -> List[Table]:
+        tables = []
+        for region in regions:
+            try:
+                tables.extend(page_plumber.crop(region).extract_tables())
+            except Exception:
+                pass
+        return tables
+
+
+class PyMuPDFTableEngine(TableEngine):
+    """PyMuPDF 实现：page.find_tables(clip=...)，缺少 PyMuPDF 时回退到 pdfplumber"""
+
+    name = "pymupdf"
+
+    def __init__(self):
+        self.fallback = PdfplumberTableEngine()
+
+    def extract_tables(self, page_plumber, page_pymupdf, regions: List[Region]) -> List[Table]:
+        if page_pymupdf is None or not hasattr(page_pymupdf, "find_tables"):
+            return self.fallback.extract_tables(page_plumber, page_pymupdf, regions)
+
+        tables = []
+        for region in regions:
+            try:
+                found = page_pymupdf.find_tables(clip=fitz.Rect(region))
+            except Exception:
+                continue
+            for tab in found.tables:
+                rows = tab.extract()
+                # 表头位于表格外部时，find_tables 不会把它放进 extract() 的结果
+                if tab.header and tab.header.external:
+                    rows = [tab.header.names] + rows
+                if rows:
+                    tables.append(rows)
+        return tables
+
+
+TABLE_ENGINES = {
+    PdfplumberTableEngine.name: PdfplumberTableEngine,
+    PyMuPDFTableEngine.name: PyMuPDFTableEngine,
+}
+
+DEFAULT_TABLE_ENGINE = PdfplumberTableEngine.name
+
+
+def get_table_engine(name=None) -> TableEngine:
+    """按名称创建表格引擎（也接受 TableEngine 实例），未知名称抛出 ValueError"""
+    if isinstance(name, TableEngine):
+        return name
+    name = name or DEFAULT_TABLE_ENGINE
+    if name not in TABLE_ENGINES:
+        raise ValueError(f"未知的表格引擎: {name}（可选: {', '.join(TABLE_ENGINES)}）")
+    return TABLE_ENGINES[name]()
@@ -0,0 +1,88 @@
+"""
+分阶段计时
+
+StageTimings 按请求累计每个阶段（ocr、layout、columns、cleaning、structure、tables、images）
+的耗时，同时记录每一页的分阶段耗时。未传入计时器时使用 NULL_TIMINGS，开销几乎为零。
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+
+STAGES = ("ocr", "layout", "columns", "cleaning", "structure", "tables", "images")
+
+
+class StageTimings:
+    """单个请求的分阶段计时器（非线程安全，每个请求一个实例）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.pages: Dict[int, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str, page: Optional[int] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, page)
+
+    def add(self, name: str, seconds: float, page: Optional[int] = None):
+        self.stages[name] += seconds
+        if page is not None:
+            per_page = self.pages.setdefault(page, defaultdict(float))
+            per_page[name] += seconds
+
+    def merge(self, other: "StageTimings"):
+        """并入另一个计时器的阶段耗时（如受限子进程中记录的结果）"""
+        for name, seconds in other.stages.items():
+            self.stages[name] += seconds
+        for page, stages in other.pages.items():
+            per_page = self.pages.setdefault(page, defaultdict(float))
+            for name, seconds in stages.items():
+                per_page[name] += seconds
+
+    def to_json(self) -> Dict[str, Any]:
+        """未取整的阶段 / 每页耗时（可 JSON 序列化，如 worker 进程回传给 API）"""
+        return {"stages": dict(self.stages), "pages": {str(page): dict(stages) for page, stages in self.pages.items()}}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "StageTimings":
+        timings = cls()
+        for name, seconds in data.get("stages", {}).items():
+            timings.stages[name] = seconds
+        for page, stages in data.get("pages", {}).items():
+            timings.pages[int(page)] = defaultdict(float, stages)
+        return timings
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self, include_pages: bool = True) -> Dict[str, Any]:
+        """响应中的 timings 块（单位：秒）"""
+        data = {
+            "total_s": round(self.total(), 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+        }
+        if include_pages:
+            data["pages"] = [
+                {"page": page, **{name: round(seconds, 4) for name, seconds in stages.items()}}
+                for page, stages in sorted(self.pages.items())
+            ]
+        return data
+
+
+class _NullTimings:
+    """不计时的占位实现"""
+
+    def stage(self, name: str, page: Optional[int] = None):
+        return nullcontext()
+
+    def add(self, name: str, seconds: float, page: Optional[int] = None):
+        pass
+
+
+NULL_TIMINGS = _NullTimings()
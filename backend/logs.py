@@ -0,0 +1,145 @@
+"""
+日志配置：请求 ID、级别、文本 / JSON 输出
+
+所有模块使用标准库 logging，记录器名称统一以 "pdf2md." 开头
+（如 logging.getLogger("pdf2md.extraction.pipeline")），这里只负责配置。
+
+- 请求 ID 放在 contextvar 中，由 main.py 的中间件设置，线程池里的转换任务会继承，
+  每条日志自动带上 request_id
+- 日志先进入内存队列，由后台线程写到 stderr：请求线程不会阻塞在终端 / 管道 I/O 上，
+  多个请求的输出也不会交错
+- 逐页的调试信息使用 logger.debug("...%s", arg) 形式，未开启 DEBUG 时只有一次级别判断
+
+环境变量:
+    PDF2MD_LOG_LEVEL   DEBUG / INFO（默认）/ WARNING / ERROR
+    PDF2MD_LOG_FORMAT  text（默认）/ json / plain（只输出消息本身，命令行工具使用）
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from typing import Optional
+
+
+LOGGER_NAME = "pdf2md"
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# LogRecord 自带的属性；其余属性视为通过 extra= 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+REQUEST_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_request_id(requested: Optional[str] = None) -> str:
+    """生成请求 ID；客户端通过 X-Request-ID 提供的 ID 格式合法（uuid4().hex）时沿用，便于提前知道 ID 以取消任务"""
+    if requested and REQUEST_ID_RE.match(requested):
+        return requested
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> str:
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """把当前请求 ID 写入日志记录（在调用方线程执行，contextvar 才有效）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """每行一个 JSON 对象，extra= 传入的字段原样输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+FORMATTERS = {
+    "text": TextFormatter,
+    "json": JsonFormatter,
+    "plain": lambda: logging.Formatter("%(message)s"),
+}
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> logging.Logger:
+    """
+    配置 "pdf2md" 记录器（可重复调用，后一次覆盖前一次）
+
+    Args:
+        level: 日志级别，默认取 PDF2MD_LOG_LEVEL 或 INFO
+        fmt: text / json / plain，默认取 PDF2MD_LOG_FORMAT 或 text
+    """
+    global _listener
+
+    level = (level or os.getenv("PDF2MD_LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("PDF2MD_LOG_FORMAT", "text")).lower()
+    formatter = FORMATTERS.get(fmt, TextFormatter)()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+@atexit.register
+def _flush():
+    """进程退出前写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,625 +1,253 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
+from fastapi import FastAPI, UploadFile, File, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from io import BytesIO
-import pdfplumber
-import base64
+import asyncio
+import logging
 import tempfile
+import time
 import os
-import sys
-import shutil
 
-# 尝试导入 PyMuPDF，若环境没有安装则走降级路径
 try:
-    import fitz  # PyMuPDF
-    HAS_FITZ = True
-except Exception:
-    fitz = None
-    HAS_FITZ = False
-
-# 配置 OCR 依赖路径（Windows 系统）
-def setup_ocr_dependencies():
-    """在 Windows 上自动检测并配置 OCR 依赖（Tesseract 和 Ghostscript）"""
-    tesseract_ok = False
-    ghostscript_ok = False
-    
-    if sys.platform == "win32":
-        # 1. 检查 Tesseract
-        tesseract_paths = [
-            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-            r"C:\Users\{}\AppData\Local\Programs\Tesseract-OCR\tesseract.exe".format(os.getenv("USERNAME", "")),
-        ]
-        
-        if shutil.which("tesseract"):
-            tesseract_ok = True
-            print("✓ 找到 Tesseract（已在 PATH 中）")
-        else:
-            for path in tesseract_paths:
-                if os.path.exists(path):
-                    tesseract_dir = os.path.dirname(path)
-                    os.environ["PATH"] = tesseract_dir + os.pathsep + os.environ["PATH"]
-                    tesseract_ok = True
-                    print(f"✓ 找到 Tesseract: {path}")
-                    break
-        
-        if not tesseract_ok:
-            print("⚠ 警告：未找到 Tesseract OCR")
-            print("   下载地址: https://github.com/UB-Mannheim/tesseract/wiki")
-            print("   安装时请勾选 'Chinese - Simplified' 语言包")
-        
-        # 2. 检查 Ghostscript
-        ghostscript_paths = [
-            r"C:\Program Files\gs\gs10.02.1\bin\gswin64c.exe",  # 最新版本
-            r"C:\Program Files\gs\gs10.02.0\bin\gswin64c.exe",
-            r"C:\Program Files\gs\gs10.01.2\bin\gswin64c.exe",
-            r"C:\Program Files\gs\gs10.00.0\bin\gswin64c.exe",
-            r"C:\Program Files (x86)\gs\gs10.02.1\bin\gswin32c.exe",
-            r"C:\Program Files (x86)\gs\gs10.02.0\bin\gswin32c.exe",
-        ]
-        
-        if shutil.which("gs") or shutil.which("gswin64c") or shutil.which("gswin32c"):
-            ghostscript_ok = True
-            print("✓ 找到 Ghostscript（已在 PATH 中）")
-        else:
-            for path in ghostscript_paths:
-                if os.path.exists(path):
-                    gs_dir = os.path.dirname(path)
-                    os.environ["PATH"] = gs_dir + os.pathsep + os.environ["PATH"]
-                    ghostscript_ok = True
-                    print(f"✓ 找到 Ghostscript: {path}")
-                    break
-        
-        if not ghostscript_ok:
-            print("⚠ 警告：未找到 Ghostscript")
-            print("   下载地址: https://ghostscript.com/releases/gsdnld.html")
-            print("   建议安装最新版本的 64 位版本")
-        
-        return tesseract_ok and ghostscript_ok
-    
-    # 非 Windows 系统，假设依赖已在 PATH 中
-    return True
+    from backend.extraction import (
+        DEFAULT_IMAGE_OPTIONS, IMAGE_CACHE, CancelToken, ConversionCancelled, PageSelectionError, StageTimings,
+        byte_offsets, get_engine, get_profile, get_table_engine, load_summaries, page_spans,
+        pages_payload, parse_page_ranges, resolve_pages_layout,
+        run_cancellable, split_pages, summaries_as_columns, summary_offset_index,
+        validate_chunk_options, MarkdownChunker, CHUNK_MAX_CHARS, CHUNK_OVERLAP,
+    )
+    from backend.metrics import METRICS
+    from backend import profiling
+    from backend.logs import current_request_id, new_request_id, request_id_var, setup_logging
+    from backend.admission import LIMITS, ResourceLimitExceeded, admit
+    from backend.conversion import (
+        convert_chunk, join_markdown, list_selected_pages, log_extracted,
+        ocr_pdf_bytes, pdf_bytes_to_markdown, run_conversion,  # noqa: F401（pdf_bytes_to_markdown 保留旧的导入路径）
+    )
+    from backend.batch import BatchError, unpack_uploads
+    from backend.broker import Job, ResultCollector, open_broker
+    from backend.scheduler import BATCH, INTERACTIVE, Scheduler, plan_chunks, resolve_priority
+    from backend.responses import FastJSONResponse, dumps
+    from backend import resultpack
+except ImportError:
+    # 直接运行 python backend/main.py 时 backend 不是包
+    from extraction import (
+        DEFAULT_IMAGE_OPTIONS, IMAGE_CACHE, CancelToken, ConversionCancelled, PageSelectionError, StageTimings,
+        byte_offsets, get_engine, get_profile, get_table_engine, load_summaries, page_spans,
+        pages_payload, parse_page_ranges, resolve_pages_layout,
+        run_cancellable, split_pages, summaries_as_columns, summary_offset_index,
+        validate_chunk_options, MarkdownChunker, CHUNK_MAX_CHARS, CHUNK_OVERLAP,
+    )
+    from metrics import METRICS
+    import profiling
+    from logs import current_request_id, new_request_id, request_id_var, setup_logging
+    from admission import LIMITS, ResourceLimitExceeded, admit
+    from conversion import (
+        convert_chunk, join_markdown, list_selected_pages, log_extracted,
+        ocr_pdf_bytes, pdf_bytes_to_markdown, run_conversion,  # noqa: F401（pdf_bytes_to_markdown 保留旧的导入路径）
+    )
+    from batch import BatchError, unpack_uploads
+    from broker import Job, ResultCollector, open_broker
+    from scheduler import BATCH, INTERACTIVE, Scheduler, plan_chunks, resolve_priority
+    from responses import FastJSONResponse, dumps
+    import resultpack
 
-# 尝试导入 OCR 引擎（OCRMyPDF）
-OCR_AVAILABLE = False
-try:
-    import ocrmypdf
-    # 配置 OCR 依赖
-    deps_ok = setup_ocr_dependencies()
-    OCR_AVAILABLE = deps_ok
-    
-    if deps_ok:
-        print("✓ OCR 功能已启用")
-        # 显示可用的语言包
-        try:
-            langs = get_available_ocr_languages()
-            if langs:
-                has_chinese = "chi_sim" in langs or "chi_tra" in langs
-                if has_chinese:
-                    print(f"✓ 支持中文 OCR（已安装中文语言包）")
-                else:
-                    print(f"⚠ 中文语言包未安装，只能识别英文")
-                    print(f"   安装中文包: 运行 .\\verify_chinese_language.bat 查看说明")
-                print(f"   可用语言: {', '.join(langs[:10])}")  # 只显示前10个
-        except Exception:
-            pass
-    else:
-        print("⚠ OCR 功能已禁用（缺少必要的依赖）")
-        print("   应用将跳过 OCR 步骤，仅提取 PDF 中的文本内容")
-except Exception as e:
-    ocrmypdf = None
-    OCR_AVAILABLE = False
-    print(f"⚠ OCR 功能已禁用: {e}")
-
-def get_available_ocr_languages():
-    """检测 Tesseract 可用的语言包"""
+setup_logging()
+logger = logging.getLogger("pdf2md.main")
+
+IMAGE_CACHE.on_lookup = lambda hit: METRICS.record_cache("images", hit)
+# 启动时准备好本进程的转换引擎（配置、表格引擎、OCR 能力等），请求中直接复用（见 extraction/engine.py）
+ENGINE = get_engine()
+ENGINE.on_cache_lookup = METRICS.record_cache
+ENGINE.detect_ocr()
+
+# 进行中的任务（请求 ID → 取消令牌），供 DELETE /jobs/{request_id} 使用
+ACTIVE_JOBS: dict[str, CancelToken] = {}
+
+# /convert 的 output 参数：整篇 Markdown（JSON 或二进制），或按章节分块的 NDJSON 流
+OUTPUT_MODES = ("markdown", "chunks")
+
+
+async def watch_disconnect(request: Request, cancel: CancelToken, interval: float = 0.5):
+    """客户端断开连接（如关闭浏览器标签页）时触发取消"""
+    while not cancel.cancelled:
+        if await request.is_disconnected():
+            cancel.cancel("客户端已断开连接")
+            return
+        await asyncio.sleep(interval)
+
+
+async def run_scheduled(priority: str, tenant: str, cancel: CancelToken, func, /, *args, **kwargs):
+    """按优先级和租户排队等待转换槽位，拿到后在工作线程中执行 func(*args, **kwargs)"""
+    METRICS.job_queued()
+    started = False
     try:
-        result = os.popen("tesseract --list-langs 2>&1").read()
-        # 解析输出，获取语言列表
-        lines = result.strip().split('\n')
-        languages = []
-        found_list = False
-        for line in lines:
-            if "List of available languages" in line:
-                found_list = True
-                continue
-            if found_list and line.strip():
-                languages.append(line.strip())
-        return languages
-    except Exception:
-        return ["eng"]  # 默认只有英文
+        async with SCHEDULER.slot(priority, tenant):
+            METRICS.job_started()
+            started = True
+            # 排队期间客户端可能已经离开
+            cancel.check()
+            return await run_in_threadpool(func, *args, **kwargs)
+    finally:
+        # 排队中的任务可能随请求一起被取消
+        if started:
+            METRICS.job_finished()
+        else:
+            METRICS.job_dequeued()
 
-def ocr_pdf_bytes(pdf_bytes: bytes) -> bytes | None:
-    """尝试对 PDF 进行 OCR 处理，失败时返回 None"""
-    if not OCR_AVAILABLE:
-        return None
-    
-    with tempfile.TemporaryDirectory() as td:
-        in_path = os.path.join(td, "input.pdf")
-        with open(in_path, "wb") as f:
-            f.write(pdf_bytes)
-        out_path = os.path.join(td, "output.pdf")
-        
-        # 检测可用的语言包
-        available_langs = get_available_ocr_languages()
-        
-        # 构建语言参数：优先使用中英文，如果中文不可用则只用英文
-        if "chi_sim" in available_langs:
-            language = "eng+chi_sim"
-            lang_desc = "英文+简体中文"
-        elif "eng" in available_langs:
-            language = "eng"
-            lang_desc = "英文"
-            print("⚠ 提示: 未找到中文语言包，将只使用英文 OCR")
-            print("   如需中文识别，请运行: .\\verify_chinese_language.bat")
+
+async def iter_conversion(pdf_bytes: bytes, timings: StageTimings, cancel: CancelToken,
+                          priority: str = INTERACTIVE, tenant: str = "-", profiler: str | None = None,
+                          request_id: str | None = None, pages: str | None = None,
+                          max_pages: int | None = None, ocr: bool = True, **options):
+    """调度一次转换，按页序逐块产出 (Markdown 行, 每页摘要)；全部行以换行连接即为完整的 Markdown
+
+    通常按页分块：OCR（如启用）占用一个槽位，之后每 PDF2MD_CHUNK_PAGES 页一块分别排队，
+    大文档不会长时间占住槽位，其他请求可以插在它的分块之间（见 backend/scheduler.py），
+    前面的块完成后即可产出，不必等整个文档。
+    性能分析和 CPU / 内存上限需要在同一线程 / 子进程中完成整个转换，此时整体占用一个槽位，只产出一次。
+    设置了 PDF2MD_BROKER 时整个文档作为一个任务交给 worker 进程。
+    """
+    if BROKER is not None or profiler or LIMITS.isolated:
+        if BROKER is not None:
+            markdown, summaries = await run_remote(pdf_bytes, timings, cancel, priority, tenant, request_id,
+                                                   profiler=profiler, pages=pages, max_pages=max_pages, ocr=ocr,
+                                                   **options)
         else:
-            # 使用第一个可用的语言
-            language = available_langs[0] if available_langs else "eng"
-            lang_desc = language
-        
-        try:
-            print(f"正在进行 OCR 处理（{lang_desc}）...")
-            ocrmypdf.ocr(
-                in_path, 
-                out_path, 
-                language=language, 
-                force_ocr=True,
-                skip_text=False,
-                quiet=True  # 减少输出噪音
-            )
-            with open(out_path, "rb") as f:
-                ocr_result = f.read()
-                print(f"✓ OCR 处理完成")
-                return ocr_result
-        except FileNotFoundError as e:
-            print(f"⚠ OCR 失败: 缺少必要的工具 - {e}")
-            return None
-        except Exception as e:
-            error_msg = str(e)
-            if "language data" in error_msg.lower():
-                print(f"⚠ OCR 失败: 缺少语言包")
-                print(f"   请运行: .\\verify_chinese_language.bat 检查语言包")
-                print(f"   或运行: .\\download_chinese_traineddata.ps1 自动下载")
-            else:
-                print(f"⚠ OCR 处理失败: {e}")
-            print("   将使用原始 PDF 继续处理...")
-            return None
+            markdown, summaries = await run_scheduled(priority, tenant, cancel, run_conversion, pdf_bytes, timings,
+                                                      profiler, request_id, cancel, pages=pages,
+                                                      max_pages=max_pages, ocr=ocr, **options)
+        yield [markdown] if markdown else [], summaries
+        return
 
-def detect_content_area(page):
-    """使用 PyMuPDF 检测主内容区域（排除边栏、页眉页脚）"""
-    if not HAS_FITZ:
-        return None
-    
-    try:
-        blocks = page.get_text("dict")["blocks"]
-        text_blocks = [b for b in blocks if b["type"] == 0]
-        
-        if not text_blocks:
-            return None
-        
-        all_bboxes = [b["bbox"] for b in text_blocks]
-        page_width = page.rect.width
-        page_height = page.rect.height
-        
-        # 分析文本密度分布
-        num_strips = 20
-        strip_width = page_width / num_strips
-        density = [0.0] * num_strips
-        
-        for bbox in all_bboxes:
-            x0, y0, x1, y1 = bbox
-            area = (x1 - x0) * (y1 - y0)
-            start_strip = int(x0 / strip_width)
-            end_strip = int(x1 / strip_width)
-            
-            for i in range(start_strip, min(end_strip + 1, num_strips)):
-                if 0 <= i < num_strips:
-                    density[i] += area
-        
-        # 找出密度显著的区域
-        max_density = max(density) if density else 0
-        if max_density == 0:
-            return None
-        
-        # 使用更高的阈值来排除边栏
-        threshold = max_density * 0.3  # 从 0.2 提高到 0.3
-        significant_strips = [i for i, d in enumerate(density) if d > threshold]
-        
-        if not significant_strips:
-            return None
-        
-        # 计算主内容区域边界
-        content_x_min = min(significant_strips) * strip_width
-        content_x_max = (max(significant_strips) + 1) * strip_width
-        
-        # 额外检查：如果左边界太靠左（可能包含边栏），强制向右移动
-        if content_x_min < page_width * 0.1:  # 左边界在页面10%以内
-            content_x_min = page_width * 0.12  # 强制从12%开始
-        
-        # Y 轴：排除最上方和最下方（页眉页脚）
-        y_coords = [(bbox[1], bbox[3]) for bbox in all_bboxes]
-        y_starts = sorted([y[0] for y in y_coords])
-        y_ends = sorted([y[1] for y in y_coords])
-        
-        # 排除最上方 5% 和最下方 5%
-        content_y_min = max(y_starts[0], page_height * 0.05)
-        content_y_max = min(y_ends[-1], page_height * 0.95)
-        
-        # 添加小边距避免裁剪过度
-        margin = strip_width * 0.3
-        content_x_min = max(content_x_min, content_x_min - margin)
-        content_x_max = min(page_width, content_x_max + margin)
-        
-        return (content_x_min, content_y_min, content_x_max, content_y_max)
-    
-    except Exception:
-        return None
+    page_list = await run_in_threadpool(list_selected_pages, pdf_bytes, pages, max_pages)
+    target_bytes = pdf_bytes
+    if ocr and ENGINE.ocr_available:
+        start = time.perf_counter()
+        ocr_bytes = await run_scheduled(priority, tenant, cancel, ocr_pdf_bytes, pdf_bytes,
+                                        page_list if pages or max_pages else None, cancel)
+        timings.add("ocr", time.perf_counter() - start)
+        if ocr_bytes:
+            target_bytes = ocr_bytes
 
+    # 快速路径等整个文档只判断一次（在全部所选页中抽查），各块共用，结果与整体转换一致
+    plan = await run_in_threadpool(ENGINE.plan_document, target_bytes, options.get("mode", "fast"), page_list,
+                                   options.get("fast_path", True))
 
-def detect_columns(page, content_bbox):
-    """检测栏布局（单栏/双栏/多栏）"""
-    if not HAS_FITZ:
-        # 回退方案：简单二分（假设双栏）
-        x0, y0, x1, y1 = content_bbox
-        mid_x = (x0 + x1) / 2
-        return [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
-    
+    # 各块同时排队、互不依赖，按页序取结果
+    last_page = page_list[-1] if page_list else 0
+    tasks = [
+        asyncio.ensure_future(run_scheduled(priority, tenant, cancel, convert_chunk, target_bytes, chunk, last_page,
+                                            ocr=False, cancel=cancel, plan=plan, **options))
+        for chunk in plan_chunks(page_list)
+    ]
+    summaries = []
     try:
-        x0, y0, x1, y1 = content_bbox
-        content_width = x1 - x0
-        
-        blocks = page.get_text("dict")["blocks"]
-        content_blocks = [
-            b for b in blocks 
-            if b["type"] == 0 and 
-            b["bbox"][0] >= x0 - 10 and 
-            b["bbox"][2] <= x1 + 10
-        ]
-        
-        if not content_blocks:
-            # 简单二分
-            mid_x = (x0 + x1) / 2
-            return [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
-        
-        # 收集所有文本块的中心点 X 坐标
-        x_centers = []
-        for block in content_blocks:
-            bbox = block["bbox"]
-            center_x = (bbox[0] + bbox[2]) / 2
-            x_centers.append(center_x)
-        
-        # 如果文本块少于3个，假设双栏
-        if len(x_centers) < 3:
-            mid_x = (x0 + x1) / 2
-            return [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
-        
-        # 分析水平占用情况（更精细）
-        num_strips = 200
-        strip_width = content_width / num_strips
-        occupancy = [0] * num_strips
-        
-        for block in content_blocks:
-            bbox = block["bbox"]
-            start_strip = int((bbox[0] - x0) / strip_width)
-            end_strip = int((bbox[2] - x0) / strip_width)
-            
-            for i in range(max(0, start_strip), min(end_strip + 1, num_strips)):
-                if 0 <= i < num_strips:
-                    occupancy[i] += 1
-        
-        # 识别栏间隙（连续的空白区域）
-        gaps = []
-        in_gap = False
-        gap_start = 0
-        min_gap_width = 8  # 提高阈值
-        
-        for i, occ in enumerate(occupancy):
-            if occ == 0:
-                if not in_gap:
-                    gap_start = i
-                    in_gap = True
-            else:
-                if in_gap:
-                    gap_width = i - gap_start
-                    if gap_width >= min_gap_width:
-                        gap_center = gap_start + gap_width / 2
-                        gap_pos = gap_center * strip_width + x0
-                        # 确保间隙在中间区域（排除边缘）
-                        if gap_pos > x0 + content_width * 0.2 and gap_pos < x1 - content_width * 0.2:
-                            gaps.append(gap_pos)
-                    in_gap = False
-        
-        # 如果没有检测到间隙，使用简单二分法
-        if len(gaps) == 0:
-            mid_x = (x0 + x1) / 2
-            return [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
-        
-        # 按间隙分割成多栏
-        columns = []
-        prev_x = x0
-        
-        for gap_x in sorted(gaps):
-            columns.append((prev_x, y0, gap_x, y1))
-            prev_x = gap_x
-        
-        columns.append((prev_x, y0, x1, y1))
-        return columns
-    
-    except Exception:
-        # 异常时回退到简单二分
-        x0, y0, x1, y1 = content_bbox
-        mid_x = (x0 + x1) / 2
-        return [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
+        for task in tasks:
+            chunk_lines, chunk_summaries, chunk_timings = await task
+            timings.merge(chunk_timings)
+            summaries.extend(chunk_summaries)
+            yield chunk_lines, chunk_summaries
+    finally:
+        # 某块出错或调用方提前结束时，其余块照常完成（工作线程运行时不能释放槽位）；
+        # 需要尽快结束时由调用方先触发 cancel
+        pending = [task for task in tasks if not task.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    log_extracted(summaries)
 
 
-import re
+async def schedule_conversion(pdf_bytes: bytes, timings: StageTimings, cancel: CancelToken,
+                              priority: str = INTERACTIVE, tenant: str = "-", profiler: str | None = None,
+                              request_id: str | None = None, pages: str | None = None,
+                              max_pages: int | None = None, ocr: bool = True, **options) -> tuple[str, list]:
+    """调度一次转换（见 iter_conversion），结果与 pdf_bytes_to_markdown() 相同"""
+    md_lines, summaries = [], []
+    async for chunk_lines, chunk_summaries in iter_conversion(pdf_bytes, timings, cancel, priority, tenant, profiler,
+                                                              request_id, pages, max_pages, ocr, **options):
+        md_lines.extend(chunk_lines)
+        summaries.extend(chunk_summaries)
+    return join_markdown(md_lines, summaries), summaries
 
-def clean_text(text):
-    """清理文本：去除噪声、修复断行"""
-    if not text:
-        return ""
-    
-    # 扩展噪声模式
-    noise_patterns = [
-        r'^\d+\s*$',                              # 纯数字
-        r'^Page\s+\d+\s*$',                       # Page 1
-        r'^\[[\w\.\s]+\]$',                       # [cs.AI]
-        r'^\d{1,2}\s+[A-Z][a-z]{2}\s+\d{4}$',    # 10 Nov 2025
-        r'^arXiv:\d+\.\d+v?\d*$',                 # arXiv:2511.07587v1
-        r'^v\d+$',                                # v1
-        r'^viXra$',                               # viXra
-        r'^voN$',                                 # Nov 倒序
-        r'^][\w\.]+\[$',                          # ]cs.AI[
-        r'^\d+v\d+\.\d+$',                        # 1v78570.1152
-        r'^[A-Z]{2,4}$',                          # 大写缩写
-        r'^Copyright\s*©',                        # 版权信息
-        r'^www\.',                                # 网址
-        r'^\{[\w\s,@\.]+\}$',                    # 邮箱列表
-    ]
-    
-    lines = text.split('\n')
-    cleaned = []
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i].rstrip()
-        
-        # 跳过空行和过短行
-        stripped = line.strip()
-        if not stripped or len(stripped) <= 2:
-            i += 1
-            continue
-        
-        # 跳过噪声行
-        is_noise = False
-        for pattern in noise_patterns:
-            if re.match(pattern, stripped):
-                is_noise = True
-                break
-        
-        # 跳过碎片化的短行（可能是边栏或被切断的文本）
-        if len(stripped) < 20 and not any(keyword in stripped for keyword in ['Abstract', 'Introduction', 'Method', 'Result', 'Conclusion']):
-            # 检查是否像是被切断的文本（没有句号结尾，且很短）
-            if not stripped.endswith(('.', '!', '?', ':', ';', ',', ')')):
-                is_noise = True
-        
-        if is_noise:
-            i += 1
-            continue
-        
-        # 压缩空格
-        line = ' '.join(line.split())
-        
-        # 修复连字符断行
-        if line.endswith('-') and i + 1 < len(lines):
-            next_line = lines[i + 1].strip()
-            if next_line and next_line[0].islower():
-                line = line[:-1] + next_line.split()[0]
-                remaining = ' '.join(next_line.split()[1:])
-                if remaining:
-                    lines[i + 1] = remaining
-                else:
-                    i += 1
-        
-        if line:
-            cleaned.append(line)
-        
-        i += 1
-    
-    return '\n'.join(cleaned)
 
+# worker 返回的错误类型 → API 中对应的异常（决定响应状态码）
+REMOTE_ERRORS = {
+    "rejected": PageSelectionError,
+    "limit_exceeded": ResourceLimitExceeded,
+    "cancelled": ConversionCancelled,
+}
 
-def detect_structure(text):
-    """检测文档结构，添加 Markdown 格式"""
-    lines = text.split('\n')
-    formatted = []
-    
-    section_keywords = [
-        'Abstract', 'Introduction', 'Background', 'Related Work',
-        'Methodology', 'Method', 'Approach', 'Implementation',
-        'Results', 'Experiments', 'Evaluation', 'Discussion',
-        'Conclusion', 'Future Work', 'References', 'Acknowledgments',
-        'Acknowledgements', 'Appendix'
+
+async def run_remote(pdf_bytes: bytes, timings: StageTimings, cancel: CancelToken, priority: str, tenant: str,
+                     request_id: str | None = None, **options) -> tuple[str, list]:
+    """把转换作为任务放入队列，等待 worker 返回结果；取消时通知 worker 中止"""
+    job = Job(payload=pdf_bytes, options=options, priority=priority, tenant=tenant,
+              request_id=request_id or current_request_id())
+    future = RESULTS.wait(job.id)
+    try:
+        await run_in_threadpool(BROKER.submit, job)
+        while not future.done():
+            if cancel.cancelled:
+                await run_in_threadpool(BROKER.cancel, job.id)
+                cancel.check()
+            await asyncio.wait({future}, timeout=0.5)
+    except asyncio.CancelledError:
+        # 批量请求的客户端断开时任务被取消
+        asyncio.get_running_loop().run_in_executor(None, BROKER.cancel, job.id)
+        raise
+    finally:
+        RESULTS.discard(job.id)
+
+    result = future.result()
+    if "timings" in result:
+        timings.merge(StageTimings.from_json(result["timings"]))
+    if "error" in result:
+        raise REMOTE_ERRORS.get(result["type"], RuntimeError)(result["error"])
+    return result["markdown"], load_summaries(result["pages"])
+
+
+def pack_binary_result(markdown: str, summaries: list, meta: dict) -> bytes:
+    """二进制结果（见 backend/resultpack.py）：每页统计按列放入 meta，图片以原始字节存放"""
+    spans = page_spans(summaries)
+    offsets = byte_offsets(markdown, [pos for span in spans for pos in span])
+    pages = [
+        (summary.page, offsets[2 * i], offsets[2 * i + 1] - offsets[2 * i],
+         [(image.data, image.format) for image in summary.images],
+         [(image.data, image.format) for image in summary.thumbnails or ()])
+        for i, summary in enumerate(summaries)
     ]
-    
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # 检测章节标题
-        is_section = False
-        for keyword in section_keywords:
-            if stripped == keyword or (stripped.startswith(keyword) and len(stripped) < len(keyword) + 10):
-                formatted.append(f"\n## {stripped}\n")
-                is_section = True
-                break
-        
-        if not is_section:
-            # 检测文档标题
-            if (len(formatted) < 3 and 
-                len(stripped) > 30 and 
-                len(stripped) < 200 and
-                not stripped.endswith(('.', '!', '?'))):
-                formatted.append(f"\n# {stripped}\n")
-            else:
-                formatted.append(line)
-    
-    return '\n'.join(formatted)
+    columns = summaries_as_columns(summaries, images=False)
+    meta = {"pages": columns, "offsets": summary_offset_index(markdown, summaries), **meta}
+    return resultpack.pack_result(markdown, pages, meta)
 
 
-def pdf_bytes_to_markdown(pdf_bytes: bytes) -> tuple[str, list]:
-    """Convert PDF bytes to Markdown and per-page summaries, including images (data URLs).
-    Returns (markdown_text, pages_summary).
-    pages_summary: list of dicts with keys: page, text_len, table_count, table_details, images
-    """
-    md_lines = []
-    pages = []
+def request_image_options(image_format: str | None, image_max_dim: int | None, image_quality: int | None,
+                          thumbnail: int | None) -> dict | None:
+    """请求中的图片处理参数（覆盖 PDF2MD_IMAGE_* 默认值）；都未指定时返回 None，参数无效时抛 ValueError"""
+    if image_format is None and image_max_dim is None and image_quality is None and thumbnail is None:
+        return None
+    return DEFAULT_IMAGE_OPTIONS.with_overrides(image_format, image_max_dim, image_quality, thumbnail).as_dict()
 
-    # 1) 尝试 OCR 提升文本质量
-    target_bytes = pdf_bytes
-    if OCR_AVAILABLE:
-        ocr_bytes = ocr_pdf_bytes(pdf_bytes)
-        if ocr_bytes:
-            target_bytes = ocr_bytes
 
-    # 2) 使用 PyMuPDF 进行布局分析
-    doc_pymupdf = None
-    if HAS_FITZ:
-        try:
-            doc_pymupdf = fitz.open(stream=target_bytes, filetype="pdf")
-        except Exception:
-            pass
-
-    # 3) 智能提取文本和表格
-    with pdfplumber.open(BytesIO(target_bytes)) as pdf:
-        for idx, page in enumerate(pdf.pages, start=1):
-            page_text_parts = []
-            
-            # 获取 PyMuPDF 页面用于布局分析
-            page_pymupdf = None
-            if doc_pymupdf and idx - 1 < doc_pymupdf.page_count:
-                page_pymupdf = doc_pymupdf.load_page(idx - 1)
-            
-            # 检测主内容区域
-            if page_pymupdf:
-                content_bbox = detect_content_area(page_pymupdf)
-            else:
-                content_bbox = None
-            
-            if content_bbox is None:
-                # 无 PyMuPDF 时，手动排除左侧边栏和页眉页脚
-                # 假设左侧边栏约占页面宽度的 10-12%
-                margin_left = page.width * 0.12
-                margin_top = page.height * 0.05
-                margin_bottom = page.height * 0.95
-                content_bbox = (margin_left, margin_top, page.width, margin_bottom)
-            
-            # 检测栏布局
-            if page_pymupdf:
-                columns = detect_columns(page_pymupdf, content_bbox)
-            else:
-                # 无 PyMuPDF 时，在排除边栏后的区域内二分
-                x0, y0, x1, y1 = content_bbox
-                mid_x = (x0 + x1) / 2
-                columns = [(x0, y0, mid_x, y1), (mid_x, y0, x1, y1)]
-            
-            # 调试信息
-            if idx == 1:
-                print(f"  页面 {idx}: 检测到 {len(columns)} 栏")
-                x0, y0, x1, y1 = content_bbox
-                print(f"  内容区域: x=[{x0:.1f}, {x1:.1f}], y=[{y0:.1f}, {y1:.1f}]")
-            
-            # 按栏提取文本
-            # 关键：每一栏单独提取，不使用 layout=True（会横着读）
-            for col_bbox in columns:
-                try:
-                    # 使用 within_bbox 限制区域，然后正常提取
-                    col_page = page.within_bbox(col_bbox)
-                    col_text = col_page.extract_text()
-                    
-                    if col_text:
-                        col_text = clean_text(col_text)
-                        if col_text.strip():
-                            page_text_parts.append(col_text)
-                
-                except Exception:
-                    pass
-            
-            # 合并所有栏的文本
-            page_text = '\n\n'.join(page_text_parts)
-            
-            # 结构识别
-            if page_text:
-                page_text = detect_structure(page_text)
-            
-            # 提取表格
-            tables = page.extract_tables()
-            
-            # 添加到输出（不添加分页标记，自然连接段落）
-            if page_text:
-                md_lines.append(page_text)
-                # 页面之间添加分隔（但不显示页码）
-                if idx < len(pdf.pages):  # 不是最后一页
-                    md_lines.append("")  # 空行分隔
-            
-            if tables:
-                for tbl in tables:
-                    if not tbl:
-                        continue
-                    header = tbl[0]
-                    md_lines.append("| " + " | ".join((str(h) if h is not None else "" ) for h in header) + " |")
-                    md_lines.append("|" + "|".join(["---"] * len(header)) + "|")
-                    for row in tbl[1:]:
-                        md_lines.append("| " + " | ".join((str(cell) if cell is not None else "" ) for cell in row) + " |")
-                    md_lines.append("")
-            
-            # 统计信息
-            text_len = len(page_text) if page_text else 0
-            table_details = []
-            if tables:
-                for tbl in tables:
-                    if not tbl:
-                        continue
-                    header = tbl[0]
-                    table_details.append({"rows": len(tbl) - 1, "cols": len(header) if header else 0})
-            
-            per_page = {
-                "page": idx, 
-                "text_len": text_len, 
-                "table_count": len(tables) if tables else 0, 
-                "table_details": table_details, 
-                "images": []
-            }
-            pages.append(per_page)
-
-    # 关闭 PyMuPDF 文档
-    if doc_pymupdf:
-        doc_pymupdf.close()
-
-    # 4) 图片提取（PyMuPDF）
-    if HAS_FITZ:
-        with fitz.open(stream=target_bytes, filetype="pdf") as doc:
-            for i in range(doc.page_count):
-                page = doc.load_page(i)
-                imgs = page.get_images(full=True)
-                data_urls = []
-                for img in imgs:
-                    xref = img[0]
-                    base = doc.extract_image(xref)
-                    image_bytes = base.get("image")
-                    ext = base.get("ext", "png")
-                    if image_bytes:
-                        b64 = base64.b64encode(image_bytes).decode("utf-8")
-                        data_urls.append(f"data:image/{ext};base64,{b64}")
-                pages[i]["images"] = data_urls
-
-    markdown = "\n".join(md_lines)
-    if not markdown.strip() and any(p.get("images") for p in pages):
-        markdown = "[该 PDF 可能包含图片，未检测到文本。若需要文本，请考虑对 PDF 进行 OCR。]"
-    return markdown, pages
+def request_tenant(request: Request) -> str:
+    """公平调度用的租户：X-Tenant-ID 请求头，没有时用客户端地址"""
+    return request.headers.get("x-tenant-id") or (request.client.host if request.client else "-")
+
 
 app = FastAPI(title="PDF to Markdown")
 
+# 前端目录按本文件位置定位，便于从任意工作目录导入（如批量转换脚本）
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
+
+# 同时进行的转换（分块）数量上限，超出的按优先级和租户排队（排队数量见 /metrics 的 pdf2md_queue_depth）
+MAX_CONCURRENT_CONVERSIONS = int(os.getenv("PDF2MD_MAX_CONCURRENCY", os.cpu_count() or 1))
+SCHEDULER = Scheduler(MAX_CONCURRENT_CONVERSIONS)
+
+# 设置 PDF2MD_BROKER 时本进程只负责 API，转换由独立的 worker 进程完成（见 backend/broker.py、backend/worker.py）
+BROKER = open_broker(os.getenv("PDF2MD_BROKER"))
+RESULTS = ResultCollector(BROKER) if BROKER is not None else None
+
 # 允许跨域（开发阶段，生产请用固定来源）
 app.add_middleware(
     CORSMiddleware,
@@ -629,21 +257,364 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RequestIdMiddleware:
+    """为每个请求分配 ID：写入该请求的所有日志，并通过 X-Request-ID 响应头返回
+
+    使用纯 ASGI 中间件而不是 @app.middleware("http")：后者会包装 receive，
+    端点里的 request.is_disconnected() 将无法感知客户端断开。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        requested = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1")
+        request_id = new_request_id(requested)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or []) + [(b"x-request-id", request_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
+app.add_middleware(RequestIdMiddleware)
+
+
+async def stream_chunks(conversion, chunker: MarkdownChunker, cancel: CancelToken, timings: StageTimings,
+                        request_id: str, include_timings: bool = False):
+    """/convert?output=chunks 的 NDJSON：每个分块一行，按页序在对应的页转换完成后立即输出
+
+    最后一行为 {"done": true, ...}；转换出错时最后一行为 {"error": ..., "status": HTTP 状态码}。
+    """
+    status = "error"
+    pages = chunks = 0
+    ACTIVE_JOBS[request_id] = cancel
+    try:
+        try:
+            async for md_lines, summaries in conversion:
+                pages += len(summaries)
+                for page, text in split_pages("\n".join(md_lines), summaries):
+                    for chunk in chunker.add_page(page, text):
+                        chunks += 1
+                        yield dumps(chunk.as_dict()) + b"\n"
+            for chunk in chunker.finish():
+                chunks += 1
+                yield dumps(chunk.as_dict()) + b"\n"
+            status = "ok"
+            summary = {"done": True, "chunks": chunks, "pages": pages,
+                       "duration_s": round(timings.total(), 4)}
+            if include_timings:
+                summary["timings"] = timings.as_dict()
+            yield dumps(summary) + b"\n"
+        except PageSelectionError as e:
+            status = "rejected"
+            yield dumps({"error": str(e), "status": 400}) + b"\n"
+        except ResourceLimitExceeded as e:
+            status = "limit_exceeded"
+            logger.warning("转换超过资源上限: %s", e)
+            yield dumps({"error": str(e), "status": 422}) + b"\n"
+        except ConversionCancelled as e:
+            status = "cancelled"
+            yield dumps({"error": f"转换已取消: {e}", "status": 499}) + b"\n"
+        except Exception as e:
+            logger.exception("转换失败: %s", e)
+            yield dumps({"error": f"Conversion error: {e}", "status": 500}) + b"\n"
+    finally:
+        # 客户端断开时 StreamingResponse 会关闭本生成器：停止尚未开始的分块
+        if status == "error" and not cancel.cancelled:
+            cancel.cancel("客户端已断开连接")
+        await conversion.aclose()
+        METRICS.observe_request("/convert", status, timings.total(), timings)
+        logger.info("/convert %s", status, extra={
+            "endpoint": "/convert", "status": status, "output": "chunks", "chunks": chunks,
+            "duration_s": round(timings.total(), 4),
+        })
+        ACTIVE_JOBS.pop(request_id, None)
+
+
 @app.post("/convert")
-async def convert(file: UploadFile = File(...)):
+async def convert(request: Request, file: UploadFile = File(...), table_engine: str = "pdfplumber",
+                  mode: str = "fast", timings: bool = False, profile: str | None = None,
+                  pages: str | None = None, max_pages: int | None = None, priority: str | None = None,
+                  image_format: str | None = None, image_max_dim: int | None = None,
+                  image_quality: int | None = None, thumbnail: int | None = None,
+                  pages_layout: str | None = None, offsets: bool = False, output: str = "markdown",
+                  chunk_max_chars: int = CHUNK_MAX_CHARS, chunk_overlap: int = CHUNK_OVERLAP,
+                  fast_path: bool = True):
+    # 上传文件已由框架落盘，超过大小上限时不再读入内存
+    if LIMITS.max_upload_bytes and file.size and file.size > LIMITS.max_upload_bytes:
+        METRICS.observe_request("/convert", "rejected", 0.0)
+        return JSONResponse({"error": f"文件超过大小上限 {LIMITS.max_upload_mb:g} MB"}, status_code=413)
+
     content = await file.read()
     try:
-        md, pages = pdf_bytes_to_markdown(content)
-        return JSONResponse({"markdown": md, "pages": pages})
-    except Exception as e:
-        return JSONResponse({"error": f"Conversion error: {e}"}, status_code=500)
+        get_table_engine(table_engine)
+        get_profile(mode)
+        parse_page_ranges(pages)
+        if max_pages is not None and max_pages < 1:
+            raise ValueError("max_pages 必须大于 0")
+        priority = resolve_priority(priority, INTERACTIVE)
+        image_options = request_image_options(image_format, image_max_dim, image_quality, thumbnail)
+        pages_layout = resolve_pages_layout(pages_layout)
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"未知的 output: {output}（可选: {', '.join(OUTPUT_MODES)}）")
+        if output == "chunks":
+            validate_chunk_options(chunk_max_chars, chunk_overlap)
+        # 性能分析：?profile=cprofile|sampling 或请求头 X-PDF2MD-Profile
+        profiler = profiling.resolve_profiler(profile or request.headers.get("x-pdf2md-profile"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    client_host = request.client.host if request.client else None
+    if profiler and not profiling.profiling_allowed(client_host):
+        return JSONResponse({"error": "该客户端未被允许进行性能分析（见 PDF2MD_PROFILE_ALLOWLIST）"},
+                            status_code=403)
+
+    request_id = current_request_id()
+    stage_timings = StageTimings()
+
+    # 准入控制：在占用转换槽位之前检查页数、大小和像素面积，决定拒绝或降级
+    try:
+        admission = await run_in_threadpool(admit, content, pages, max_pages)
+    except PageSelectionError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not admission.accepted:
+        METRICS.observe_request("/convert", "rejected", stage_timings.total())
+        logger.warning("拒绝请求: %s", "; ".join(admission.reasons), extra={"bytes": len(content)})
+        return JSONResponse({"error": "; ".join(admission.reasons), "admission": admission.as_dict()},
+                            status_code=413)
+    if admission.reasons:
+        logger.info("降级处理: %s", "; ".join(admission.reasons))
+
+    if request_id in ACTIVE_JOBS:
+        return JSONResponse({"error": f"请求 ID {request_id} 正在处理中"}, status_code=409)
+
+    if output == "chunks":
+        cancel = CancelToken()
+        conversion = iter_conversion(
+            content, stage_timings, cancel, priority, request_tenant(request), profiler, request_id,
+            pages=pages, max_pages=max_pages, ocr=admission.ocr, images=admission.images,
+            image_options=image_options, table_engine=table_engine, mode=mode, fast_path=fast_path,
+        )
+        chunker = MarkdownChunker(chunk_max_chars, chunk_overlap)
+        return StreamingResponse(stream_chunks(conversion, chunker, cancel, stage_timings, request_id, timings),
+                                 media_type="application/x-ndjson")
+
+    # 取消令牌：客户端断开或 DELETE /jobs/{request_id} 时触发，转换在页与阶段之间检查
+    cancel = CancelToken()
+    ACTIVE_JOBS[request_id] = cancel
+    watcher = asyncio.create_task(watch_disconnect(request, cancel))
+
+    try:
+        status = "error"
+        try:
+            md, page_summaries = await schedule_conversion(
+                content, stage_timings, cancel, priority, request_tenant(request), profiler, request_id,
+                pages=pages, max_pages=max_pages, ocr=admission.ocr, images=admission.images,
+                image_options=image_options,
+                table_engine=table_engine, mode=mode, fast_path=fast_path,
+            )
+            status = "ok"
+            body = {}
+            if admission.reasons:
+                body["admission"] = admission.as_dict()
+            if timings:
+                body["timings"] = stage_timings.as_dict()
+            if profiler:
+                body["profile"] = {"profiler": profiler, "url": f"/profiles/{request_id}"}
+            if resultpack.accepts_binary(request.headers.get("accept")):
+                content = await run_in_threadpool(pack_binary_result, md, page_summaries, body)
+                return Response(content, media_type=resultpack.MEDIA_TYPE)
+            if offsets:
+                body["offsets"] = summary_offset_index(md, page_summaries)
+            return FastJSONResponse({"markdown": md, "pages": pages_payload(page_summaries, pages_layout), **body})
+        except PageSelectionError as e:
+            status = "rejected"
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except ResourceLimitExceeded as e:
+            status = "limit_exceeded"
+            logger.warning("转换超过资源上限: %s", e)
+            return JSONResponse({"error": str(e)}, status_code=422)
+        except ConversionCancelled as e:
+            status = "cancelled"
+            # 499: 客户端关闭请求（客户端多半已经收不到这个响应）
+            return JSONResponse({"error": f"转换已取消: {e}"}, status_code=499)
+        except Exception as e:
+            logger.exception("转换失败: %s", e)
+            body = {"error": f"Conversion error: {e}"}
+            if profiler:
+                body["profile"] = {"profiler": profiler, "url": f"/profiles/{request_id}"}
+            return JSONResponse(body, status_code=500)
+        finally:
+            METRICS.observe_request("/convert", status, stage_timings.total(), stage_timings)
+            logger.info("/convert %s", status, extra={
+                "endpoint": "/convert", "status": status, "duration_s": round(stage_timings.total(), 4),
+                "bytes": len(content), "mode": mode, "table_engine": table_engine,
+            })
+    finally:
+        watcher.cancel()
+        ACTIVE_JOBS.pop(request_id, None)
+
+
+@app.post("/convert/batch")
+async def convert_batch(request: Request, files: list[UploadFile] = File(...), table_engine: str = "pdfplumber",
+                        mode: str = "fast", timings: bool = False, priority: str | None = None,
+                        image_format: str | None = None, image_max_dim: int | None = None,
+                        image_quality: int | None = None, thumbnail: int | None = None,
+                        pages_layout: str | None = None, offsets: bool = False, fast_path: bool = True):
+    """批量转换多个 PDF（或 zip 压缩包），每个文档完成后立即返回一行 JSON（NDJSON）
+
+    所有文档的页面按 PDF2MD_CHUNK_PAGES 分块，与 /convert 共用转换槽位（默认 batch 优先级）；
+    最后一行为 {"done": true, ...} 汇总。
+    """
+    try:
+        get_table_engine(table_engine)
+        get_profile(mode)
+        priority = resolve_priority(priority, BATCH)
+        image_options = request_image_options(image_format, image_max_dim, image_quality, thumbnail)
+        pages_layout = resolve_pages_layout(pages_layout)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    uploads = [(file.filename, await file.read()) for file in files]
+    try:
+        documents = await run_in_threadpool(unpack_uploads, uploads)
+    except BatchError as e:
+        METRICS.observe_request("/convert/batch", "rejected", 0.0)
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    del uploads
+
+    request_id = current_request_id()
+    if request_id in ACTIVE_JOBS:
+        return JSONResponse({"error": f"请求 ID {request_id} 正在处理中"}, status_code=409)
+    cancel = CancelToken()
+    tenant = request_tenant(request)
+
+    async def convert_document(doc) -> dict:
+        doc_timings = StageTimings()
+        record = {"index": doc.index, "filename": doc.filename}
+        status = "error"
+        try:
+            if doc.error:
+                status = "rejected"
+                record["error"] = doc.error
+                return record
+
+            admission = await run_in_threadpool(admit, doc.content)
+            if not admission.accepted:
+                status = "rejected"
+                record.update(error="; ".join(admission.reasons), admission=admission.as_dict())
+                return record
+
+            markdown, summaries = await schedule_conversion(
+                doc.content, doc_timings, cancel, priority, tenant, ocr=admission.ocr, images=admission.images,
+                image_options=image_options, table_engine=table_engine, mode=mode, fast_path=fast_path,
+            )
+            status = "ok"
+            record.update(markdown=markdown, pages=pages_payload(summaries, pages_layout))
+            if offsets:
+                record["offsets"] = summary_offset_index(markdown, summaries)
+            if admission.reasons:
+                record["admission"] = admission.as_dict()
+            if timings:
+                record["timings"] = doc_timings.as_dict()
+            return record
+        except (ConversionCancelled, asyncio.CancelledError):
+            status = "cancelled"
+            raise
+        except ResourceLimitExceeded as e:
+            status = "limit_exceeded"
+            record["error"] = str(e)
+            return record
+        except Exception as e:
+            logger.warning("批量转换中的文档失败: %s: %s", doc.filename, e)
+            record["error"] = f"Conversion error: {e}"
+            return record
+        finally:
+            record["status"] = status
+            doc.content = None
+            METRICS.observe_request("/convert/batch", status, doc_timings.total(), doc_timings)
+
+    async def stream():
+        started = time.perf_counter()
+        counts: dict[str, int] = {}
+        ACTIVE_JOBS[request_id] = cancel
+        tasks = [asyncio.create_task(convert_document(doc)) for doc in documents]
+        try:
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    record = await next_done
+                    counts[record["status"]] = counts.get(record["status"], 0) + 1
+                    yield dumps(record) + b"\n"
+                summary = {"done": True, "documents": len(documents), "statuses": counts}
+            except ConversionCancelled as e:
+                summary = {"done": True, "documents": len(documents), "statuses": counts,
+                           "error": f"转换已取消: {e}"}
+            summary["duration_s"] = round(time.perf_counter() - started, 4)
+            yield dumps(summary) + b"\n"
+        finally:
+            # 客户端断开时 StreamingResponse 会关闭本生成器：停止其余分块
+            if not all(task.done() for task in tasks):
+                cancel.cancel("客户端已断开连接")
+                for task in tasks:
+                    task.cancel()
+            ACTIVE_JOBS.pop(request_id, None)
+            logger.info("/convert/batch %d 个文档", len(documents), extra={
+                "endpoint": "/convert/batch", "documents": len(documents), "statuses": counts,
+                "duration_s": round(time.perf_counter() - started, 4), "mode": mode, "table_engine": table_engine,
+            })
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.delete("/jobs/{request_id}")
+async def cancel_job(request_id: str):
+    """取消进行中（或排队中）的转换；请求 ID 见 X-Request-ID，也可由客户端在请求头中预先指定"""
+    cancel = ACTIVE_JOBS.get(request_id)
+    if cancel is None:
+        return JSONResponse({"error": "未找到进行中的任务"}, status_code=404)
+    cancel.cancel("已通过 API 取消")
+    logger.info("取消任务 %s", request_id)
+    return JSONResponse({"request_id": request_id, "status": "cancelling"}, status_code=202)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 指标"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/profiles/{request_id}")
+async def download_profile(request: Request, request_id: str):
+    """下载某个请求的性能分析结果（.pstats 或 speedscope JSON）"""
+    if not profiling.profiling_allowed(request.client.host if request.client else None):
+        return JSONResponse({"error": "该客户端未被允许访问性能分析结果"}, status_code=403)
+    path = profiling.profile_path(request_id)
+    if path is None:
+        return JSONResponse({"error": "未找到该请求的分析结果"}, status_code=404)
+    media_type = "application/json" if path.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
 
 
 @app.post("/convert-nougat")
-async def convert_nougat(file: UploadFile = File(...)):
+async def convert_nougat(request: Request, file: UploadFile = File(...)):
     """使用 Nougat 转换 PDF（需要安装 nougat-ocr）"""
     import subprocess
     
+    request_id = current_request_id()
+    cancel = CancelToken()
+    ACTIVE_JOBS[request_id] = cancel
+    watcher = asyncio.create_task(watch_disconnect(request, cancel))
     try:
         # 检查 nougat 是否可用
         try:
@@ -660,15 +631,16 @@ async def convert_nougat(file: UploadFile = File(...)):
             with open(input_path, "wb") as f:
                 f.write(await file.read())
             
-            # 运行 nougat
-            result = subprocess.run(
+            # 运行 nougat（在线程池中执行，客户端断开或取消时终止子进程）
+            result = await run_in_threadpool(
+                run_cancellable,
                 ["nougat", input_path, "-o", tmpdir, "--markdown"],
-                capture_output=True,
-                text=True,
+                cancel,
                 timeout=300  # 5分钟超时
             )
             
             if result.returncode != 0:
+                logger.error("Nougat 转换失败 (exit %d): %s", result.returncode, result.stderr[-2000:])
                 return JSONResponse({
                     "error": f"Nougat 转换失败: {result.stderr}"
                 }, status_code=500)
@@ -697,13 +669,21 @@ async def convert_nougat(file: UploadFile = File(...)):
                 }, status_code=500)
     
     except subprocess.TimeoutExpired:
+        logger.error("Nougat 转换超时（超过5分钟）")
         return JSONResponse({
             "error": "转换超时（超过5分钟）"
         }, status_code=500)
+    except ConversionCancelled as e:
+        logger.info("Nougat 转换已取消: %s", e)
+        return JSONResponse({"error": f"转换已取消: {e}"}, status_code=499)
     except Exception as e:
+        logger.exception("Nougat 转换失败: %s", e)
         return JSONResponse({
             "error": f"Conversion error: {e}"
         }, status_code=500)
+    finally:
+        watcher.cancel()
+        ACTIVE_JOBS.pop(request_id, None)
 
 @app.get("/convert")
 async def convert_get():
@@ -712,12 +692,12 @@ async def convert_get():
 @app.get("/", response_class=HTMLResponse)
 async def root_index():
     try:
-        with open("frontend/index.html", "r", encoding="utf-8") as f:
+        with open(os.path.join(FRONTEND_DIR, "index.html"), "r", encoding="utf-8") as f:
             return HTMLResponse(f.read())
     except Exception:
         return HTMLResponse("<h1>PDF ➜ Markdown 转换器</h1>")
 
-app.mount("/static", StaticFiles(directory="frontend"), name="static")
+app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,176 @@
+"""
+Prometheus 指标（文本格式，无额外依赖）
+
+- pdf2md_requests_total{endpoint,status}          请求计数
+- pdf2md_request_duration_seconds{endpoint}       请求总耗时直方图
+- pdf2md_stage_duration_seconds{stage}            每个请求各阶段耗时直方图
+- pdf2md_page_duration_seconds                    单页处理耗时直方图
+- pdf2md_pages_total                              已处理页数
+- pdf2md_queue_depth / pdf2md_inflight_jobs       排队中 / 处理中的转换任务
+- pdf2md_cache_requests_total{cache,result}       缓存命中 / 未命中
+- pdf2md_cache_hit_ratio{cache}                   缓存命中率
+"""
+
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values: Dict[LabelKey, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        self.values[_label_key(labels)] += amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        self.values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.values[_label_key(labels)] -= amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        if not self.values:
+            yield f"{self.name} 0"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # 每个标签组合: [各桶计数..., 总和, 总数]
+        self.values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        idx = bisect.bisect_left(self.buckets, value)
+        if idx < len(self.buckets):
+            series[idx] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(key, [('le', _format_value(float(bound)))])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}"
+            yield f"{self.name}_count{_format_labels(key)} {series[-1]}"
+
+
+class MetricsRegistry:
+    """进程内指标注册表（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter("pdf2md_requests_total", "Conversion requests by endpoint and status.")
+        self.request_duration = Histogram("pdf2md_request_duration_seconds", "End-to-end conversion time.")
+        self.stage_duration = Histogram("pdf2md_stage_duration_seconds", "Per-request time spent in each stage.")
+        self.page_duration = Histogram("pdf2md_page_duration_seconds", "Processing time of a single page.")
+        self.pages = Counter("pdf2md_pages_total", "Pages processed.")
+        self.queue_depth = Gauge("pdf2md_queue_depth", "Conversions waiting for a worker slot.")
+        self.inflight = Gauge("pdf2md_inflight_jobs", "Conversions currently running.")
+        self.cache = Counter("pdf2md_cache_requests_total", "Cache lookups by cache and result.")
+        self.cache_ratio = Gauge("pdf2md_cache_hit_ratio", "Cache hit ratio since process start.")
+
+    def observe_request(self, endpoint: str, status: str, seconds: float, timings=None):
+        """记录一个完成的请求；timings 为 StageTimings 时同时记录各阶段和每页耗时"""
+        with self.lock:
+            self.requests.inc(endpoint=endpoint, status=status)
+            self.request_duration.observe(seconds, endpoint=endpoint)
+            if timings is not None:
+                for stage, stage_seconds in timings.stages.items():
+                    self.stage_duration.observe(stage_seconds, stage=stage)
+                for page_stages in timings.pages.values():
+                    self.page_duration.observe(sum(page_stages.values()))
+                self.pages.inc(len(timings.pages))
+
+    def record_cache(self, cache: str, hit: bool):
+        with self.lock:
+            self.cache.inc(cache=cache, result="hit" if hit else "miss")
+
+    def job_queued(self):
+        with self.lock:
+            self.queue_depth.inc()
+
+    def job_started(self):
+        with self.lock:
+            self.queue_depth.dec()
+            self.inflight.inc()
+
+    def job_dequeued(self):
+        """排队中的任务未开始就被取消"""
+        with self.lock:
+            self.queue_depth.dec()
+
+    def job_finished(self):
+        with self.lock:
+            self.inflight.dec()
+
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self.lock:
+            self.cache_ratio.values.clear()
+            caches = {dict(key)["cache"] for key in self.cache.values}
+            for cache in caches:
+                hits = self.cache.values.get(_label_key({"cache": cache, "result": "hit"}), 0)
+                misses = self.cache.values.get(_label_key({"cache": cache, "result": "miss"}), 0)
+                self.cache_ratio.set(hits / (hits + misses) if hits + misses else 0.0, cache=cache)
+
+            lines = []
+            for metric in (self.requests, self.request_duration, self.stage_duration, self.page_duration,
+                           self.pages, self.queue_depth, self.inflight, self.cache, self.cache_ratio):
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
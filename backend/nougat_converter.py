@@ -3,12 +3,21 @@ Nougat PDF 转 Markdown 转换器
 使用 Meta 的 Nougat 神经网络模型
 """
 
+import logging
 import os
 import sys
 import subprocess
 import shutil
 from pathlib import Path
 
+try:
+    from backend.logs import setup_logging
+except ImportError:
+    # 直接运行 python nougat_converter.py 时 backend 不是包
+    from logs import setup_logging
+
+logger = logging.getLogger("pdf2md.nougat")
+
 
 def check_nougat_installed():
     """检查 Nougat 是否已安装"""
@@ -41,18 +50,12 @@ def convert_with_nougat(pdf_path: str, output_dir: str = None, use_gpu: bool = N
     
     # 检查安装
     if not check_nougat_installed():
-        print("❌ Nougat 未安装")
-        print()
-        print("请运行以下命令安装:")
-        print("  pip install nougat-ocr")
-        print()
-        print("或运行安装脚本:")
-        print("  .\\install_nougat.bat")
+        logger.error("Nougat 未安装。请运行 pip install nougat-ocr 或安装脚本 .\\install_nougat.bat")
         return False
     
     # 检查文件
     if not os.path.exists(pdf_path):
-        print(f"❌ 文件不存在: {pdf_path}")
+        logger.error("文件不存在: %s", pdf_path)
         return False
     
     # 设置输出目录
@@ -74,101 +77,62 @@ def convert_with_nougat(pdf_path: str, output_dir: str = None, use_gpu: bool = N
         "--no-skipping",  # 不跳过任何页面
     ])
     
-    print("=" * 70)
-    print("  Nougat PDF → Markdown 转换器")
-    print("=" * 70)
-    print()
-    print(f"输入文件: {pdf_path}")
-    print(f"输出目录: {output_dir}")
+    logger.info("Nougat 转换: 输入文件 %s, 输出目录 %s", pdf_path, output_dir)
     
     # 检测 GPU
     try:
         import torch
-        has_gpu = torch.cuda.is_available()
-        if has_gpu:
-            print(f"GPU: ✓ CUDA 可用")
+        if torch.cuda.is_available():
+            logger.info("GPU: CUDA 可用")
         else:
-            print(f"GPU: ✗ 使用 CPU 模式（速度较慢）")
+            logger.info("GPU: 使用 CPU 模式（速度较慢）")
     except ImportError:
-        print(f"GPU: ✗ 使用 CPU 模式")
-    
-    print()
-    print("正在转换...")
-    print("-" * 70)
+        logger.info("GPU: 使用 CPU 模式")
     
     # 首次运行提示
     model_dir = Path.home() / ".cache" / "huggingface" / "hub"
     if not model_dir.exists() or not any(model_dir.glob("models--*nougat*")):
-        print()
-        print("⏳ 首次运行需要下载模型（约 350MB）")
-        print("   这可能需要几分钟，请耐心等待...")
-        print()
+        logger.info("首次运行需要下载模型（约 350MB），这可能需要几分钟，请耐心等待...")
     
+    logger.info("正在转换...")
     try:
         # 执行转换
-        result = subprocess.run(
+        subprocess.run(
             cmd,
             check=True,
             capture_output=True,
             text=True
         )
         
-        print()
-        print("=" * 70)
-        print("✓ 转换完成！")
-        print("=" * 70)
-        
         # 查找输出文件
         pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
         output_file = os.path.join(output_dir, f"{pdf_name}.mmd")
         
         if os.path.exists(output_file):
-            print(f"输出文件: {output_file}")
-            
-            # 显示文件大小
             size = os.path.getsize(output_file)
-            print(f"文件大小: {size:,} 字节")
+            logger.info("转换完成: %s（%s 字节）", output_file, f"{size:,}",
+                        extra={"output": output_file, "bytes": size})
             
-            # 预览前500字符
-            print()
-            print("-" * 70)
-            print("预览:")
-            print("-" * 70)
-            with open(output_file, 'r', encoding='utf-8') as f:
-                preview = f.read(500)
-                print(preview)
-                if size > 500:
-                    print("\n... (更多内容请查看输出文件)")
+            # 预览前500字符（仅调试级别）
+            if logger.isEnabledFor(logging.DEBUG):
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    logger.debug("预览:\n%s", f.read(500))
+        else:
+            logger.info("转换完成，但未找到输出文件: %s", output_file)
         
         return True
     
     except subprocess.CalledProcessError as e:
-        print()
-        print("=" * 70)
-        print("❌ 转换失败")
-        print("=" * 70)
-        print()
-        
-        if e.stderr:
-            print("错误信息:")
-            print(e.stderr)
-        
-        print()
-        print("可能的原因:")
-        print("1. PDF 文件损坏或格式不支持")
-        print("2. 内存不足（Nougat 需要较多内存）")
-        print("3. 模型下载失败（网络问题）")
-        print()
-        print("建议:")
-        print("- 尝试使用更小的 PDF 文件测试")
-        print("- 确保有足够的内存（建议 8GB+）")
-        print("- 检查网络连接（首次运行需要下载模型）")
-        
+        logger.error(
+            "转换失败: %s\n"
+            "可能的原因: 1. PDF 文件损坏或格式不支持  2. 内存不足（Nougat 需要较多内存）  3. 模型下载失败（网络问题）\n"
+            "建议: 尝试使用更小的 PDF 文件测试；确保有足够的内存（建议 8GB+）；检查网络连接（首次运行需要下载模型）",
+            (e.stderr or "").strip() or f"exit {e.returncode}",
+        )
         return False
     
     except Exception as e:
-        print()
-        print(f"❌ 发生错误: {e}")
+        logger.exception("发生错误: %s", e)
         return False
 
 
@@ -185,6 +149,7 @@ def main():
         print("  [输出目录]   - 可选，输出目录（默认为 PDF 同目录）")
         sys.exit(1)
     
+    setup_logging(fmt="plain")
     pdf_path = sys.argv[1]
     output_dir = sys.argv[2] if len(sys.argv) > 2 else None
     
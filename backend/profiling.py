@@ -0,0 +1,190 @@
+"""
+请求级性能分析（按需开启）
+
+请求带上 ?profile=cprofile|sampling 或请求头 X-PDF2MD-Profile，且客户端地址在
+PDF2MD_PROFILE_ALLOWLIST 中时，转换过程在分析器下运行，结果按请求 ID 保存，
+可通过 GET /profiles/{request_id} 下载：
+
+- cprofile  确定性分析，输出 .pstats（python -m pstats / snakeviz 打开）
+- sampling  采样分析（默认每 5ms 采一次调用栈），输出 speedscope JSON
+            （https://www.speedscope.app 打开），开销小，适合大文件
+
+环境变量:
+    PDF2MD_PROFILE_ALLOWLIST  逗号分隔的客户端 IP，"*" 表示全部；为空时关闭分析
+    PDF2MD_PROFILE_DIR        分析结果目录（默认 <临时目录>/pdf2md-profiles）
+    PDF2MD_PROFILE_KEEP       最多保留的分析结果数量（默认 50，旧的自动删除）
+    PDF2MD_PROFILE_INTERVAL   采样间隔（秒，默认 0.005）
+"""
+
+import cProfile
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from backend.logs import REQUEST_ID_RE
+except ImportError:
+    from logs import REQUEST_ID_RE
+
+
+PROFILE_ALLOWLIST = {
+    host.strip() for host in os.getenv("PDF2MD_PROFILE_ALLOWLIST", "").split(",") if host.strip()
+}
+PROFILE_DIR = os.getenv("PDF2MD_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "pdf2md-profiles")
+PROFILE_KEEP = int(os.getenv("PDF2MD_PROFILE_KEEP", "50"))
+SAMPLE_INTERVAL = float(os.getenv("PDF2MD_PROFILE_INTERVAL", "0.005"))
+
+# 分析器名称 → 结果文件后缀
+PROFILERS = {
+    "cprofile": ".pstats",
+    "sampling": ".speedscope.json",
+}
+DEFAULT_PROFILER = "cprofile"
+
+logger = logging.getLogger("pdf2md.profiling")
+
+
+def profiling_allowed(client_host: Optional[str]) -> bool:
+    """客户端是否在分析白名单中"""
+    if not PROFILE_ALLOWLIST:
+        return False
+    return "*" in PROFILE_ALLOWLIST or client_host in PROFILE_ALLOWLIST
+
+
+def resolve_profiler(flag: Optional[str]) -> Optional[str]:
+    """把查询参数 / 请求头的值解析为分析器名称；未请求时返回 None，未知名称抛 ValueError"""
+    if flag is None:
+        return None
+    flag = flag.strip().lower()
+    if flag in ("", "0", "false", "no", "off"):
+        return None
+    if flag in ("1", "true", "yes", "on"):
+        return DEFAULT_PROFILER
+    if flag not in PROFILERS:
+        raise ValueError(f"未知的分析器: {flag}（可选: {', '.join(PROFILERS)}）")
+    return flag
+
+
+def profile_path(request_id: str) -> Optional[str]:
+    """按请求 ID 查找已保存的分析结果；ID 格式不合法或不存在时返回 None"""
+    if not REQUEST_ID_RE.match(request_id):
+        return None
+    for suffix in PROFILERS.values():
+        path = os.path.join(PROFILE_DIR, request_id + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class SamplingProfiler:
+    """后台线程定期抓取目标线程的调用栈，导出为 speedscope 的 sampled 格式"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[Dict[str, Any]] = []
+        self.frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pdf2md-sampler", daemon=True)
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        idx = self.frame_index.get(key)
+        if idx is None:
+            idx = self.frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return idx
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            # 连续相同的调用栈合并为一个样本，权重累加
+            if self.samples and self.samples[-1] == stack:
+                self.weights[-1] += elapsed
+            else:
+                self.samples.append(stack)
+                self.weights.append(elapsed)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "pdf2md",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+def _prune():
+    """只保留最新的 PROFILE_KEEP 个分析结果"""
+    try:
+        entries = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR)]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[PROFILE_KEEP:]:
+            os.remove(path)
+    except OSError as e:
+        logger.warning("清理分析结果失败: %s", e)
+
+
+def run_profiled(request_id: str, profiler: str, func: Callable, *args, **kwargs):
+    """
+    在分析器下调用 func(*args, **kwargs)，结果写入 PROFILE_DIR/<request_id><后缀>
+
+    必须在执行转换的同一线程中调用（cProfile 和采样器都只跟踪当前线程）。
+    转换抛出异常时同样保存分析结果，再把异常继续抛出。
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, request_id + PROFILERS[profiler])
+    tmp_path = path + ".tmp"
+
+    if profiler == "cprofile":
+        prof = cProfile.Profile()
+        try:
+            return prof.runcall(func, *args, **kwargs)
+        finally:
+            prof.dump_stats(tmp_path)
+            os.replace(tmp_path, path)
+            _prune()
+
+    sampler = SamplingProfiler(threading.get_ident())
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sampler.to_speedscope(f"pdf2md {request_id}"), f)
+        os.replace(tmp_path, path)
+        _prune()
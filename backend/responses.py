@@ -0,0 +1,32 @@
+"""
+JSON 编码：安装了 orjson 时用它编码大响应（/convert 结果、/convert/batch 的 NDJSON 行）
+
+上千页文档的 pages 和图片 data URL 可达数十 MB，标准库 json 编码往往比 orjson 慢数倍。
+未安装 orjson 时回退到标准库，输出内容相同（UTF-8，不转义非 ASCII 字符）。
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def dumps(content: Any) -> bytes:
+    """编码为紧凑的 UTF-8 JSON"""
+    if HAS_ORJSON:
+        # 与标准库 json 一致：允许 int 等非字符串键
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """与 JSONResponse 相同，但用 dumps() 编码"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
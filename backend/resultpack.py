@@ -0,0 +1,180 @@
+"""
+二进制转换结果（/convert 的 Accept: application/vnd.pdf2md.result）
+
+JSON 响应中的图片是 base64 data URL，下游只想取 Markdown 和页位置时也要解析整个几十 MB 的 JSON。
+二进制格式把 Markdown（UTF-8）、页偏移表和图片原始字节按长度前缀依次存放，
+ResultReader 直接在 memoryview 上切片，取某一页或某张图片不需要复制或解码其余部分。
+本模块只依赖标准库，下游可以单独拷贝使用：
+
+    from backend.resultpack import ResultReader
+    result = ResultReader.open("result.bin")      # 或 ResultReader(response.content)
+    page = result.page(12)
+    text = bytes(page.markdown).decode("utf-8")
+    for image in page.images:
+        save(image.format, image.data)            # data 为 memoryview
+
+格式（小端序）:
+    header      magic "P2MD" | u16 版本 (1) | u16 保留 | u32 页数 | u32 图片数
+    meta        u32 长度 | UTF-8 JSON（每页统计的 columns 布局，以及 admission、timings 等）
+    markdown    u64 长度 | UTF-8 文本
+    页表        每页 u32 页码 | u64 Markdown 字节偏移 | u64 字节长度 | u32 第一张图片序号 | u32 图片数
+    图片表      每张 u64 数据偏移（相对图片数据区） | u64 长度 | u32 页码 | u8 类型（0 图片 / 1 缩略图）| 7s 格式
+    图片数据    u64 长度 | 各图片原始字节依次相连
+
+同一页的图片和缩略图在图片表中连续存放，页表记录其范围。
+"""
+
+import json
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+MEDIA_TYPE = "application/vnd.pdf2md.result"
+MAGIC = b"P2MD"
+VERSION = 1
+
+IMAGE = 0
+THUMBNAIL = 1
+
+_HEADER = struct.Struct("<4sHHII")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_PAGE = struct.Struct("<IQQII")
+_IMAGE = struct.Struct("<QQIB7s")
+
+
+def accepts_binary(accept: Optional[str]) -> bool:
+    """Accept 请求头中是否列出了二进制结果格式"""
+    if not accept:
+        return False
+    return any(part.split(";", 1)[0].strip().lower() == MEDIA_TYPE for part in accept.split(","))
+
+
+ImageData = Tuple[bytes, str]  # (原始字节, 格式，如 "webp"、"jpeg")
+
+
+def pack_result(markdown: str, pages: Sequence[Tuple[int, int, int, Sequence[ImageData], Sequence[ImageData]]],
+                meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """打包转换结果
+
+    pages 为每页的 (页码, Markdown 字节偏移, 字节长度, 图片列表, 缩略图列表)，图片为 (原始字节, 格式)，
+    直接写入，不经过 base64。
+    """
+    md_bytes = markdown.encode("utf-8")
+    meta_bytes = json.dumps(meta or {}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    page_table = []
+    image_table = []
+    blobs = []
+    blob_size = 0
+    for page_no, offset, length, images, thumbnails in pages:
+        first = len(image_table)
+        for kind, entries in ((IMAGE, images), (THUMBNAIL, thumbnails or ())):
+            for data, fmt in entries:
+                image_table.append(_IMAGE.pack(blob_size, len(data), page_no, kind, fmt.encode("ascii")[:7]))
+                blobs.append(data)
+                blob_size += len(data)
+        page_table.append(_PAGE.pack(page_no, offset, length, first, len(image_table) - first))
+
+    return b"".join([
+        _HEADER.pack(MAGIC, VERSION, 0, len(page_table), len(image_table)),
+        _U32.pack(len(meta_bytes)), meta_bytes,
+        _U64.pack(len(md_bytes)), md_bytes,
+        *page_table,
+        *image_table,
+        _U64.pack(blob_size), *blobs,
+    ])
+
+
+@dataclass(frozen=True)
+class ResultImage:
+    page: int
+    kind: int          # IMAGE / THUMBNAIL
+    format: str        # "webp"、"png"、"jpeg" 等
+    data: memoryview
+
+
+@dataclass(frozen=True)
+class ResultPage:
+    page: int
+    markdown: memoryview   # 该页 Markdown 的 UTF-8 字节
+    markdown_offset: int   # 在整篇 Markdown 中的字节偏移
+    entries: Tuple[ResultImage, ...]
+
+    @property
+    def images(self) -> List[ResultImage]:
+        return [entry for entry in self.entries if entry.kind == IMAGE]
+
+    @property
+    def thumbnails(self) -> List[ResultImage]:
+        return [entry for entry in self.entries if entry.kind == THUMBNAIL]
+
+    @property
+    def text(self) -> str:
+        return str(self.markdown, "utf-8")
+
+
+class ResultReader:
+    """读取 pack_result() 的输出；所有 Markdown 和图片数据都是原缓冲区上的 memoryview 切片"""
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        view = memoryview(buffer)
+        magic, version, _, page_count, image_count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("不是 pdf2md 二进制结果")
+        if version != VERSION:
+            raise ValueError(f"不支持的版本: {version}")
+        pos = _HEADER.size
+
+        (meta_len,) = _U32.unpack_from(view, pos)
+        pos += _U32.size
+        self.meta: Dict[str, Any] = json.loads(str(view[pos:pos + meta_len], "utf-8"))
+        pos += meta_len
+
+        (md_len,) = _U64.unpack_from(view, pos)
+        pos += _U64.size
+        self.markdown_bytes = view[pos:pos + md_len]
+        pos += md_len
+
+        page_rows = [_PAGE.unpack_from(view, pos + i * _PAGE.size) for i in range(page_count)]
+        pos += page_count * _PAGE.size
+        image_rows = [_IMAGE.unpack_from(view, pos + i * _IMAGE.size) for i in range(image_count)]
+        pos += image_count * _IMAGE.size
+
+        (blob_len,) = _U64.unpack_from(view, pos)
+        blobs = view[pos + _U64.size:pos + _U64.size + blob_len]
+
+        self.images: List[ResultImage] = [
+            ResultImage(page, kind, fmt.rstrip(b"\0").decode("ascii"), blobs[offset:offset + length])
+            for offset, length, page, kind, fmt in image_rows
+        ]
+        self.pages: List[ResultPage] = [
+            ResultPage(page, self.markdown_bytes[offset:offset + length], offset,
+                       tuple(self.images[first:first + count]))
+            for page, offset, length, first, count in page_rows
+        ]
+        self._by_number = {page.page: page for page in self.pages}
+        self._view = view
+
+    @classmethod
+    def open(cls, path: str) -> "ResultReader":
+        """以只读 mmap 打开文件，页和图片数据按需从磁盘读入"""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def markdown(self) -> str:
+        """整篇 Markdown（解码会复制一份；只需某一页时用 page(n).markdown）"""
+        return str(self.markdown_bytes, "utf-8")
+
+    def page(self, number: int) -> ResultPage:
+        """按原文档页码取页（KeyError 表示该页不在结果中）"""
+        return self._by_number[number]
+
+    def __iter__(self) -> Iterator[ResultPage]:
+        return iter(self.pages)
+
+    def __len__(self) -> int:
+        return len(self.pages)
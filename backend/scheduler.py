@@ -0,0 +1,147 @@
+"""
+转换调度：优先级 + 租户公平排队（页分块粒度）
+
+/convert 和 /convert/batch 的转换都被切成若干页一块（见 plan_chunks），每块单独申请槽位，
+因此一个 1000 页的批量任务不会一直占住工作线程，交互请求可以插在它的分块之间。
+
+- 优先级：interactive（/convert 默认）优先于 batch（/convert/batch 默认）；
+  为避免饿死，batch 有任务等待时，连续发放 INTERACTIVE_BURST 个 interactive 槽位后让 batch 取一个
+- 同一优先级内按租户轮转（每个租户每轮取一个分块），大户不会挤占小户；
+  租户取 X-Tenant-ID 请求头，没有时用客户端地址
+
+调度器只在事件循环线程中使用，不需要加锁。
+
+环境变量:
+    PDF2MD_CHUNK_PAGES         每个分块的页数（默认 8）；越小调度越细，但每块都要重新打开一次文档
+    PDF2MD_INTERACTIVE_BURST   batch 等待时最多连续发放的 interactive 槽位数（默认 4）
+"""
+
+import asyncio
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional, Sequence
+
+
+CHUNK_PAGES = max(1, int(os.getenv("PDF2MD_CHUNK_PAGES", "8")))
+INTERACTIVE_BURST = max(1, int(os.getenv("PDF2MD_INTERACTIVE_BURST", "4")))
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+def resolve_priority(value: Optional[str], default: str) -> str:
+    """解析 priority 参数；未知取值抛 ValueError"""
+    if value is None or not value.strip():
+        return default
+    value = value.strip().lower()
+    if value not in PRIORITIES:
+        raise ValueError(f"未知的优先级: {value}（可选: {', '.join(PRIORITIES)}）")
+    return value
+
+
+def plan_chunks(pages: Sequence[int], chunk_pages: int = CHUNK_PAGES) -> List[List[int]]:
+    """把页码列表按顺序切成每块 chunk_pages 页"""
+    pages = list(pages)
+    return [pages[i:i + chunk_pages] for i in range(0, len(pages), chunk_pages)]
+
+
+class _PriorityQueue:
+    """一个优先级内的等待队列：每个租户一个 FIFO，租户之间轮转"""
+
+    def __init__(self):
+        self.tenants: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return sum(len(waiters) for waiters in self.tenants.values())
+
+    def push(self, tenant: str, waiter: asyncio.Future):
+        self.tenants.setdefault(tenant, deque()).append(waiter)
+
+    def pop(self) -> Optional[asyncio.Future]:
+        """取下一个租户的第一个等待者，该租户移到队尾"""
+        while self.tenants:
+            tenant, waiters = self.tenants.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                self.tenants[tenant] = waiters
+            if not waiter.done():
+                return waiter
+        return None
+
+    def remove(self, tenant: str, waiter: asyncio.Future):
+        waiters = self.tenants.get(tenant)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del self.tenants[tenant]
+
+
+class Scheduler:
+    """固定数量的转换槽位，按优先级和租户发放"""
+
+    def __init__(self, slots: int, interactive_burst: int = INTERACTIVE_BURST):
+        self.slots = slots
+        self.interactive_burst = interactive_burst
+        self.running = 0
+        self.queues: Dict[str, _PriorityQueue] = {priority: _PriorityQueue() for priority in PRIORITIES}
+        self._burst = 0
+
+    def waiting(self, priority: Optional[str] = None) -> int:
+        if priority is not None:
+            return len(self.queues[priority])
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def acquire(self, priority: str = INTERACTIVE, tenant: str = "-"):
+        if self.running < self.slots and not self.waiting():
+            self.running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues[priority].push(tenant, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 刚分到槽位就被取消：交给下一个等待者
+                self.release()
+            else:
+                self.queues[priority].remove(tenant, waiter)
+            raise
+
+    def release(self):
+        self.running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE, tenant: str = "-"):
+        await self.acquire(priority, tenant)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _next_priority(self) -> Optional[str]:
+        interactive, batch = self.waiting(INTERACTIVE), self.waiting(BATCH)
+        if interactive and (not batch or self._burst < self.interactive_burst):
+            self._burst += 1
+            return INTERACTIVE
+        if batch:
+            self._burst = 0
+            return BATCH
+        return None
+
+    def _dispatch(self):
+        while self.running < self.slots:
+            priority = self._next_priority()
+            if priority is None:
+                return
+            waiter = self.queues[priority].pop()
+            if waiter is None:
+                continue
+            self.running += 1
+            waiter.set_result(None)
@@ -1,6 +1,7 @@
 """
 智能 PDF 提取器 - 通用解决方案
 结合 PyMuPDF 布局分析 + pdfplumber 文本提取
+（布局分析、清理和结构识别由 backend/extraction 统一提供）
 
 核心理念：
 1. 自动检测主内容区域（排除边栏、页眉页脚）
@@ -9,35 +10,32 @@
 4. 智能清理和格式化
 """
 
-import re
-from io import BytesIO
+import logging
 from typing import List, Tuple, Optional, Dict, Any
-import pdfplumber
 
-
-# 条件导入 PyMuPDF
 try:
-    import fitz
-    HAS_PYMUPDF = True
+    from backend import extraction
+    from backend.logs import setup_logging
 except ImportError:
-    fitz = None
-    HAS_PYMUPDF = False
+    # 直接运行 python smart_extractor.py 时 backend 不是包
+    import extraction
+    from logs import setup_logging
+
+HAS_PYMUPDF = extraction.tables.HAS_PYMUPDF
+
+logger = logging.getLogger("pdf2md.smart_extractor")
 
 
 class SmartPDFExtractor:
-    """智能 PDF 提取器"""
+    """智能 PDF 提取器（基于统一提取核心，默认使用 "layout" 配置）
+
+    实例只读，可在多个线程间共享；extract_pdf_smart() 复用同一个实例。
+    """
     
-    def __init__(self):
-        self.noise_patterns = [
-            r'^\d+\s*$',                              # 纯页码
-            r'^Page\s+\d+\s*$',                       # "Page 1"
-            r'^\[[\w\.\s]+\]$',                       # [cs.AI]
-            r'^\d{1,2}\s+[A-Z][a-z]{2}\s+\d{4}$',    # 日期: 10 Nov 2025
-            r'^arXiv:\d+\.\d+v?\d*$',                 # arXiv:2511.07587v1
-            r'^v\d+$',                                # v1, v2
-            r'^viXra$',                               # viXra
-            r'^[A-Z]{2,4}$',                          # 缩写（如 AI, ML）
-        ]
+    def __init__(self, profile: str = "layout", engine: Optional[extraction.ConverterEngine] = None):
+        self.engine = engine or extraction.get_engine()
+        self.profile = self.engine.profile(profile)
+        self.noise_patterns = list(self.profile.noise_patterns)
     
     def detect_content_area(self, page) -> Optional[Tuple[float, float, float, float]]:
         """
@@ -46,67 +44,7 @@ class SmartPDFExtractor:
         """
         if not HAS_PYMUPDF:
             return None
-        
-        try:
-            blocks = page.get_text("dict")["blocks"]
-            text_blocks = [b for b in blocks if b["type"] == 0]
-            
-            if not text_blocks:
-                return None
-            
-            all_bboxes = [b["bbox"] for b in text_blocks]
-            
-            # 计算页面尺寸
-            page_width = page.rect.width
-            page_height = page.rect.height
-            
-            # 将页面分为垂直条带，计算文本密度
-            num_strips = 20
-            strip_width = page_width / num_strips
-            density = [0.0] * num_strips
-            
-            for bbox in all_bboxes:
-                x0, y0, x1, y1 = bbox
-                # 计算文本块的面积
-                area = (x1 - x0) * (y1 - y0)
-                
-                # 计算占据哪些条带
-                start_strip = int(x0 / strip_width)
-                end_strip = int(x1 / strip_width)
-                
-                for i in range(start_strip, min(end_strip + 1, num_strips)):
-                    if 0 <= i < num_strips:
-                        density[i] += area
-            
-            # 找出密度显著的区域
-            max_density = max(density) if density else 0
-            if max_density == 0:
-                return None
-            
-            threshold = max_density * 0.2  # 20% 的最大密度作为阈值
-            significant_strips = [i for i, d in enumerate(density) if d > threshold]
-            
-            if not significant_strips:
-                return None
-            
-            # 计算主内容区域的边界
-            content_x_min = min(significant_strips) * strip_width
-            content_x_max = (max(significant_strips) + 1) * strip_width
-            
-            # Y轴方向：使用所有文本块的边界
-            content_y_min = min(bbox[1] for bbox in all_bboxes)
-            content_y_max = max(bbox[3] for bbox in all_bboxes)
-            
-            # 添加一些边距（避免裁剪过度）
-            margin = strip_width * 0.5
-            content_x_min = max(0, content_x_min - margin)
-            content_x_max = min(page_width, content_x_max + margin)
-            
-            return (content_x_min, content_y_min, content_x_max, content_y_max)
-        
-        except Exception as e:
-            print(f"⚠ 内容区域检测失败: {e}")
-            return None
+        return extraction.detect_content_area(page, self.profile)
     
     def detect_columns(self, page, content_bbox: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
         """
@@ -114,92 +52,12 @@ class SmartPDFExtractor:
         返回: 每一栏的边界框列表 [(x0, y0, x1, y1), ...]
         """
         if not HAS_PYMUPDF:
-            # 回退：假设单栏
-            return [content_bbox]
-        
-        try:
-            x0, y0, x1, y1 = content_bbox
-            content_width = x1 - x0
-            
-            # 获取主内容区域内的文本块
-            blocks = page.get_text("dict")["blocks"]
-            content_blocks = [
-                b for b in blocks 
-                if b["type"] == 0 and 
-                b["bbox"][0] >= x0 - 5 and 
-                b["bbox"][2] <= x1 + 5
-            ]
-            
-            if not content_blocks:
-                return [content_bbox]
-            
-            # 分析水平位置分布，找出"空白列"
-            num_strips = 100
-            strip_width = content_width / num_strips
-            occupancy = [0] * num_strips
-            
-            for block in content_blocks:
-                bbox = block["bbox"]
-                start_strip = int((bbox[0] - x0) / strip_width)
-                end_strip = int((bbox[2] - x0) / strip_width)
-                
-                for i in range(max(0, start_strip), min(end_strip + 1, num_strips)):
-                    if 0 <= i < num_strips:
-                        occupancy[i] += 1
-            
-            # 识别显著的空白区域（栏间隙）
-            gaps = []
-            in_gap = False
-            gap_start = 0
-            min_gap_width = 5  # 最小间隙宽度（条带数）
-            
-            for i, occ in enumerate(occupancy):
-                if occ == 0:  # 空白
-                    if not in_gap:
-                        gap_start = i
-                        in_gap = True
-                else:  # 有文本
-                    if in_gap:
-                        gap_width = i - gap_start
-                        if gap_width >= min_gap_width:
-                            gap_center = gap_start + gap_width / 2
-                            gaps.append(gap_center * strip_width + x0)
-                        in_gap = False
-            
-            # 根据间隙数量确定栏数
-            if len(gaps) == 0:
-                # 单栏
-                return [content_bbox]
-            
-            # 多栏：按间隙分割
-            columns = []
-            prev_x = x0
-            
-            for gap_x in gaps:
-                columns.append((prev_x, y0, gap_x, y1))
-                prev_x = gap_x
-            
-            # 添加最后一栏
-            columns.append((prev_x, y0, x1, y1))
-            
-            return columns
-        
-        except Exception as e:
-            print(f"⚠ 栏检测失败: {e}, 回退到单栏模式")
             return [content_bbox]
+        return extraction.detect_columns(page, content_bbox, self.profile)
     
     def is_noise_line(self, line: str) -> bool:
         """判断是否为噪声行"""
-        line = line.strip()
-        
-        if not line or len(line) <= 2:
-            return True
-        
-        for pattern in self.noise_patterns:
-            if re.match(pattern, line):
-                return True
-        
-        return False
+        return extraction.is_noise_line(line.strip(), self.profile)
     
     def clean_layout_text(self, text: str) -> str:
         """
@@ -208,90 +66,13 @@ class SmartPDFExtractor:
         - 过滤噪声行
         - 修复连字符断行
         """
-        if not text:
-            return ""
-        
-        lines = text.split('\n')
-        cleaned_lines = []
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i].rstrip()
-            
-            # 跳过噪声行
-            if self.is_noise_line(line):
-                i += 1
-                continue
-            
-            # 压缩行内多个空格
-            line = ' '.join(line.split())
-            
-            # 处理连字符断行
-            if line.endswith('-') and i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                if next_line and next_line[0].islower():
-                    # 合并单词
-                    line = line[:-1] + next_line.split()[0]
-                    # 剩余部分
-                    remaining = ' '.join(next_line.split()[1:])
-                    if remaining:
-                        lines[i + 1] = remaining
-                    else:
-                        i += 1  # 跳过下一行
-            
-            # 处理未结束的句子（可选：可能导致误合并）
-            # if (not line.endswith(('.', '!', '?', ':', ';')) and 
-            #     i + 1 < len(lines)):
-            #     next_line = lines[i + 1].strip()
-            #     if next_line and next_line[0].islower():
-            #         line = line + ' ' + next_line
-            #         i += 1
-            
-            if line:
-                cleaned_lines.append(line)
-            
-            i += 1
-        
-        return '\n'.join(cleaned_lines)
+        return extraction.clean_text(text, self.profile)
     
     def detect_structure(self, text: str) -> str:
         """
         检测文档结构，添加 Markdown 格式标记
         """
-        lines = text.split('\n')
-        formatted = []
-        
-        # 常见章节标题关键词
-        section_keywords = [
-            'Abstract', 'Introduction', 'Background', 'Related Work',
-            'Methodology', 'Method', 'Approach', 'Implementation',
-            'Results', 'Experiments', 'Evaluation', 'Discussion',
-            'Conclusion', 'Future Work', 'References', 'Acknowledgments',
-            'Acknowledgements', 'Appendix'
-        ]
-        
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            
-            # 检测章节标题
-            is_section = False
-            for keyword in section_keywords:
-                if stripped == keyword or (stripped.startswith(keyword) and len(stripped) < len(keyword) + 10):
-                    formatted.append(f"\n## {stripped}\n")
-                    is_section = True
-                    break
-            
-            if not is_section:
-                # 检测可能的文档标题（第一个较长的行）
-                if (len(formatted) < 3 and 
-                    len(stripped) > 30 and 
-                    len(stripped) < 200 and
-                    not stripped.endswith(('.', '!', '?'))):
-                    formatted.append(f"\n# {stripped}\n")
-                else:
-                    formatted.append(line)
-        
-        return '\n'.join(formatted)
+        return extraction.detect_structure(text)
     
     def extract_page_smart(self, page_pymupdf, page_plumber, page_num: int) -> str:
         """
@@ -305,105 +86,77 @@ class SmartPDFExtractor:
         Returns:
             提取的文本
         """
-        result_parts = []
-        
-        # 第一步：检测主内容区域
-        if HAS_PYMUPDF and page_pymupdf:
-            content_bbox = self.detect_content_area(page_pymupdf)
-        else:
-            content_bbox = None
-        
-        # 如果没有检测到，使用整个页面
-        if content_bbox is None:
-            content_bbox = (0, 0, page_plumber.width, page_plumber.height)
-        
-        # 第二步：检测栏布局
-        if HAS_PYMUPDF and page_pymupdf:
-            columns = self.detect_columns(page_pymupdf, content_bbox)
-        else:
-            columns = [content_bbox]
-        
-        # 第三步：按栏提取文本
-        for col_idx, col_bbox in enumerate(columns):
-            try:
-                # 使用 pdfplumber 的 layout 模式提取
-                col_text = page_plumber.within_bbox(col_bbox).extract_text(
-                    layout=True,
-                    x_tolerance=3,
-                    y_tolerance=3
-                )
-                
-                if col_text:
-                    # 清理文本
-                    col_text = self.clean_layout_text(col_text)
-                    
-                    if col_text.strip():
-                        result_parts.append(col_text)
-            
-            except Exception as e:
-                print(f"⚠ 第 {page_num} 页第 {col_idx} 栏提取失败: {e}")
-        
-        # 合并所有栏
-        page_text = '\n\n'.join(result_parts)
-        
-        # 第四步：结构识别和格式化
-        page_text = self.detect_structure(page_text)
-        
-        return page_text
+        return extraction.extract_page_text(page_plumber, page_pymupdf, self.profile, page_num)
     
-    def extract_pdf(self, pdf_bytes: bytes) -> Tuple[str, List[Dict[str, Any]]]:
+    def extract_pdf(self, pdf_bytes: bytes, timings=None) -> Tuple[str, List[Dict[str, Any]]]:
         """
         提取整个 PDF
         
+        Args:
+            pdf_bytes: PDF 文件的字节内容
+            timings: 可选的 StageTimings，用于记录分阶段耗时
+        
         Returns:
             (markdown_text, page_stats)
+            page_stats 中每页附带该页（含 <!-- Page N --> 标记）在 markdown_text 中的
+            char_start / char_end / byte_start / byte_end，以及页内标题的 headings 列表
+            （章节区间，格式同 extraction.build_offset_index）
         """
         markdown_parts = []
         page_stats = []
-        
-        # 打开 PyMuPDF 文档（用于布局分析）
-        doc_pymupdf = None
-        if HAS_PYMUPDF:
-            try:
-                doc_pymupdf = fitz.open(stream=pdf_bytes, filetype="pdf")
-            except Exception as e:
-                print(f"⚠ PyMuPDF 打开失败: {e}")
-        
-        # 打开 pdfplumber 文档（用于文本提取）
-        with pdfplumber.open(BytesIO(pdf_bytes)) as doc_plumber:
-            for page_num in range(len(doc_plumber.pages)):
-                page_plumber = doc_plumber.pages[page_num]
-                
-                # 获取对应的 PyMuPDF 页面
-                page_pymupdf = None
-                if doc_pymupdf and page_num < doc_pymupdf.page_count:
-                    page_pymupdf = doc_pymupdf.load_page(page_num)
-                
-                # 提取页面
-                page_text = self.extract_page_smart(
-                    page_pymupdf, 
-                    page_plumber, 
-                    page_num + 1
-                )
-                
-                if page_text.strip():
-                    markdown_parts.append(f"<!-- Page {page_num + 1} -->\n\n{page_text}")
-                
-                # 统计信息
-                page_stats.append({
-                    "page": page_num + 1,
-                    "text_len": len(page_text),
-                    "has_pymupdf": page_pymupdf is not None
-                })
-        
-        # 关闭 PyMuPDF 文档
-        if doc_pymupdf:
-            doc_pymupdf.close()
-        
-        markdown = '\n\n---\n\n'.join(markdown_parts)
+        spans = []
+        separator = '\n\n---\n\n'
+        pos = 0
+        
+        # 只提取文本：不做表格和图片
+        for result in self.engine.iter_pages(pdf_bytes, profile=self.profile, table_engine=None,
+                                             images=False, timings=timings):
+            page_num = result["page"]
+            page_text = result["text"]
+            
+            start = pos
+            headings = ()
+            if page_text.strip():
+                marker = f"<!-- Page {page_num} -->\n\n"
+                if markdown_parts:
+                    start += len(separator)
+                markdown_parts.append(marker + page_text)
+                headings = tuple((len(marker) + offset, level, title)
+                                 for offset, level, title in extraction.find_headings(page_text))
+                pos = start + len(markdown_parts[-1])
+            spans.append((page_num, start, pos, headings))
+            
+            # 统计信息
+            page_stats.append({
+                "page": page_num,
+                "text_len": len(page_text),
+                "has_pymupdf": result["has_pymupdf"]
+            })
+        
+        markdown = separator.join(markdown_parts)
+        
+        # 页和标题的偏移索引（组装时已记录位置，无需重新扫描）
+        index = extraction.build_offset_index(markdown, spans)
+        for stats, offsets in zip(page_stats, index["pages"]):
+            stats.update({key: value for key, value in offsets.items() if key != "page"})
+            stats["headings"] = []
+        by_page = {stats["page"]: stats for stats in page_stats}
+        for heading in index["headings"]:
+            by_page[heading["page"]]["headings"].append(heading)
         return markdown, page_stats
 
 
+_default_extractor: Optional[SmartPDFExtractor] = None
+
+
+def get_default_extractor() -> SmartPDFExtractor:
+    """进程内共享的默认提取器（首次调用时创建）"""
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = SmartPDFExtractor()
+    return _default_extractor
+
+
 # 便捷函数
 def extract_pdf_smart(pdf_bytes: bytes) -> str:
     """
@@ -415,17 +168,14 @@ def extract_pdf_smart(pdf_bytes: bytes) -> str:
     Returns:
         Markdown 格式的文本
     """
-    extractor = SmartPDFExtractor()
-    markdown, stats = extractor.extract_pdf(pdf_bytes)
+    markdown, stats = get_default_extractor().extract_pdf(pdf_bytes)
     
-    # 打印统计信息
-    print(f"✓ 提取完成:")
-    print(f"  - 总页数: {len(stats)}")
-    print(f"  - 总字符: {sum(s['text_len'] for s in stats)}")
-    if any(s['has_pymupdf'] for s in stats):
-        print(f"  - 使用智能布局分析: ✓")
-    else:
-        print(f"  - 使用基础提取模式（建议安装 PyMuPDF 以获得更好效果）")
+    # 记录统计信息
+    total_chars = sum(s['text_len'] for s in stats)
+    layout = any(s['has_pymupdf'] for s in stats)
+    logger.info("提取完成: %d 页, %d 字符, %s", len(stats), total_chars,
+                "使用智能布局分析" if layout else "使用基础提取模式（建议安装 PyMuPDF 以获得更好效果）",
+                extra={"pages": len(stats), "chars": total_chars, "layout": layout})
     
     return markdown
 
@@ -438,6 +188,7 @@ if __name__ == "__main__":
         print("用法: python smart_extractor.py <pdf文件路径>")
         sys.exit(1)
     
+    setup_logging(fmt="plain")
     pdf_path = sys.argv[1]
     
     print(f"正在提取: {pdf_path}")
@@ -0,0 +1,150 @@
+"""
+转换 worker：从 PDF2MD_BROKER 领取任务、转换并写回结果
+
+    PDF2MD_BROKER=sqlite:///var/lib/pdf2md/queue.db python -m backend.worker --concurrency 4
+
+worker 不需要接收 HTTP 请求，可以运行在任意能访问队列的节点上，数量按负载增减；
+收到 SIGTERM / Ctrl+C 后不再领取新任务，等当前任务完成后退出。
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+from typing import Any, Dict
+
+try:
+    from backend.broker import LEASE_SECONDS, Broker, Job, error_result, open_broker
+    from backend.extraction import (
+        CancelToken, ConversionCancelled, PageSelectionError, StageTimings, get_engine, summaries_as_columns,
+    )
+    from backend.admission import ResourceLimitExceeded
+    from backend.logs import request_id_var, setup_logging
+    from backend.conversion import run_conversion
+except ImportError:
+    from broker import LEASE_SECONDS, Broker, Job, error_result, open_broker
+    from extraction import (
+        CancelToken, ConversionCancelled, PageSelectionError, StageTimings, get_engine, summaries_as_columns,
+    )
+    from admission import ResourceLimitExceeded
+    from logs import request_id_var, setup_logging
+    from conversion import run_conversion
+
+
+logger = logging.getLogger("pdf2md.worker")
+
+
+def run_job(broker: Broker, job: Job) -> Dict[str, Any]:
+    """执行一个任务并返回结果；运行期间定期续约并检查是否已被取消"""
+    cancel = CancelToken()
+    done = threading.Event()
+
+    def keep_alive():
+        while not done.wait(min(LEASE_SECONDS / 3, 1.0)):
+            try:
+                broker.heartbeat(job.id)
+                if broker.cancelled(job.id):
+                    cancel.cancel("已通过 API 取消")
+            except Exception as e:
+                logger.warning("续约失败: %s", e)
+
+    watcher = threading.Thread(target=keep_alive, name=f"pdf2md-lease-{job.id[:8]}", daemon=True)
+    watcher.start()
+    timings = StageTimings()
+    options = dict(job.options)
+    profiler = options.pop("profiler", None)
+    try:
+        markdown, pages = run_conversion(job.payload, timings, profiler, job.request_id, cancel, **options)
+        # 按列回传每页统计，结果小得多（API 进程用 load_summaries 还原）
+        return {"markdown": markdown, "pages": summaries_as_columns(pages), "timings": timings.to_json()}
+    except PageSelectionError as e:
+        return error_result(str(e), "rejected")
+    except ResourceLimitExceeded as e:
+        return error_result(str(e), "limit_exceeded")
+    except ConversionCancelled as e:
+        return error_result(str(e), "cancelled")
+    except Exception as e:
+        logger.exception("转换失败: %s", e)
+        return error_result(str(e), "error")
+    finally:
+        done.set()
+        watcher.join()
+
+
+def work(broker: Broker, name: str, stop: threading.Event):
+    """领取并执行任务，直到 stop 被设置"""
+    while not stop.is_set():
+        try:
+            job = broker.claim(name, timeout=1.0)
+        except Exception as e:
+            logger.warning("领取任务失败: %s", e)
+            stop.wait(1.0)
+            continue
+        if job is None:
+            continue
+        token = request_id_var.set(job.request_id)
+        try:
+            logger.info("开始任务 %s（第 %d 次尝试）", job.id, job.attempts,
+                        extra={"job_id": job.id, "priority": job.priority, "tenant": job.tenant})
+            result = run_job(broker, job)
+            broker.finish(job.id, result)
+            logger.info("任务 %s 完成: %s", job.id, result.get("type", "ok"), extra={"job_id": job.id})
+        finally:
+            request_id_var.reset(token)
+
+
+def reap(broker: Broker, stop: threading.Event):
+    """定期把租约过期（worker 崩溃或失联）的任务重新入队"""
+    while not stop.wait(LEASE_SECONDS / 2):
+        try:
+            broker.requeue_stale()
+        except Exception as e:
+            logger.warning("检查过期任务失败: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 转 Markdown 转换 worker")
+    parser.add_argument("--broker", default=os.getenv("PDF2MD_BROKER"),
+                        help="队列地址（默认取 PDF2MD_BROKER），如 sqlite:///var/lib/pdf2md/queue.db")
+    parser.add_argument("--concurrency", type=int,
+                        default=int(os.getenv("PDF2MD_MAX_CONCURRENCY", os.cpu_count() or 1)),
+                        help="同时执行的任务数（默认取 PDF2MD_MAX_CONCURRENCY 或 CPU 核数）")
+    args = parser.parse_args()
+
+    setup_logging()
+    if not args.broker:
+        parser.error("需要 --broker 或 PDF2MD_BROKER")
+    broker = open_broker(args.broker)
+    # 领取任务之前准备好转换引擎和 OCR 能力检测（见 extraction/engine.py）
+    get_engine().detect_ocr()
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info("收到信号 %d，完成当前任务后退出", signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [threading.Thread(target=work, args=(broker, f"{name}:{i}", stop), name=f"pdf2md-worker-{i}")
+               for i in range(args.concurrency)]
+    threads.append(threading.Thread(target=reap, args=(broker, stop), name="pdf2md-reaper", daemon=True))
+    for thread in threads:
+        thread.start()
+    logger.info("worker %s 已启动: %d 个并发任务", name, args.concurrency)
+
+    # 主线程等待信号（join 带超时，信号处理函数才能及时运行）
+    while any(thread.is_alive() for thread in threads[:-1]):
+        for thread in threads[:-1]:
+            thread.join(timeout=0.5)
+    broker.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+批量 PDF → Markdown 转换（多进程）
+
+用法:
+    python batch_convert.py <pdf文件或目录> [...] [选项]
+    python batch_convert.py --manifest list.txt --output-dir out/ --workers 8
+
+每个 PDF 生成两个文件：
+    <name>.md          Markdown 文本
+    <name>.pages.json  源文件信息 + 每页统计（图片只记录数量）
+
+默认写在 PDF 旁边；指定 --output-dir 时按输入目录的相对路径镜像输出。
+.pages.json 最后写入，作为"已完成"标记：源文件大小和修改时间未变的文件会被跳过，
+因此中途崩溃后直接重新运行同一命令即可续跑。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from backend.extraction import get_profile, get_table_engine
+
+
+STATS_SUFFIX = ".pages.json"
+
+
+def iter_inputs(paths, manifest=None):
+    """产出 (pdf路径, 相对输出路径)；目录递归查找 *.pdf，清单文件每行一个路径"""
+    for path in paths:
+        p = Path(path)
+        if p.is_dir():
+            for pdf in sorted(p.rglob("*.pdf")):
+                yield pdf, pdf.relative_to(p)
+        elif p.suffix.lower() == ".pdf":
+            yield p, Path(p.name)
+
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    p = Path(line)
+                    yield p, Path(p.name)
+
+
+def output_paths(pdf_path, rel_path, output_dir):
+    """计算 .md 和 .pages.json 的输出路径"""
+    if output_dir:
+        base = Path(output_dir) / rel_path.with_suffix("")
+    else:
+        base = pdf_path.with_suffix("")
+    return base.with_name(base.name + ".md"), base.with_name(base.name + STATS_SUFFIX)
+
+
+def source_info(pdf_path):
+    """源文件指纹（大小 + 修改时间），用于判断是否需要重新转换"""
+    st = pdf_path.stat()
+    return {"path": str(pdf_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def is_up_to_date(pdf_path, md_path, stats_path):
+    """输出已存在且源文件未变化时返回 True"""
+    if not md_path.exists() or not stats_path.exists():
+        return False
+    try:
+        with open(stats_path, "r", encoding="utf-8") as f:
+            recorded = json.load(f).get("source", {})
+        current = source_info(pdf_path)
+        return recorded.get("size") == current["size"] and recorded.get("mtime_ns") == current["mtime_ns"]
+    except Exception:
+        return False
+
+
+def write_atomic(path, text):
+    """先写临时文件再替换，崩溃时不会留下半个输出文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def convert_one(pdf_path, md_path, stats_path, mode, table_engine):
+    """子进程中执行：转换单个文件并写出结果，返回 (页数, 错误信息)"""
+    from backend.conversion import pdf_bytes_to_markdown
+
+    try:
+        info = source_info(pdf_path)
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+        info["sha256"] = hashlib.sha256(pdf_bytes).hexdigest()
+
+        markdown, pages = pdf_bytes_to_markdown(pdf_bytes, table_engine=table_engine, mode=mode)
+
+        pages = [page.as_dict() for page in pages]
+        for page in pages:
+            page["image_count"] = len(page.pop("images", []))
+            page.pop("thumbnails", None)
+
+        write_atomic(md_path, markdown)
+        # 统计文件最后写入，作为完成标记
+        write_atomic(stats_path, json.dumps(
+            {"source": info, "mode": mode, "table_engine": table_engine, "pages": pages},
+            ensure_ascii=False, indent=2,
+        ))
+        return len(pages), None
+    except Exception as e:
+        return 0, f"{type(e).__name__}: {e}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量 PDF → Markdown 转换")
+    parser.add_argument("inputs", nargs="*", help="PDF 文件或目录（递归查找 *.pdf）")
+    parser.add_argument("--manifest", help="清单文件，每行一个 PDF 路径")
+    parser.add_argument("--output-dir", help="输出目录（默认写在 PDF 旁边）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程数（默认 CPU 核数）")
+    parser.add_argument("--mode", default="fast", help="提取模式: fast / layout")
+    parser.add_argument("--table-engine", default="pdfplumber", help="表格引擎: pdfplumber / pymupdf")
+    parser.add_argument("--force", action="store_true", help="忽略已有输出，全部重新转换")
+    parser.add_argument("--max-tasks-per-child", type=int, default=200,
+                        help="每个子进程处理多少个文件后重启（限制内存增长）")
+    args = parser.parse_args()
+
+    # 子进程默认只输出警告和错误，避免每个文件 / 每次运行的 INFO 日志刷屏
+    os.environ.setdefault("PDF2MD_LOG_LEVEL", "WARNING")
+
+    if not args.inputs and not args.manifest:
+        parser.print_help()
+        sys.exit(1)
+
+    try:
+        get_profile(args.mode)
+        get_table_engine(args.table_engine)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    pool_kwargs = {"max_workers": args.workers}
+    if sys.version_info >= (3, 11):
+        pool_kwargs["max_tasks_per_child"] = args.max_tasks_per_child
+
+    total_files = skipped = failed = total_pages = 0
+    start = time.perf_counter()
+    last_report = start
+    pending = {}
+
+    def drain(block_until):
+        """等待已提交任务完成到 pending 数量不超过 block_until"""
+        nonlocal failed, total_pages, last_report
+        while len(pending) > block_until:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_path = pending.pop(future)
+                page_count, error = future.result()
+                if error:
+                    failed += 1
+                    print(f"❌ {pdf_path}: {error}")
+                else:
+                    total_pages += page_count
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                elapsed = now - start
+                print(f"  进度: 完成 {total_files - skipped - len(pending)} 个文件, "
+                      f"{total_pages} 页, {total_pages / elapsed:.1f} 页/秒")
+                last_report = now
+
+    print("=" * 70)
+    print("  批量 PDF → Markdown 转换")
+    print("=" * 70)
+    print(f"进程数: {args.workers}  模式: {args.mode}  表格引擎: {args.table_engine}")
+
+    with ProcessPoolExecutor(**pool_kwargs) as pool:
+        for pdf_path, rel_path in iter_inputs(args.inputs, args.manifest):
+            total_files += 1
+            md_path, stats_path = output_paths(pdf_path, rel_path, args.output_dir)
+
+            if not args.force and is_up_to_date(pdf_path, md_path, stats_path):
+                skipped += 1
+                continue
+
+            future = pool.submit(convert_one, pdf_path, md_path, stats_path, args.mode, args.table_engine)
+            pending[future] = pdf_path
+            # 控制在途任务数量，避免一次性提交几十万个任务
+            drain(args.workers * 4)
+
+        drain(0)
+
+    elapsed = time.perf_counter() - start
+    converted = total_files - skipped - failed
+    print("-" * 70)
+    print(f"✓ 完成: 共 {total_files} 个文件, 转换 {converted}, 跳过 {skipped}, 失败 {failed}")
+    print(f"  总页数: {total_pages}, 耗时 {elapsed:.1f} 秒, 吞吐 {total_pages / max(elapsed, 1e-9):.1f} 页/秒")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
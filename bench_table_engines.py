@@ -0,0 +1,117 @@
+"""
+对比表格提取引擎（pdfplumber vs PyMuPDF）的速度和结果
+
+用法:
+    python bench_table_engines.py <pdf文件或目录> [...]
+
+对每个引擎只计时表格提取本身（候选区域预筛选之后），
+并统计两个引擎检测到的表格数量和行列是否一致。
+"""
+
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import pdfplumber
+
+from backend.extraction.tables import (
+    HAS_PYMUPDF, TABLE_ENGINES, find_table_regions, get_table_engine, table_stats,
+)
+
+if HAS_PYMUPDF:
+    import fitz
+
+
+def collect_pdfs(paths):
+    """展开命令行参数中的文件和目录"""
+    pdfs = []
+    for path in paths:
+        p = Path(path)
+        if p.is_dir():
+            pdfs.extend(sorted(p.rglob("*.pdf")))
+        elif p.suffix.lower() == ".pdf":
+            pdfs.append(p)
+    return pdfs
+
+
+def bench_file(pdf_path, engines):
+    """对单个文件运行所有引擎，返回 {引擎名: (耗时, table_details 列表)}"""
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+
+    results = {name: [0.0, []] for name in engines}
+    doc_pymupdf = fitz.open(stream=pdf_bytes, filetype="pdf") if HAS_PYMUPDF else None
+
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        for idx, page in enumerate(pdf.pages):
+            page_pymupdf = doc_pymupdf.load_page(idx) if doc_pymupdf else None
+            regions = find_table_regions(page, page_pymupdf)
+            if not regions:
+                continue
+            for name, engine in engines.items():
+                start = time.perf_counter()
+                tables = engine.extract_tables(page, page_pymupdf, regions)
+                results[name][0] += time.perf_counter() - start
+                results[name][1].append([table_stats(t) for t in tables if t])
+
+    if doc_pymupdf:
+        doc_pymupdf.close()
+    return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python bench_table_engines.py <pdf文件或目录> [...]")
+        sys.exit(1)
+
+    pdfs = collect_pdfs(sys.argv[1:])
+    if not pdfs:
+        print("❌ 未找到 PDF 文件")
+        sys.exit(1)
+
+    if not HAS_PYMUPDF:
+        print("⚠ 未安装 PyMuPDF，pymupdf 引擎会回退到 pdfplumber")
+
+    engines = {name: get_table_engine(name) for name in TABLE_ENGINES}
+    totals = {name: [0.0, 0] for name in engines}
+    mismatched = []
+
+    print("=" * 80)
+    print("  表格引擎对比")
+    print("=" * 80)
+    header = f"{'文件':<40}" + "".join(f"{name:>18}" for name in engines)
+    print(header)
+    print("-" * 80)
+
+    for pdf_path in pdfs:
+        results = bench_file(pdf_path, engines)
+        row = f"{pdf_path.name[:38]:<40}"
+        for name, (elapsed, details) in results.items():
+            table_count = sum(len(d) for d in details)
+            totals[name][0] += elapsed
+            totals[name][1] += table_count
+            row += f"{elapsed * 1000:>10.1f}ms/{table_count:<5}"
+        print(row)
+
+        detail_sets = [details for _, details in results.values()]
+        if any(d != detail_sets[0] for d in detail_sets[1:]):
+            mismatched.append(pdf_path)
+
+    print("-" * 80)
+    row = f"{'合计':<40}"
+    for name, (elapsed, count) in totals.items():
+        row += f"{elapsed * 1000:>10.1f}ms/{count:<5}"
+    print(row)
+
+    print(f"\n文件数: {len(pdfs)}")
+    if mismatched:
+        print(f"⚠ {len(mismatched)} 个文件的 table_details 不一致:")
+        for path in mismatched:
+            print(f"   {path}")
+    else:
+        print("✓ 所有文件的 table_details 一致")
+
+
+if __name__ == "__main__":
+    main()
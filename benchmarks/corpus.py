@@ -0,0 +1,153 @@
+"""
+合成基准语料（用 PyMuPDF 在本地生成，结果可复现）
+
+每个用例生成一次并缓存到 benchmarks/corpus/ 下；修改生成逻辑时提升 CORPUS_VERSION。
+"""
+
+import random
+from pathlib import Path
+
+import fitz
+
+
+CORPUS_VERSION = 1
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4
+
+WORDS = (
+    "model data method result analysis system network training performance layer "
+    "feature input output error accuracy sample value function parameter structure "
+    "approach evaluation baseline dataset experiment learning process signal table figure"
+).split()
+
+
+def _sentence(rng, min_words=8, max_words=16):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def _fill_column(page, rng, x0, x1, y0=90, y1=780, fontsize=9):
+    """在给定横向范围内逐行写入随机文本（TextWriter 批量写入，比逐行 insert_text 快得多）"""
+    chars_per_line = int((x1 - x0) / (fontsize * 0.5))
+    writer = fitz.TextWriter(page.rect)
+    y = y0
+    while y < y1:
+        text = _sentence(rng, 10, 30)[:chars_per_line]
+        writer.append((x0, y), text, fontsize=fontsize)
+        y += fontsize * 1.4
+    writer.write_text(page)
+
+
+def _header_footer(page, page_num):
+    page.insert_text((72, 40), "Synthetic Benchmark Document", fontsize=8)
+    page.insert_text((PAGE_WIDTH / 2, 815), str(page_num), fontsize=8)
+
+
+def _title(page, rng):
+    page.insert_text((72, 70), "A Synthetic Study of " + " ".join(rng.sample(WORDS, 4)).title(), fontsize=14)
+
+
+def _draw_table(page, rng, x0, y0, rows=6, cols=4, cell_w=100, cell_h=18):
+    for r in range(rows + 1):
+        page.draw_line((x0, y0 + r * cell_h), (x0 + cols * cell_w, y0 + r * cell_h))
+    for c in range(cols + 1):
+        page.draw_line((x0 + c * cell_w, y0), (x0 + c * cell_w, y0 + rows * cell_h))
+    for r in range(rows):
+        for c in range(cols):
+            text = rng.choice(WORDS) if r == 0 else f"{rng.random() * 100:.2f}"
+            page.insert_text((x0 + c * cell_w + 4, y0 + r * cell_h + 13), text, fontsize=8)
+
+
+def _random_pixmap(rng, width, height):
+    """横向条纹图片（每行随机颜色），避免被压缩成几乎为零的大小"""
+    rows = [bytes((rng.randrange(256), rng.randrange(256), rng.randrange(256))) * width for _ in range(height)]
+    return fitz.Pixmap(fitz.csRGB, width, height, b"".join(rows), 0)
+
+
+def build_single_column(doc, rng, pages=20):
+    for n in range(1, pages + 1):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _header_footer(page, n)
+        if n == 1:
+            _title(page, rng)
+        _fill_column(page, rng, 72, 523)
+
+
+def build_two_column(doc, rng, pages=20):
+    for n in range(1, pages + 1):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _header_footer(page, n)
+        if n == 1:
+            _title(page, rng)
+        _fill_column(page, rng, 60, 285)
+        _fill_column(page, rng, 310, 535)
+
+
+def build_table_heavy(doc, rng, pages=20):
+    for n in range(1, pages + 1):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _header_footer(page, n)
+        _fill_column(page, rng, 72, 523, y0=90, y1=150)
+        for i in range(3):
+            _draw_table(page, rng, 72, 170 + i * 200)
+
+
+def build_image_heavy(doc, rng, pages=20):
+    for n in range(1, pages + 1):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _header_footer(page, n)
+        _fill_column(page, rng, 72, 523, y0=90, y1=200)
+        for i in range(6):
+            pix = _random_pixmap(rng, 400, 300)
+            x = 72 + (i % 2) * 230
+            y = 220 + (i // 2) * 190
+            page.insert_image(fitz.Rect(x, y, x + 220, y + 165), pixmap=pix)
+
+
+def build_scanned(doc, rng, pages=10, dpi=150):
+    """扫描件：先排版文本页，再渲染成图片放入新页面（没有文本层）"""
+    for n in range(1, pages + 1):
+        src = fitz.open()
+        src_page = src.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _header_footer(src_page, n)
+        _fill_column(src_page, rng, 72, 523)
+        pix = src_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        src.close()
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_image(page.rect, pixmap=pix)
+
+
+def build_long(doc, rng, pages=500):
+    build_single_column(doc, rng, pages=pages)
+
+
+CASES = {
+    "single_column": build_single_column,
+    "two_column": build_two_column,
+    "table_heavy": build_table_heavy,
+    "image_heavy": build_image_heavy,
+    "scanned": build_scanned,
+    "long_500": build_long,
+}
+
+
+def case_path(name: str) -> Path:
+    """返回用例 PDF 路径，不存在时生成"""
+    if name not in CASES:
+        raise ValueError(f"未知的基准用例: {name}（可选: {', '.join(CASES)}）")
+    path = CORPUS_DIR / f"{name}.v{CORPUS_VERSION}.pdf"
+    if not path.exists():
+        CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+        doc = fitz.open()
+        CASES[name](doc, random.Random(f"{name}-{CORPUS_VERSION}"))
+        tmp_path = path.with_suffix(".tmp")
+        doc.save(tmp_path, garbage=3, deflate=True)
+        doc.close()
+        tmp_path.replace(path)
+    return path
+
+
+if __name__ == "__main__":
+    for case in CASES:
+        print(f"{case}: {case_path(case)}")
@@ -0,0 +1,306 @@
+"""
+转换流水线基准测试
+
+用法:
+    python -m benchmarks.run                          # 全部用例 × 默认目标
+    python -m benchmarks.run --cases two_column long_500 --targets convert_fast
+    python -m benchmarks.run --save-baseline          # 把本次结果存为基线
+    python -m benchmarks.run --threshold 0.2          # 与基线对比，超过 20% 视为回归
+
+每个 (用例, 目标) 在独立的子进程中运行，保证峰值内存（RSS）互不影响。
+记录 wall time、CPU time、峰值 RSS、页/秒以及各阶段（layout、columns、tables、images…）耗时；结果保存为 JSON，
+并与 benchmarks/baseline.json 对比，出现回归时退出码为 1。
+输出 Markdown 的标题行数（"#" 开头）也与基线对比：清理或结构识别的改动把正文行变成标题（或丢掉标题）时同样视为回归。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.corpus import CASES, case_path
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+# 低于该绝对差值（秒）的时间波动不算回归
+NOISE_FLOOR_S = 0.05
+
+
+# ---------- 基准目标 ----------
+
+# 目标函数签名: (pdf_path, pdf_bytes, timings) -> (页数, Markdown)；timings 为 StageTimings，
+# 不产出本项目 Markdown 的目标（ocr、nougat）返回 (页数, None)
+
+def _convert(pdf_bytes, timings, **kwargs):
+    from backend.conversion import pdf_bytes_to_markdown
+    markdown, pages = pdf_bytes_to_markdown(pdf_bytes, ocr=False, timings=timings, **kwargs)
+    return len(pages), markdown
+
+
+def target_convert_fast(pdf_path, pdf_bytes, timings):
+    return _convert(pdf_bytes, timings, mode="fast")
+
+
+def target_convert_layout(pdf_path, pdf_bytes, timings):
+    return _convert(pdf_bytes, timings, mode="layout")
+
+
+def target_convert_pymupdf_tables(pdf_path, pdf_bytes, timings):
+    return _convert(pdf_bytes, timings, mode="fast", table_engine="pymupdf")
+
+
+def target_smart_extract(pdf_path, pdf_bytes, timings):
+    from backend.smart_extractor import SmartPDFExtractor
+    markdown, stats = SmartPDFExtractor().extract_pdf(pdf_bytes, timings=timings)
+    return len(stats), markdown
+
+
+def target_ocr(pdf_path, pdf_bytes, timings):
+    import fitz
+    from backend.conversion import ocr_pdf_bytes
+    with timings.stage("ocr"):
+        ocr_pdf_bytes(pdf_bytes)
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc.page_count, None
+
+
+def target_nougat(pdf_path, pdf_bytes, timings):
+    import tempfile
+    import fitz
+    with tempfile.TemporaryDirectory() as td:
+        subprocess.run(["nougat", str(pdf_path), "-o", td, "--markdown"], check=True, capture_output=True)
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc.page_count, None
+
+
+def _ocr_available():
+    with contextlib.redirect_stdout(io.StringIO()):
+        from backend.extraction import get_engine
+        return get_engine().ocr_available
+
+
+def _nougat_available():
+    from backend.nougat_converter import check_nougat_installed
+    return check_nougat_installed()
+
+
+# 名称 -> (函数, 是否默认运行, 可用性检查)
+TARGETS = {
+    "convert_fast": (target_convert_fast, True, None),
+    "convert_layout": (target_convert_layout, True, None),
+    "convert_pymupdf_tables": (target_convert_pymupdf_tables, True, None),
+    "smart_extract": (target_smart_extract, True, None),
+    "ocr": (target_ocr, False, _ocr_available),
+    "nougat": (target_nougat, False, _nougat_available),
+}
+
+
+# ---------- 测量 ----------
+
+def _peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位是 KB，macOS 是字节
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def count_headings(markdown: str) -> int:
+    """Markdown 中的标题行数"""
+    return sum(1 for line in markdown.splitlines() if line.startswith("#"))
+
+
+def _measure(target_name, pdf_path, repeat, queue):
+    """子进程入口：运行 repeat 次，返回中位数耗时、各阶段耗时和峰值内存"""
+    try:
+        func = TARGETS[target_name][0]
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+
+        walls, cpus, stage_runs = [], [], []
+        pages, markdown = 0, None
+        with contextlib.redirect_stdout(io.StringIO()):
+            from backend.extraction import StageTimings
+            for _ in range(repeat):
+                timings = StageTimings()
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                pages, markdown = func(pdf_path, pdf_bytes, timings)
+                walls.append(time.perf_counter() - wall_start)
+                cpus.append(time.process_time() - cpu_start)
+                stage_runs.append(timings.stages)
+
+        wall = statistics.median(walls)
+        queue.put({
+            "pages": pages,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(statistics.median(cpus), 4),
+            "peak_rss_mb": round(_peak_rss_mb() or 0, 1) or None,
+            "pages_per_s": round(pages / wall, 2) if wall > 0 else None,
+            "headings": count_headings(markdown) if markdown is not None else None,
+            # 各阶段耗时（中位数）与对应的页/秒
+            "stages": {
+                stage: {
+                    "wall_s": round(seconds, 4),
+                    "pages_per_s": round(pages / seconds, 2) if seconds > 0 else None,
+                }
+                for stage in sorted({name for run in stage_runs for name in run})
+                for seconds in [statistics.median(run.get(stage, 0.0) for run in stage_runs)]
+            },
+        })
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_one(target_name, pdf_path, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(target_name, str(pdf_path), repeat, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+# ---------- 报告与回归检测 ----------
+
+def environment_info():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        info["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BENCH_DIR
+        ).stdout.strip() or None
+    except Exception:
+        info["git_commit"] = None
+    for module in ("fitz", "pdfplumber"):
+        try:
+            mod = __import__(module)
+            info[module] = getattr(mod, "VersionBind", None) or getattr(mod, "__version__", None)
+        except Exception:
+            info[module] = None
+    return info
+
+
+def find_regressions(results, baseline, threshold):
+    """返回回归列表 [(key, 指标, 基线值, 当前值)]"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base or "error" in current or "error" in base:
+            continue
+        for metric in ("wall_s", "cpu_s"):
+            if (current[metric] > base[metric] * (1 + threshold) and
+                    current[metric] - base[metric] > NOISE_FLOOR_S):
+                regressions.append((key, metric, base[metric], current[metric]))
+        if current.get("peak_rss_mb") and base.get("peak_rss_mb"):
+            if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+                regressions.append((key, "peak_rss_mb", base["peak_rss_mb"], current["peak_rss_mb"]))
+        # 标题数与阈值无关：同一份 PDF 的标题行数变了就是输出变了
+        if current.get("headings") is not None and base.get("headings") is not None:
+            if current["headings"] != base["headings"]:
+                regressions.append((key, "headings", base["headings"], current["headings"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF → Markdown 转换基准测试")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS),
+                        default=[name for name, (_, default, _) in TARGETS.items() if default])
+    parser.add_argument("--repeat", type=int, default=3, help="每个组合重复次数（取中位数）")
+    parser.add_argument("--output", help="结果 JSON 路径（默认 benchmarks/results/<时间>.json）")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="基线 JSON 路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.15, help="回归阈值（相对基线的增幅）")
+    parser.add_argument("--stages", action="store_true", help="输出每个阶段的耗时（结果 JSON 中始终包含）")
+    args = parser.parse_args()
+
+    # 子进程默认只输出警告和错误，避免每个文件 / 每次运行的 INFO 日志刷屏
+    os.environ.setdefault("PDF2MD_LOG_LEVEL", "WARNING")
+
+    targets = []
+    for name in args.targets:
+        check = TARGETS[name][2]
+        if check is not None and not check():
+            print(f"⚠ 跳过 {name}：依赖未安装")
+            continue
+        targets.append(name)
+
+    print("=" * 96)
+    print("  PDF → Markdown 基准测试")
+    print("=" * 96)
+    print(f"{'用例':<16}{'目标':<26}{'页数':>6}{'wall(s)':>10}{'cpu(s)':>10}{'RSS(MB)':>10}{'页/秒':>10}")
+    print("-" * 96)
+
+    results = {}
+    for case in args.cases:
+        pdf_path = case_path(case)
+        for target in targets:
+            key = f"{case}/{target}"
+            result = run_one(target, pdf_path, args.repeat)
+            results[key] = result
+            if "error" in result:
+                print(f"{case:<16}{target:<26}  ❌ {result['error']}")
+                continue
+            print(f"{case:<16}{target:<26}{result['pages']:>6}{result['wall_s']:>10.3f}{result['cpu_s']:>10.3f}"
+                  f"{result['peak_rss_mb'] or 0:>10.1f}{result['pages_per_s'] or 0:>10.1f}")
+            if args.stages:
+                for stage, stage_result in result["stages"].items():
+                    print(f"{'':<16}{'  · ' + stage:<26}{'':>6}{stage_result['wall_s']:>10.3f}{'':>20}"
+                          f"{stage_result['pages_per_s'] or 0:>10.1f}")
+
+    report = {"environment": environment_info(), "repeat": args.repeat, "results": results}
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n✓ 结果已保存: {output}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ 已保存为基线: {args.baseline}")
+        return
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print("ℹ 未找到基线，使用 --save-baseline 保存当前结果作为基线")
+        return
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = find_regressions(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"\n⚠ 发现 {len(regressions)} 项回归（阈值 +{args.threshold:.0%}）:")
+        for key, metric, base, current in regressions:
+            if metric == "headings":
+                print(f"   {key} {metric}: {base} → {current}")
+            else:
+                print(f"   {key} {metric}: {base} → {current} (+{(current / base - 1):.0%})")
+        sys.exit(1)
+    print(f"✓ 与基线相比无回归（阈值 +{args.threshold:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,7 @@ def convert_method_current(pdf_path: str):
     print("方法 1: 当前方法（pdfplumber + PyMuPDF 智能提取）")
     print("=" * 70)
     
-    from backend.main import pdf_bytes_to_markdown
+    from backend.conversion import pdf_bytes_to_markdown
     
     with open(pdf_path, 'rb') as f:
         pdf_bytes = f.read()